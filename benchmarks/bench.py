@@ -0,0 +1,262 @@
+"""
+Micro-benchmarks of the park/unpark/fee/rendering hot paths and of the command interpreter.
+
+    python benchmarks/bench.py                          # run and print the results
+    python benchmarks/bench.py --save baseline.json     # run and record a baseline
+    python benchmarks/bench.py --compare baseline.json  # run and fail on regressions
+
+Every result reports throughput (over the time spent in the timed calls), p50/p99 latency of a
+single call and the peak memory traced while the benchmarked lot is built and exercised. A run
+regresses when a benchmark's throughput drops, or its peak memory grows, by more than the
+tolerance against the baseline
+"""
+
+import argparse
+import io
+import json
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from parking.interpreter import CommandInterpreter
+from parking.metrics import LotMetrics
+from parking.models.archive import SessionArchive, discard_spilled
+from parking.models.fees import AirportFeeModel, FeeModel, MallFeeModel, StadiumFeeModel
+from parking.models.parking_lot import ParkingLot
+from parking.models.slips import Receipt, Ticket
+from parking.models.vehicle import VehicleType
+
+DEFAULT_SIZES: List[int] = [10, 1_000, 100_000, 1_000_000]
+# timed calls per benchmark, lots bigger than this are pre-filled untimed
+MAX_OPS: int = 50_000
+ENTRY_TIME = datetime(2022, 5, 29, 14, 4, 7)
+
+Result = Dict[str, float]
+
+
+def timed(
+    call: Callable[..., object],
+    arguments: Sequence[Tuple[object, ...]],
+    latencies: Optional["array[int]"] = None,
+) -> "array[int]":
+    """
+    Calls call once per arguments tuple, timing every call on its own
+
+    :return: latencies in ns, appended to latencies if assigned
+    """
+    latencies = latencies if latencies is not None else array("q")
+    clock = time.perf_counter_ns
+    for args in arguments:
+        before = clock()
+        call(*args)
+        latencies.append(clock() - before)
+    return latencies
+
+
+def summary(latencies: "array[int]") -> Result:
+    ordered = sorted(latencies)
+    return {
+        "ops": len(ordered),
+        "ops_per_sec": round(len(ordered) / (sum(ordered) / 1e9)),
+        "p50_ns": ordered[len(ordered) // 2],
+        "p99_ns": ordered[min(len(ordered) - 1, len(ordered) * 99 // 100)],
+    }
+
+
+def measured(benchmark: Callable[[], Result]) -> Result:
+    """
+    Runs a benchmark twice, once for timings, then again under tracemalloc for its peak memory
+    as tracing slows every allocation down
+    """
+    result = benchmark()
+    tracemalloc.start()
+    try:
+        benchmark()
+        result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result
+
+
+def make_parking_lot(size: int, metrics: bool = False) -> ParkingLot:
+    """
+    :param metrics: if set, the lot is handed LotMetrics, otherwise it gets no optional
+                    collaborator at all, as a lot with metrics disabled
+    """
+    return ParkingLot(
+        "Benchmark Parking Lot",
+        {VehicleType.CAR_SUV: size},
+        {VehicleType.CAR_SUV: MallFeeModel()},
+        archive=SessionArchive(on_spill=discard_spilled),
+        metrics=LotMetrics() if metrics else None,
+    )
+
+
+def bench_park(size: int, metrics: bool = False) -> Result:
+    latencies: "array[int]" = array("q")
+    # lots smaller than MAX_OPS are filled up again and again, until MAX_OPS calls are timed
+    for _ in range(max(1, MAX_OPS // size)):
+        parking_lot = make_parking_lot(size, metrics)
+        ops = min(size, MAX_OPS)
+        for _ in range(size - ops):
+            parking_lot.park_vehicle(VehicleType.CAR_SUV, ENTRY_TIME)
+        timed(parking_lot.park_vehicle, [(VehicleType.CAR_SUV, ENTRY_TIME)] * ops, latencies)
+    return summary(latencies)
+
+
+def bench_unpark(size: int, metrics: bool = False) -> Result:
+    latencies: "array[int]" = array("q")
+    rng = random.Random(size)
+    for _ in range(max(1, MAX_OPS // size)):
+        parking_lot = make_parking_lot(size, metrics)
+        for _ in range(size):
+            parking_lot.park_vehicle(VehicleType.CAR_SUV, ENTRY_TIME)
+        # out of order, so the free spot index sees the turnover of a real lot
+        ticket_numbers = rng.sample(range(1, size + 1), min(size, MAX_OPS))
+        timed(
+            parking_lot.unpark_vehicle,
+            [(ticket_number, 5400) for ticket_number in ticket_numbers],
+            latencies,
+        )
+    return summary(latencies)
+
+
+def bench_fees(fee_model: FeeModel, vehicle_type: VehicleType) -> Result:
+    rng = random.Random(7)
+    return summary(
+        timed(
+            fee_model.calculate_fees,
+            [(vehicle_type, rng.uniform(0, 24 * 7)) for _ in range(MAX_OPS)],
+        )
+    )
+
+
+def bench_str(slip: object) -> Result:
+    return summary(timed(str, [(slip,)] * MAX_OPS))
+
+
+class NullOutput(io.StringIO):
+    """
+    Swallows the interpreter's output, so only interpreting and rendering are timed
+    """
+
+    def write(self, text: str) -> int:
+        return len(text)
+
+
+def bench_interpreter(block: int = 1_000) -> Result:
+    """
+    Streams MAX_OPS park then unpark commands through a CommandInterpreter, timed block
+    commands at a time, latencies are per command averaged over their block
+    """
+    entry_time = ENTRY_TIME.isoformat()
+    commands = [f"LOT bench mall CAR_SUV={MAX_OPS // 2}\n"]
+    commands += [f"PARK bench CAR_SUV {entry_time}\n"] * (MAX_OPS // 2)
+    commands += [f"UNPARK bench {number} 5400\n" for number in range(1, MAX_OPS // 2 + 1)]
+    interpreter = CommandInterpreter(NullOutput())
+    latencies: "array[int]" = array("q")
+    clock = time.perf_counter_ns
+    for start in range(0, len(commands), block):
+        end = start + block
+        lines = commands[start:end]
+        before = clock()
+        interpreter.run(lines)
+        latencies.extend([(clock() - before) // len(lines)] * len(lines))
+    return summary(latencies)
+
+
+def run(sizes: List[int]) -> Dict[str, Result]:
+    results: Dict[str, Result] = {}
+    for size in sizes:
+        results[f"park_vehicle[{size}]"] = measured(lambda: bench_park(size))
+        results[f"unpark_vehicle[{size}]"] = measured(lambda: bench_unpark(size))
+    # the lots above have metrics disabled, so their baseline holds the disabled path to the
+    # throughput of lots from before metrics existed, these tell what enabling them costs
+    results["park_vehicle[1000,metrics]"] = measured(lambda: bench_park(1_000, metrics=True))
+    results["unpark_vehicle[1000,metrics]"] = measured(lambda: bench_unpark(1_000, metrics=True))
+
+    fee_models: List[Tuple[FeeModel, VehicleType]] = [
+        (MallFeeModel(), VehicleType.CAR_SUV),
+        (StadiumFeeModel(), VehicleType.CAR_SUV),
+        (AirportFeeModel(), VehicleType.CAR_SUV),
+    ]
+    for fee_model, vehicle_type in fee_models:
+        name = f"{type(fee_model).__name__}.calculate_fees"
+        results[name] = measured(lambda: bench_fees(fee_model, vehicle_type))
+
+    ticket = Ticket(1, 1, ENTRY_TIME)
+    receipt = Receipt(1, ENTRY_TIME, datetime(2022, 5, 29, 16, 4, 7), 40)
+    results["Ticket.__str__"] = measured(lambda: bench_str(ticket))
+    results["Receipt.__str__"] = measured(lambda: bench_str(receipt))
+    results["CommandInterpreter.run"] = measured(bench_interpreter)
+    return results
+
+
+def compare(
+    results: Dict[str, Result], baseline: Dict[str, Result], tolerance: float
+) -> List[str]:
+    """
+    :return: a description of every regression against the baseline
+    """
+    regressions = []
+    for name, expected in baseline.items():
+        if name not in results:
+            continue
+        actual = results[name]
+        if actual["ops_per_sec"] < expected["ops_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {actual['ops_per_sec']:,.0f} ops/s, "
+                f"baseline {expected['ops_per_sec']:,.0f} ops/s"
+            )
+        if actual["peak_bytes"] > expected["peak_bytes"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: peak {actual['peak_bytes']:,.0f} bytes, "
+                f"baseline {expected['peak_bytes']:,.0f} bytes"
+            )
+    return regressions
+
+
+def report(results: Dict[str, Result]) -> None:
+    print(f"{'benchmark':<36}{'ops/s':>14}{'p50 ns':>10}{'p99 ns':>10}{'peak MiB':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<36}{result['ops_per_sec']:>14,.0f}{result['p50_ns']:>10,.0f}"
+            f"{result['p99_ns']:>10,.0f}{result['peak_bytes'] / 2**20:>10.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes",
+        type=lambda sizes: [int(size) for size in sizes.split(",")],
+        default=DEFAULT_SIZES,
+        help="comma separated lot sizes, in spots",
+    )
+    parser.add_argument("--save", metavar="PATH", help="write the results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="fail on regressions to a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    args = parser.parse_args()
+
+    results = run(args.sizes)
+    report(results)
+
+    if args.save:
+        with open(args.save, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
+import argparse
+import asyncio
+import sys
+from typing import List, Optional
+
 from parking.examples import run_example_one, run_example_two, run_example_three, run_example_four
+from parking.interpreter import FEE_MODELS, CommandInterpreter, build_parking_lot, parse_spots
+from parking.metrics import LotMetrics, start_metrics_server
+from parking.server import ParkingServer
+from parking.simulation import SimulationConfig, parse_profiles, simulate
 
 
-def main() -> None:
+def run_examples() -> None:
     # Example 1: Small motorcycle/scooter parking lot
     run_example_one()
 
@@ -15,5 +24,69 @@ def main() -> None:
     run_example_four()
 
 
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="parking")
+    commands = parser.add_subparsers(dest="command")
+
+    serve = commands.add_parser("serve", help="serve a parking lot to gates over TCP")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--name", default="Parking Lot")
+    serve.add_argument(
+        "--spots", action="append", required=True, help="TYPE=COUNT, e.g. CAR_SUV=80"
+    )
+    serve.add_argument("--fee-model", choices=sorted(FEE_MODELS), default="mall")
+    serve.add_argument(
+        "--metrics-port", type=int, help="if assigned, serves Prometheus metrics on that port"
+    )
+
+    run = commands.add_parser("run", help="run park/unpark commands from a file or stdin")
+    run.add_argument("input", nargs="?", type=argparse.FileType("r"), default=sys.stdin)
+
+    simulation = commands.add_parser("simulate", help="simulate stochastic traffic of a site")
+    simulation.add_argument(
+        "--spots", action="append", required=True, help="TYPE=COUNT, e.g. CAR_SUV=80"
+    )
+    simulation.add_argument("--fee-model", choices=sorted(FEE_MODELS), default="mall")
+    simulation.add_argument(
+        "--arrivals", action="append", required=True, help="TYPE=PER_HOUR, e.g. CAR_SUV=40"
+    )
+    simulation.add_argument(
+        "--dwell", action="append", required=True, help="TYPE=MEAN_HOURS, e.g. CAR_SUV=2.5"
+    )
+    simulation.add_argument("--hours", type=float, default=24)
+    simulation.add_argument("--replications", type=int, default=100)
+    simulation.add_argument("--seed", type=int, default=0)
+    simulation.add_argument("--workers", type=int)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        with args.input:
+            failures = CommandInterpreter(sys.stdout, sys.stderr).run(args.input)
+        if failures:
+            sys.exit(1)
+    elif args.command == "serve":
+        parking_lot = build_parking_lot(args.name, args.spots, args.fee_model)
+        if args.metrics_port is not None:
+            parking_lot.metrics = LotMetrics()
+            start_metrics_server([parking_lot], args.host, args.metrics_port)
+        asyncio.run(ParkingServer(parking_lot).serve_forever(args.host, args.port))
+    elif args.command == "simulate":
+        spots = parse_spots(args.spots)
+        fee_model = FEE_MODELS[args.fee_model]()
+        config = SimulationConfig(
+            spots,
+            {vehicle_type: fee_model for vehicle_type in spots},
+            parse_profiles(args.arrivals, args.dwell),
+            args.hours,
+        )
+        result = simulate(config, args.replications, args.seed, args.workers)
+        print(f"{'outcome':<36}{'mean':>12}{'p5':>12}{'p50':>12}{'p95':>12}")
+        for name, distribution in result.summary().items():
+            print(f"{name:<36}" + "".join(f"{value:>12,.1f}" for value in distribution))
+    else:
+        run_examples()
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,129 @@
+import argparse
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, TextIO, Type
+
+from parking.models.archive import SessionArchive, discard_spilled
+from parking.models.fees import AirportFeeModel, FeeModel, MallFeeModel, StadiumFeeModel
+from parking.models.parking_lot import ParkingLot
+from parking.models.vehicle import VehicleType
+
+FEE_MODELS: Dict[str, Type[FeeModel]] = {
+    "mall": MallFeeModel,
+    "stadium": StadiumFeeModel,
+    "airport": AirportFeeModel,
+}
+
+# plain dict lookup, cheaper than going through VehicleType[...] for every command
+VEHICLE_TYPES_BY_NAME: Dict[str, VehicleType] = dict(VehicleType.__members__)
+# output lines held before they are written together
+OUTPUT_BATCH_LINES: int = 1024
+
+
+def parse_spots(spots: Iterable[str]) -> Dict[VehicleType, int]:
+    """
+    :param spots: TYPE=COUNT pairs, e.g. CAR_SUV=80
+    :return: how many spots are assigned for each vehicle type
+    """
+    parsed = {}
+    for spot in spots:
+        vehicle_type, _, count = spot.partition("=")
+        try:
+            parsed[VehicleType[vehicle_type]] = int(count)
+        except (KeyError, ValueError):
+            raise argparse.ArgumentTypeError(f"Invalid spots {spot}, expected TYPE=COUNT")
+    return parsed
+
+
+def build_parking_lot(name: str, spots: Iterable[str], fee_model: str) -> ParkingLot:
+    """
+    :param name: name of the parking lot
+    :param spots: TYPE=COUNT pairs, e.g. CAR_SUV=80
+    :param fee_model: one of FEE_MODELS, applied to every vehicle type
+    """
+    if fee_model not in FEE_MODELS:
+        raise ValueError(f"Unknown fee model {fee_model}, expected one of {sorted(FEE_MODELS)}")
+    model = FEE_MODELS[fee_model]()
+    parsed_spots = parse_spots(spots)
+    return ParkingLot(
+        name,
+        parsed_spots,
+        {vehicle_type: model for vehicle_type in parsed_spots},
+        # receipts are written out as they are issued, closed sessions are not kept
+        archive=SessionArchive(on_spill=discard_spilled),
+    )
+
+
+class CommandInterpreter:
+    """
+    Runs park/unpark commands against one or more parking lots, one command per line:
+        * LOT <lot name> <fee model> <TYPE=COUNT> [<TYPE=COUNT> ...]
+        * PARK <lot name> <vehicle type> [<entry iso date-time>]
+        * UNPARK <lot name> <ticket number> [<duration in seconds>]
+    blank lines and lines starting with # are skipped. Tickets and receipts are written to the
+    output in batches of OUTPUT_BATCH_LINES as they are issued, commands are read one line at a
+    time so memory does not grow with the size of the input
+    """
+
+    def __init__(self, output: TextIO, errors: Optional[TextIO] = None):
+        """
+        :param output: where lot names, tickets, receipts and "No space available" go
+        :param errors: where invalid commands are reported, with their line number
+        """
+        self.output = output
+        self.errors = errors
+        self.parking_lots: Dict[str, ParkingLot] = {}
+
+    def run(self, lines: Iterable[str]) -> int:
+        """
+        :param lines: command lines, e.g. an open file
+        :return: number of commands that failed
+        """
+        failures = 0
+        batch: List[str] = []
+        write = batch.append
+        # replays often repeat an entry date-time line after line, the last one is parsed once
+        entry_text, entry_time = "", None
+        try:
+            for line_number, line in enumerate(lines, start=1):
+                command, *args = line.split() or ("#",)
+                try:
+                    if command == "PARK" and 2 <= len(args) <= 3:
+                        if len(args) == 3:
+                            if args[2] != entry_text:
+                                entry_time = datetime.fromisoformat(args[2])
+                                entry_text = args[2]
+                        else:
+                            entry_time = None
+                            entry_text = ""
+                        ticket = self.parking_lots[args[0]].park_vehicle(
+                            VEHICLE_TYPES_BY_NAME[args[1]], fake_entry_time=entry_time
+                        )
+                        write(f"{ticket}\n")
+                    elif command == "UNPARK" and 2 <= len(args) <= 3:
+                        duration = int(args[2]) if len(args) == 3 else None
+                        receipt = self.parking_lots[args[0]].unpark_vehicle(
+                            int(args[1]), fake_duration=duration
+                        )
+                        write(f"{receipt}\n")
+                    elif command == "LOT" and len(args) >= 3:
+                        self.parking_lots[args[0]] = build_parking_lot(args[0], args[2:], args[1])
+                        write(f"{args[0]}\n")
+                    elif not command.startswith("#"):
+                        raise ValueError(f"Malformed command: {line.strip()}")
+                except KeyError as e:
+                    failures += 1
+                    self._report(line_number, f"Unknown lot or vehicle type {e}")
+                except (ValueError, argparse.ArgumentTypeError) as e:
+                    failures += 1
+                    self._report(line_number, str(e))
+                if len(batch) >= OUTPUT_BATCH_LINES:
+                    self.output.writelines(batch)
+                    batch.clear()
+        finally:
+            if batch:
+                self.output.writelines(batch)
+        return failures
+
+    def _report(self, line_number: int, error: str) -> None:
+        if self.errors is not None:
+            self.errors.write(f"Line {line_number}: {error}\n")
@@ -0,0 +1,194 @@
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from parking.models.parking_lot import ParkingLot
+from parking.models.vehicle import VehicleType
+
+# upper bounds of the latency buckets, in seconds
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    1e-6,
+    2.5e-6,
+    5e-6,
+    1e-5,
+    2.5e-5,
+    5e-5,
+    1e-4,
+    2.5e-4,
+    5e-4,
+    1e-3,
+    1e-2,
+)
+CONTENT_TYPE: str = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """
+    A latency histogram with fixed buckets, observations are counted in the first bucket
+    whose upper bound they do not exceed, the ones above every bound in an extra +Inf bucket
+    """
+
+    __slots__ = ("bounds", "_bounds_ns", "counts", "total_ns")
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        """
+        :param bounds: increasing bucket upper bounds, in seconds
+        """
+        self.bounds = tuple(bounds)
+        self._bounds_ns = [round(bound * 1e9) for bound in self.bounds]
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total_ns = 0
+
+    def observe(self, elapsed_ns: int) -> None:
+        self.counts[bisect_left(self._bounds_ns, elapsed_ns)] += 1
+        self.total_ns += elapsed_ns
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class LotMetrics:
+    """
+    Counters and latency histograms of a parking lot, only collected by lots they are assigned
+    to, lots without metrics pay a single None check per call.
+    Occupancy gauges are not collected here, they are read off the lot when rendered
+    """
+
+    def __init__(self, latency_buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        """
+        :param latency_buckets: increasing latency bucket upper bounds, in seconds
+        """
+        self.latency_buckets = tuple(latency_buckets)
+        self.parks: Dict[VehicleType, int] = {}
+        self.unparks: Dict[VehicleType, int] = {}
+        self.rejections: Dict[VehicleType, int] = {}
+        self.operations: Dict[str, Histogram] = {
+            "park": Histogram(self.latency_buckets),
+            "unpark": Histogram(self.latency_buckets),
+        }
+        self.fee_models: Dict[str, Histogram] = {}
+        # lots shared between gate threads record from many threads at once, rendering holds
+        # it too so it never sees a half recorded call
+        self.lock = Lock()
+
+    def record_park(self, vehicle_type: VehicleType, parked: bool, elapsed_ns: int) -> None:
+        with self.lock:
+            counter = self.parks if parked else self.rejections
+            counter[vehicle_type] = counter.get(vehicle_type, 0) + 1
+            self.operations["park"].observe(elapsed_ns)
+
+    def record_unpark(self, vehicle_type: VehicleType, elapsed_ns: int) -> None:
+        with self.lock:
+            self.unparks[vehicle_type] = self.unparks.get(vehicle_type, 0) + 1
+            self.operations["unpark"].observe(elapsed_ns)
+
+    def record_fees(self, fee_model: str, elapsed_ns: int) -> None:
+        with self.lock:
+            histogram = self.fee_models.get(fee_model)
+            if histogram is None:
+                histogram = self.fee_models[fee_model] = Histogram(self.latency_buckets)
+            histogram.observe(elapsed_ns)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _render_histogram(lines: List[str], name: str, histogram: Histogram, **labels: str) -> None:
+    cumulative = 0
+    for bound, count in zip(histogram.bounds + (float("inf"),), histogram.counts):
+        cumulative += count
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f"{name}_bucket{_labels(**labels, le=le)} {cumulative}")
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram.total_ns / 1e9!r}")
+    lines.append(f"{name}_count{_labels(**labels)} {cumulative}")
+
+
+def render_metrics(parking_lots: Iterable[ParkingLot]) -> str:
+    """
+    Renders the metrics of the given lots in the Prometheus text exposition format, lots
+    without metrics only export their occupancy gauges
+
+    :return: the exposition, one sample per line
+    """
+    parking_lots = list(parking_lots)
+    metered = [lot for lot in parking_lots if lot.metrics is not None]
+    lines: List[str] = []
+
+    counters = [
+        ("parking_parks_total", "Vehicles parked", "parks"),
+        ("parking_unparks_total", "Vehicles unparked", "unparks"),
+        ("parking_rejections_total", "Parks rejected with no space available", "rejections"),
+    ]
+    for name, help_text, attribute in counters:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for lot in metered:
+            with lot.metrics.lock:
+                values = dict(getattr(lot.metrics, attribute))
+            for vehicle_type, value in values.items():
+                lines.append(
+                    f"{name}{_labels(lot=lot.name, vehicle_type=vehicle_type.name)} {value}"
+                )
+
+    name = "parking_operation_duration_seconds"
+    lines += [f"# HELP {name} Latency of park/unpark calls", f"# TYPE {name} histogram"]
+    for lot in metered:
+        with lot.metrics.lock:
+            for operation, histogram in lot.metrics.operations.items():
+                _render_histogram(lines, name, histogram, lot=lot.name, operation=operation)
+
+    name = "parking_fee_calculation_duration_seconds"
+    lines += [f"# HELP {name} Latency of fee quotes by fee model", f"# TYPE {name} histogram"]
+    for lot in metered:
+        with lot.metrics.lock:
+            for fee_model, histogram in lot.metrics.fee_models.items():
+                _render_histogram(lines, name, histogram, lot=lot.name, fee_model=fee_model)
+
+    gauges: List[Tuple[str, str, str]] = [
+        ("parking_occupied_spots", "Spots occupied", "occupied_spots"),
+        ("parking_spots", "Spots assigned", "spots"),
+    ]
+    for name, help_text, attribute in gauges:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for lot in parking_lots:
+            for vehicle_type, value in dict(getattr(lot, attribute)).items():
+                lines.append(
+                    f"{name}{_labels(lot=lot.name, vehicle_type=vehicle_type.name)} {value}"
+                )
+    return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(
+    parking_lots: Iterable[ParkingLot], host: str = "127.0.0.1", port: int = 9100
+) -> ThreadingHTTPServer:
+    """
+    Serves render_metrics of the given lots on GET /metrics, from a background thread
+
+    :return: the started server, shutdown() stops it
+    """
+    parking_lots = list(parking_lots)
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = render_metrics(parking_lots).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
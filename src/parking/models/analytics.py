@@ -0,0 +1,185 @@
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from parking.models.slips import from_epoch_seconds, to_epoch_seconds
+from parking.models.vehicle import VehicleType
+
+DEFAULT_BUCKET_SECONDS: int = 3600
+DEFAULT_BUCKETS: int = 24 * 7
+
+
+class LotAnalytics:
+    """
+    Running aggregates of a parking lot, updated on every park/unpark so any question a
+    dashboard asks is answered in constant time, without scanning sessions:
+        * occupancy, overall and by vehicle type of the bays taken, a vehicle that overflowed
+          into another vehicle type's bay counts against that vehicle type
+        * revenue, overall and by vehicle type of the vehicles
+        * revenue and peak occupancy per time bucket (an hour by default), for the latest
+          buckets only, kept in fixed size ring buffers
+
+    Events are bucketed by their own time (entry time for parks, exit time for unparks),
+    events older than the oldest bucket kept only count towards the running totals
+    """
+
+    def __init__(
+        self, bucket_seconds: int = DEFAULT_BUCKET_SECONDS, buckets: int = DEFAULT_BUCKETS
+    ):
+        """
+        :param bucket_seconds: width of a time bucket
+        :param buckets: how many of the latest buckets are kept
+        """
+        if bucket_seconds <= 0 or buckets <= 0:
+            raise ValueError("Analytics buckets should be positive")
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self.occupancy_by_type: Dict[VehicleType, int] = {}
+        self.revenue_by_type: Dict[VehicleType, float] = {}
+        self.total_occupancy = 0
+        self.total_revenue = 0.0
+        self.latest_bucket = -1
+        # ring buffers, slot = bucket number % buckets, the slot's bucket number tells stale
+        # slots apart from the ones of the current window
+        self._bucket_numbers = array("q", [-1]) * buckets
+        self._bucket_revenue = array("d", [0.0]) * buckets
+        self._bucket_peak_occupancy = array("q", [0]) * buckets
+
+    def occupancy(self, vehicle_type: Optional[VehicleType] = None) -> int:
+        if vehicle_type is None:
+            return self.total_occupancy
+        return self.occupancy_by_type.get(vehicle_type, 0)
+
+    def revenue(self, vehicle_type: Optional[VehicleType] = None) -> float:
+        if vehicle_type is None:
+            return self.total_revenue
+        return self.revenue_by_type.get(vehicle_type, 0.0)
+
+    def record_park(self, vehicle_type: VehicleType, entry_time: int) -> None:
+        """
+        :param vehicle_type: vehicle type of the bay taken
+        :param entry_time: entry time, in epoch seconds
+        """
+        self.occupancy_by_type[vehicle_type] = self.occupancy_by_type.get(vehicle_type, 0) + 1
+        self.total_occupancy += 1
+        self._record(entry_time, 0.0)
+
+    def record_unpark(
+        self,
+        vehicle_type: VehicleType,
+        exit_time: int,
+        fees_paid: float,
+        bay_type: Optional[VehicleType] = None,
+    ) -> None:
+        """
+        :param exit_time: exit time, in epoch seconds
+        :param bay_type: vehicle type of the bay freed, the vehicle's own by default
+        """
+        self.occupancy_by_type[bay_type or vehicle_type] -= 1
+        self.total_occupancy -= 1
+        self.revenue_by_type[vehicle_type] = (
+            self.revenue_by_type.get(vehicle_type, 0.0) + fees_paid
+        )
+        self.total_revenue += fees_paid
+        self._record(exit_time, fees_paid)
+
+    def record_parks(self, parks: Iterable[Tuple[VehicleType, int]]) -> None:
+        """
+        Records many parks at once, as record_park would one by one
+
+        :param parks: (vehicle type of the bay taken, entry time) per park
+        """
+        occupancy_by_type = self.occupancy_by_type
+        record = self._record
+        for vehicle_type, entry_time in parks:
+            occupancy_by_type[vehicle_type] = occupancy_by_type.get(vehicle_type, 0) + 1
+            self.total_occupancy += 1
+            record(entry_time, 0.0)
+
+    def record_unparks(
+        self, unparks: Iterable[Tuple[VehicleType, int, float, VehicleType]]
+    ) -> None:
+        """
+        Records many unparks at once, as record_unpark would one by one
+
+        :param unparks: (vehicle type, exit time, fees paid, vehicle type of the bay freed) per
+                        unpark
+        """
+        occupancy_by_type = self.occupancy_by_type
+        revenue_by_type = self.revenue_by_type
+        record = self._record
+        for vehicle_type, exit_time, fees_paid, bay_type in unparks:
+            occupancy_by_type[bay_type] -= 1
+            self.total_occupancy -= 1
+            revenue_by_type[vehicle_type] = revenue_by_type.get(vehicle_type, 0.0) + fees_paid
+            self.total_revenue += fees_paid
+            record(exit_time, fees_paid)
+
+    def reset_occupancy(self, occupancy_by_type: Dict[VehicleType, int]) -> None:
+        """
+        Replaces the running occupancy, e.g. after the lot state was restored
+        """
+        self.occupancy_by_type = dict(occupancy_by_type)
+        self.total_occupancy = sum(occupancy_by_type.values())
+
+    def _slot(self, bucket: int) -> int:
+        """
+        :return: the ring slot of a bucket, reset if it held an older bucket, -1 if the bucket
+                 is older than the ones kept
+        """
+        if bucket <= self.latest_bucket - self.buckets:
+            return -1
+        slot = bucket % self.buckets
+        if self._bucket_numbers[slot] != bucket:
+            if self._bucket_numbers[slot] > bucket:
+                return -1
+            self._bucket_numbers[slot] = bucket
+            self._bucket_revenue[slot] = 0.0
+            self._bucket_peak_occupancy[slot] = 0
+        self.latest_bucket = max(self.latest_bucket, bucket)
+        return slot
+
+    def _record(self, moment: int, fees_paid: float) -> None:
+        slot = self._slot(moment // self.bucket_seconds)
+        if slot >= 0:
+            self._bucket_revenue[slot] += fees_paid
+            if self.total_occupancy > self._bucket_peak_occupancy[slot]:
+                self._bucket_peak_occupancy[slot] = self.total_occupancy
+
+    def _kept_slot(self, moment: datetime) -> int:
+        bucket = to_epoch_seconds(moment) // self.bucket_seconds
+        slot = bucket % self.buckets
+        return slot if self._bucket_numbers[slot] == bucket else -1
+
+    def revenue_in_bucket(self, moment: datetime) -> float:
+        """
+        :return: revenue of the time bucket the moment falls in, e.g. "revenue this hour"
+        """
+        slot = self._kept_slot(moment)
+        return self._bucket_revenue[slot] if slot >= 0 else 0.0
+
+    def peak_occupancy_in_bucket(self, moment: datetime) -> int:
+        """
+        :return: highest occupancy seen by the events of the time bucket the moment falls in
+        """
+        slot = self._kept_slot(moment)
+        return self._bucket_peak_occupancy[slot] if slot >= 0 else 0
+
+    def series(self) -> List[Tuple[datetime, float, int]]:
+        """
+        :return: (bucket start, revenue, peak occupancy) of the kept buckets that saw events,
+                 oldest first
+        """
+        kept = sorted(
+            (bucket, slot)
+            for slot, bucket in enumerate(self._bucket_numbers)
+            if bucket > self.latest_bucket - self.buckets and bucket >= 0
+        )
+        return [
+            (
+                from_epoch_seconds(bucket * self.bucket_seconds),
+                self._bucket_revenue[slot],
+                self._bucket_peak_occupancy[slot],
+            )
+            for bucket, slot in kept
+        ]
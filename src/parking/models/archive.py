@@ -0,0 +1,143 @@
+import warnings
+from array import array
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from parking.models.slips import from_epoch_seconds
+from parking.models.vehicle import VEHICLE_TYPES, VEHICLE_TYPE_CODES, VehicleType
+
+DEFAULT_MAX_SESSIONS: int = 10_000
+
+
+class ClosedSession(NamedTuple):
+    ticket_number: int
+    vehicle_type: VehicleType
+    entry_datetime: datetime
+    exit_datetime: datetime
+    fees_paid: float
+
+
+def discard_spilled(archive: "SessionArchive") -> None:
+    """
+    An on_spill for archives whose closed sessions are not needed, they are dropped without
+    the warning an archive with no on_spill gives
+    """
+
+
+class SessionArchive:
+    """
+    A compact, column per field record of parking sessions that have been closed.
+
+    Every column is a typed array so a closed session costs a few dozen bytes instead of a
+    ticket object, once max_sessions rows are held the archive is handed to on_spill (if any)
+    and emptied, so resident memory stays bounded whatever the lifetime traffic is. Without an
+    on_spill the spilled rows are lost, the first spill warns about it
+    """
+
+    def __init__(
+        self,
+        max_sessions: Optional[int] = DEFAULT_MAX_SESSIONS,
+        on_spill: Optional[Callable[["SessionArchive"], None]] = None,
+    ):
+        """
+        :param max_sessions: rows held before spilling, None keeps every closed session
+        :param on_spill: called with the full archive right before it is emptied,
+                         e.g. to flush the rows to disk, rows are dropped if not assigned
+        """
+        if max_sessions is not None and max_sessions <= 0:
+            raise ValueError("Archive size should be positive")
+        self.max_sessions = max_sessions
+        self.on_spill = on_spill
+        self.spilled_sessions = 0
+        self._warned_of_loss = False
+        self.ticket_numbers = array("q")
+        self.vehicle_types = array("b")
+        # epoch seconds, see slips.EPOCH
+        self.entry_times = array("q")
+        self.exit_times = array("q")
+        self.fees = array("d")
+
+    def __len__(self) -> int:
+        return len(self.ticket_numbers)
+
+    def __iter__(self) -> Iterator[ClosedSession]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, index: int) -> ClosedSession:
+        return ClosedSession(
+            self.ticket_numbers[index],
+            VEHICLE_TYPES[self.vehicle_types[index]],
+            from_epoch_seconds(self.entry_times[index]),
+            from_epoch_seconds(self.exit_times[index]),
+            self.fees[index],
+        )
+
+    def append(
+        self,
+        ticket_number: int,
+        vehicle_type: VehicleType,
+        entry_time: int,
+        exit_time: int,
+        fees_paid: float,
+    ) -> None:
+        """
+        Records a closed session, spilling the archive if it reached max_sessions
+
+        :param entry_time: entry time, in epoch seconds
+        :param exit_time: exit time, in epoch seconds
+        """
+        self.ticket_numbers.append(ticket_number)
+        self.vehicle_types.append(VEHICLE_TYPE_CODES[vehicle_type])
+        self.entry_times.append(entry_time)
+        self.exit_times.append(exit_time)
+        self.fees.append(fees_paid)
+
+        if self.max_sessions is not None and len(self) >= self.max_sessions:
+            self.spill()
+
+    def extend(self, sessions: Iterable[Tuple[int, VehicleType, int, int, float]]) -> None:
+        """
+        Records many closed sessions, as append would one by one
+
+        :param sessions: (ticket number, vehicle type, entry time, exit time, fees)
+        """
+        codes, max_sessions = VEHICLE_TYPE_CODES, self.max_sessions
+        ticket_numbers, vehicle_types = self.ticket_numbers.append, self.vehicle_types.append
+        entry_times, exit_times = self.entry_times.append, self.exit_times.append
+        fees = self.fees.append
+        for ticket_number, vehicle_type, entry_time, exit_time, fees_paid in sessions:
+            ticket_numbers(ticket_number)
+            vehicle_types(codes[vehicle_type])
+            entry_times(entry_time)
+            exit_times(exit_time)
+            fees(fees_paid)
+            if max_sessions is not None and len(self.ticket_numbers) >= max_sessions:
+                self.spill()
+
+    def spill(self) -> None:
+        """
+        Hands the held rows to on_spill and empties the archive
+        """
+        if self.on_spill is not None:
+            self.on_spill(self)
+        elif not self._warned_of_loss:
+            self._warned_of_loss = True
+            warnings.warn(
+                f"Session archive spilled {len(self)} closed sessions with no on_spill, they are "
+                "dropped, pass on_spill to keep them or max_sessions=None to hold every one",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+        self.spilled_sessions += len(self)
+        self.clear()
+
+    def clear(self) -> None:
+        for column in (
+            self.ticket_numbers,
+            self.vehicle_types,
+            self.entry_times,
+            self.exit_times,
+            self.fees,
+        ):
+            del column[:]
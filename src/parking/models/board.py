@@ -0,0 +1,191 @@
+import struct
+import sys
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from types import TracebackType
+from typing import Dict, NamedTuple, Optional, Type
+
+from parking.models.vehicle import VEHICLE_TYPE_CODES, VEHICLE_TYPES, VehicleType
+
+# header: magic and slot count, then a slot per vehicle type code of its sequence, occupied
+# and total spots
+BOARD_MAGIC: bytes = b"PKBOARD1"
+_HEADER = struct.Struct("<8sq")
+_SEQUENCE = struct.Struct("<q")
+_COUNTS = struct.Struct("<qq")
+_SLOT_SIZE = _SEQUENCE.size + _COUNTS.size
+# a reader spins this many times on a slot being written, then backs off, sleeping twice as
+# long every time up to the longest back-off
+_READ_SPINS = 100
+_SHORTEST_BACKOFF = 0.000_01
+_LONGEST_BACKOFF = 0.001
+DEFAULT_READ_TIMEOUT: float = 1.0
+
+
+class Occupancy(NamedTuple):
+    occupied: int
+    total: int
+
+    @property
+    def free(self) -> int:
+        return max(0, self.total - self.occupied)
+
+
+def _slot(code: int) -> int:
+    return _HEADER.size + code * _SLOT_SIZE
+
+
+def _buffer(memory: SharedMemory) -> memoryview:
+    if memory.buf is None:
+        raise ValueError(f"Occupancy board {memory.name} is closed")
+    return memory.buf
+
+
+class OccupancyBoard:
+    """
+    Publishes a parking lot's occupied and total spots per vehicle type into a shared memory
+    segment, for entrance signs and dashboards in other processes, see OccupancyBoardReader.
+
+    Every vehicle type's slot is guarded by a seqlock: its sequence is odd while the slot is
+    being written, and bumped again once written. Readers retry until they read the same even
+    sequence before and after the counts, so they never lock and never block a park/unpark.
+    A slot is only written under the lot's lock of its vehicle type, so it has a single writer.
+    Readers rely on a process's stores being seen in order by other processes, as on x86
+    """
+
+    def __init__(self, spots: Dict[VehicleType, int], name: Optional[str] = None):
+        """
+        :param spots: how many spots are assigned for each vehicle type
+        :param name: name of the shared memory segment, a unique one is made up if not assigned
+        """
+        self._memory = SharedMemory(name, create=True, size=_slot(len(VEHICLE_TYPES)))
+        self._sequences = [0] * len(VEHICLE_TYPES)
+        self._totals = [0] * len(VEHICLE_TYPES)
+        self._buffer = buffer = _buffer(self._memory)
+        _HEADER.pack_into(buffer, 0, BOARD_MAGIC, len(VEHICLE_TYPES))
+        for vehicle_type, total in spots.items():
+            code = VEHICLE_TYPE_CODES[vehicle_type]
+            self._totals[code] = total
+            _COUNTS.pack_into(buffer, _slot(code) + _SEQUENCE.size, 0, total)
+
+    @property
+    def name(self) -> str:
+        """
+        :return: name readers attach to the board by
+        """
+        return self._memory.name
+
+    def publish(self, vehicle_type: VehicleType, occupied: int) -> None:
+        code = VEHICLE_TYPE_CODES[vehicle_type]
+        buffer, offset, sequence = self._buffer, _slot(code), self._sequences[code]
+        _SEQUENCE.pack_into(buffer, offset, sequence + 1)
+        _COUNTS.pack_into(buffer, offset + _SEQUENCE.size, occupied, self._totals[code])
+        _SEQUENCE.pack_into(buffer, offset, sequence + 2)
+        self._sequences[code] = sequence + 2
+
+    def publish_all(self, occupied_spots: Dict[VehicleType, int]) -> None:
+        for vehicle_type, occupied in occupied_spots.items():
+            self.publish(vehicle_type, occupied)
+
+    def close(self) -> None:
+        """
+        Takes the board down, readers attached keep their mapping but no new one can attach
+        """
+        self._memory.close()
+        self._memory.unlink()
+
+    def __enter__(self) -> "OccupancyBoard":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+class OccupancyBoardReader:
+    """
+    Reads the occupancy an OccupancyBoard publishes, from any process, straight from the
+    shared memory without any round-trip to the lot.
+
+    A slot being written is retried, spinning at first then backing off, so a writer that
+    died mid-write does not hang its readers: they give up once the slot stayed unreadable
+    for timeout seconds
+    """
+
+    def __init__(self, name: str, timeout: float = DEFAULT_READ_TIMEOUT):
+        """
+        :param name: name of the board, see OccupancyBoard.name
+        :param timeout: seconds a read retries a slot being written before it fails
+        """
+        self.timeout = timeout
+        self._memory = SharedMemory(name)
+        if sys.version_info < (3, 13):
+            # attaching registers the segment to be unlinked when this process exits, the
+            # board owns it. Python 3.13 and later only track segments they create
+            resource_tracker.unregister(f"/{self._memory.name}", "shared_memory")
+        self._buffer = _buffer(self._memory)
+        magic, _ = _HEADER.unpack_from(self._buffer)
+        if magic != BOARD_MAGIC:
+            self._memory.close()
+            raise ValueError(f"{name} is not an occupancy board")
+
+    def read(self, vehicle_type: VehicleType) -> Occupancy:
+        """
+        :return: the occupancy last published for the vehicle type
+        :raise TimeoutError: if the slot stayed being written for timeout seconds, e.g. its
+                             writer died mid-write
+        """
+        buffer, offset = self._buffer, _slot(VEHICLE_TYPE_CODES[vehicle_type])
+        counts = offset + _SEQUENCE.size
+        spins, backoff, deadline = 0, _SHORTEST_BACKOFF, 0.0
+        while True:
+            (before,) = _SEQUENCE.unpack_from(buffer, offset)
+            # an odd sequence is being written
+            if not before % 2:
+                occupied, total = _COUNTS.unpack_from(buffer, counts)
+                (after,) = _SEQUENCE.unpack_from(buffer, offset)
+                if before == after:
+                    return Occupancy(occupied, total)
+            spins += 1
+            if spins < _READ_SPINS:
+                continue
+            if spins == _READ_SPINS:
+                deadline = time.monotonic() + self.timeout
+            elif time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"Occupancy of {vehicle_type.name} stayed unreadable for {self.timeout}s, "
+                    "its writer may have died mid-write"
+                )
+            time.sleep(backoff)
+            backoff = min(2 * backoff, _LONGEST_BACKOFF)
+
+    def snapshot(self) -> Dict[VehicleType, Occupancy]:
+        """
+        :return: occupancy of every vehicle type the lot has spots for, each consistent on its
+                 own
+        """
+        snapshot: Dict[VehicleType, Occupancy] = {}
+        for vehicle_type in VEHICLE_TYPES:
+            occupancy = self.read(vehicle_type)
+            if occupancy.total:
+                snapshot[vehicle_type] = occupancy
+        return snapshot
+
+    def close(self) -> None:
+        self._memory.close()
+
+    def __enter__(self) -> "OccupancyBoardReader":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
@@ -0,0 +1,61 @@
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Tuple
+
+from parking.models.slips import to_epoch_seconds
+
+
+class Clock(ABC):
+    """
+    Where a parking lot reads the time from, in whole epoch seconds (see slips.EPOCH).
+    A lot reads its clock at most once per operation, so the duration a vehicle is billed for
+    and the exit time printed on its receipt always agree
+    """
+
+    @abstractmethod
+    def now(self) -> int:
+        pass
+
+
+class SystemClock(Clock):
+    """
+    The wall clock, in local time as datetime.now() tells it. It is read off time.time() and
+    shifted by the local UTC offset, which is only looked up again on a new minute, as offsets
+    only ever change on whole minutes
+    """
+
+    def __init__(self) -> None:
+        # the minute the offset was looked up for and the offset, swapped together so threads
+        # sharing the clock never pair a minute with another minute's offset
+        self._offset: Tuple[int, int] = (-1, 0)
+
+    def now(self) -> int:
+        now = int(time.time())
+        minute, offset = self._offset
+        if now // 60 != minute:
+            offset = time.localtime(now).tm_gmtoff
+            self._offset = (now // 60, offset)
+        return now + offset
+
+
+class SimulatedClock(Clock):
+    """
+    A clock that only moves when told to, for replays and simulations: parks and unparks
+    happen at whatever time it was set to
+    """
+
+    def __init__(self, start: datetime):
+        """
+        :param start: time the clock starts at
+        """
+        self.time: int = to_epoch_seconds(start)
+
+    def now(self) -> int:
+        return self.time
+
+    def set(self, moment: datetime) -> None:
+        self.time = to_epoch_seconds(moment)
+
+    def advance(self, seconds: int) -> None:
+        self.time += seconds
@@ -0,0 +1,114 @@
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+DEFAULT_BUCKET_SECONDS: int = 3600
+
+
+class EntryTimeIndex:
+    """
+    Active sessions ordered by entry time, for range queries such as "parked for longer than
+    N hours" without scanning every session. Times are epoch seconds.
+
+    Sessions are bucketed by entry time, buckets are kept in a dict and their start times in a
+    sorted list, so adding/removing a session is O(1) (plus a bisect when a bucket opens or
+    empties) and a range query only visits the buckets it overlaps
+    """
+
+    __slots__ = ("bucket_seconds", "_buckets", "_bucket_keys", "_count")
+
+    def __init__(self, bucket_seconds: int = DEFAULT_BUCKET_SECONDS):
+        """
+        :param bucket_seconds: width of an entry time bucket
+        """
+        if bucket_seconds <= 0:
+            raise ValueError("Index buckets should be positive")
+        self.bucket_seconds = bucket_seconds
+        # bucket number -> {ticket number: entry epoch seconds}
+        self._buckets: Dict[int, Dict[int, int]] = {}
+        self._bucket_keys: List[int] = []
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, ticket_number: int, entry_time: int) -> None:
+        key = entry_time // self.bucket_seconds
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = {}
+            insort(self._bucket_keys, key)
+        if ticket_number not in bucket:
+            self._count += 1
+        bucket[ticket_number] = entry_time
+
+    def add_many(self, sessions: Iterable[Tuple[int, int]]) -> None:
+        """
+        :param sessions: (ticket number, entry time) of the sessions to add
+        """
+        buckets, bucket_seconds = self._buckets, self.bucket_seconds
+        for ticket_number, entry_time in sessions:
+            key = entry_time // bucket_seconds
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = {}
+                insort(self._bucket_keys, key)
+            if ticket_number not in bucket:
+                self._count += 1
+            bucket[ticket_number] = entry_time
+
+    def remove(self, ticket_number: int, entry_time: int) -> None:
+        key = entry_time // self.bucket_seconds
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.pop(ticket_number, None) is None:
+            return
+        self._count -= 1
+        if not bucket:
+            del self._buckets[key]
+            del self._bucket_keys[bisect_left(self._bucket_keys, key)]
+
+    def remove_many(self, sessions: Iterable[Tuple[int, int]]) -> None:
+        """
+        :param sessions: (ticket number, entry time) of the sessions to remove
+        """
+        buckets, bucket_seconds = self._buckets, self.bucket_seconds
+        for ticket_number, entry_time in sessions:
+            key = entry_time // bucket_seconds
+            bucket = buckets.get(key)
+            if bucket is None or bucket.pop(ticket_number, None) is None:
+                continue
+            self._count -= 1
+            if not bucket:
+                del buckets[key]
+                del self._bucket_keys[bisect_left(self._bucket_keys, key)]
+
+    def clear(self) -> None:
+        self._buckets.clear()
+        self._bucket_keys.clear()
+        self._count = 0
+
+    def _between(self, start_time: int, end_time: int) -> Iterator[Tuple[int, int]]:
+        first = bisect_left(self._bucket_keys, start_time // self.bucket_seconds)
+        for key in self._bucket_keys[first:]:
+            if key * self.bucket_seconds >= end_time:
+                return
+            yield from sorted(
+                (entry_time, ticket_number)
+                for ticket_number, entry_time in self._buckets[key].items()
+                if start_time <= entry_time < end_time
+            )
+
+    def between(self, start_time: int, end_time: int) -> List[Tuple[int, int]]:
+        """
+        :return: (entry time, ticket number) of sessions that entered within
+                 [start_time, end_time), oldest first
+        """
+        return list(self._between(start_time, end_time))
+
+    def entered_before(self, moment: int) -> List[int]:
+        """
+        :return: ticket numbers of sessions that entered before the moment, oldest first
+        """
+        if not self._bucket_keys:
+            return []
+        oldest = self._bucket_keys[0] * self.bucket_seconds
+        return [ticket_number for _, ticket_number in self._between(oldest, moment)]
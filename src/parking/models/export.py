@@ -0,0 +1,231 @@
+import csv
+import mmap
+import struct
+import sys
+from abc import ABC, abstractmethod
+from array import array
+from pathlib import Path
+from types import TracebackType
+from typing import IO, Iterable, Iterator, List, NamedTuple, Optional, Type, Union
+
+from parking.models.slips import CompactReceipt, Receipt, to_epoch_seconds
+
+DEFAULT_CHUNK_RECEIPTS: int = 65_536
+CSV_HEADER: List[str] = ["receipt_number", "entry_time", "exit_time", "fees_paid"]
+# file header: magic and receipt count, then chunks of a receipt count and its 4 columns
+RECEIPTS_MAGIC: bytes = b"PKRCPT01"
+_FILE_HEADER = struct.Struct("<8sQ")
+_CHUNK_HEADER = struct.Struct("<Q")
+
+
+class ReceiptExporter(ABC):
+    """
+    Streams receipts to a settlement file. Receipts are buffered column by column in typed
+    arrays and written chunk_size at a time, so memory stays bounded whatever the number of
+    receipts and no object is built per receipt.
+    Times are exported as the session store keeps them, whole seconds since 1970-01-01 00:00
+    of the lot's local wall clock, see slips.EPOCH. They are not Unix timestamps, they differ
+    by the lot's UTC offset, from_epoch_seconds reads them back as local date-times
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_RECEIPTS):
+        """
+        :param chunk_size: receipts buffered before they are written together
+        """
+        if chunk_size <= 0:
+            raise ValueError("Export chunk size should be positive")
+        self.chunk_size = chunk_size
+        self.exported = 0
+        self.receipt_numbers = array("q")
+        self.entry_times = array("q")
+        self.exit_times = array("q")
+        self.fees = array("d")
+
+    def write(self, receipt: Union[Receipt, CompactReceipt]) -> None:
+        self.write_many((receipt,))
+
+    def write_many(self, receipts: Iterable[Union[Receipt, CompactReceipt]]) -> None:
+        """
+        :param receipts: receipts to export, e.g. a generator over a day of receipts
+        """
+        receipt_numbers, fees = self.receipt_numbers.append, self.fees.append
+        entry_times, exit_times = self.entry_times.append, self.exit_times.append
+        chunk_size = self.chunk_size
+        for receipt in receipts:
+            receipt_numbers(receipt.receipt_number)
+            # compact receipts hold epoch seconds already, no date-time is built for them
+            if isinstance(receipt, CompactReceipt):
+                entry_times(receipt.entry_time)
+                exit_times(receipt.exit_time)
+            else:
+                entry_times(to_epoch_seconds(receipt.entry_datetime))
+                exit_times(to_epoch_seconds(receipt.exit_datetime))
+            fees(receipt.fees_paid)
+            if len(self.receipt_numbers) >= chunk_size:
+                self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the buffered receipts
+        """
+        if not self.receipt_numbers:
+            return
+        self._write_chunk()
+        self.exported += len(self.receipt_numbers)
+        for column in (self.receipt_numbers, self.entry_times, self.exit_times, self.fees):
+            del column[:]
+
+    @abstractmethod
+    def _write_chunk(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "ReceiptExporter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+class CsvReceiptExporter(ReceiptExporter):
+    """
+    Exports receipts as CSV, one receipt per line after a header line, fees are written as
+    integers whenever they are whole, as fee models charge them
+    """
+
+    def __init__(self, path: Union[str, Path], chunk_size: int = DEFAULT_CHUNK_RECEIPTS):
+        """
+        :param path: file to export to, overwritten if present
+        :param chunk_size: receipts buffered before they are written together
+        """
+        super().__init__(chunk_size)
+        self._file: IO[str] = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(CSV_HEADER)
+
+    def _write_chunk(self) -> None:
+        self._writer.writerows(
+            (receipt_number, entry_time, exit_time, int(fees) if fees.is_integer() else fees)
+            for receipt_number, entry_time, exit_time, fees in zip(
+                self.receipt_numbers, self.entry_times, self.exit_times, self.fees
+            )
+        )
+
+    def close(self) -> None:
+        super().close()
+        self._file.close()
+
+
+class BinaryReceiptExporter(ReceiptExporter):
+    """
+    Exports receipts in a fixed-width columnar format meant to be memory-mapped, see
+    BinaryReceiptReader. Every value is 8 bytes little-endian:
+        * a header: the RECEIPTS_MAGIC bytes and the receipt count
+        * chunks: the chunk's receipt count, then its receipt numbers, entry times and exit
+          times (signed integers) and fees (doubles), one column after the other
+    The receipt count is written on close, a file that was not closed reads as empty
+    """
+
+    def __init__(self, path: Union[str, Path], chunk_size: int = DEFAULT_CHUNK_RECEIPTS):
+        """
+        :param path: file to export to, overwritten if present
+        :param chunk_size: receipts buffered before they are written together
+        """
+        super().__init__(chunk_size)
+        self._file: IO[bytes] = open(path, "wb")
+        self._file.write(_FILE_HEADER.pack(RECEIPTS_MAGIC, 0))
+
+    def _write_chunk(self) -> None:
+        self._file.write(_CHUNK_HEADER.pack(len(self.receipt_numbers)))
+        for column in (self.receipt_numbers, self.entry_times, self.exit_times, self.fees):
+            if sys.byteorder == "big":
+                column = array(column.typecode, column)
+                column.byteswap()
+            column.tofile(self._file)
+
+    def close(self) -> None:
+        super().close()
+        self._file.seek(0)
+        self._file.write(_FILE_HEADER.pack(RECEIPTS_MAGIC, self.exported))
+        self._file.close()
+
+
+class ReceiptColumns(NamedTuple):
+    """
+    A chunk of exported receipts, every column is a memoryview straight into the mapped file
+    """
+
+    receipt_numbers: memoryview
+    entry_times: memoryview
+    exit_times: memoryview
+    fees: "memoryview[float]"
+
+
+class BinaryReceiptReader:
+    """
+    Memory-maps a file written by BinaryReceiptExporter, its columns are scanned in place
+    without copying or building an object per receipt. The columns handed out must be
+    released before the reader is closed
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        :param path: file written by BinaryReceiptExporter
+        """
+        if sys.byteorder == "big":
+            raise ValueError("Exported receipts can only be mapped on little-endian machines")
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _FILE_HEADER.size:
+            magic, self._count = b"", 0
+        else:
+            magic, self._count = _FILE_HEADER.unpack_from(self._map)
+        if magic != RECEIPTS_MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a receipts export")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def chunks(self) -> Iterator[ReceiptColumns]:
+        view = memoryview(self._map)
+        offset, remaining = _FILE_HEADER.size, self._count
+        try:
+            while remaining:
+                (count,) = _CHUNK_HEADER.unpack_from(view, offset)
+                offset += _CHUNK_HEADER.size
+                numbers_end, entries_end = count, 2 * count
+                integers_end = offset + 24 * count
+                fees_end = integers_end + 8 * count
+                integers = view[offset:integers_end].cast("q")
+                yield ReceiptColumns(
+                    integers[:numbers_end],
+                    integers[numbers_end:entries_end],
+                    integers[entries_end:],
+                    view[integers_end:fees_end].cast("d"),
+                )
+                offset = fees_end
+                remaining -= count
+        finally:
+            view.release()
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self) -> "BinaryReceiptReader":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
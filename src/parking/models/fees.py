@@ -1,7 +1,47 @@
 import math
 from abc import ABC, abstractmethod
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
 
-from parking.models.vehicle import VehicleType
+from parking.models.vehicle import VEHICLE_TYPE_CODES, VEHICLE_TYPES, VehicleType
+
+if TYPE_CHECKING:
+    import numpy as np
+    import numpy.typing as npt
+
+
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError as e:  # pragma: no cover - depends on the environment
+        raise ImportError(
+            "Batch fee calculation requires numpy, install the batch extra: "
+            "pip install 'parking-lot-demo[batch]'"
+        ) from e
+    return numpy
+
+
+def _group_by_vehicle_type(
+    vehicle_types: "npt.ArrayLike", durations_in_hours: "npt.ArrayLike"
+) -> Tuple["npt.NDArray[np.float64]", Iterator[Tuple[VehicleType, "npt.NDArray[np.bool_]"]]]:
+    """
+    Normalises batch inputs, vehicle types can either be VehicleType members or their
+    VEHICLE_TYPE_CODES, and yields a mask per vehicle type present in the batch
+    """
+    np = _numpy()
+    durations = np.asarray(durations_in_hours, dtype=np.float64)
+    types = np.asarray(vehicle_types)
+    if types.dtype == object:
+        types = np.fromiter(
+            (VEHICLE_TYPE_CODES[vehicle_type] for vehicle_type in types.ravel()),
+            dtype=np.int8,
+            count=types.size,
+        ).reshape(types.shape)
+    if types.shape != durations.shape:
+        raise ValueError("Vehicle types and durations should have the same shape")
+
+    return durations, ((VEHICLE_TYPES[code], types == code) for code in np.unique(types))
 
 
 class FeeModel(ABC):
@@ -21,57 +61,231 @@ class FeeModel(ABC):
         """
         pass
 
+    def calculate_fees_batch(
+        self, vehicle_types: "npt.ArrayLike", durations_in_hours: "npt.ArrayLike"
+    ) -> "npt.NDArray[np.int64]":
+        """
+        Prices many bookings at once, gives the same fees calculate_fees gives one by one.
+        Falls back to calling calculate_fees per booking, subclasses override it with a
+        vectorised version. Requires numpy.
 
-class MallFeeModel(FeeModel):
-    def calculate_fees(self, vehicle_type: VehicleType, duration_in_hours: float) -> int:
-        fees = {
-            VehicleType.MOTORCYCLE_SCOOTER: 10,
-            VehicleType.CAR_SUV: 20,
-            VehicleType.BUS_TRUCK: 50,
+        :param vehicle_types: array of VehicleType members or their VEHICLE_TYPE_CODES
+        :param duration_in_hours: array of durations, same shape as vehicle_types
+        :return: array of total fees to be paid on exit
+        """
+        np = _numpy()
+        durations, masks = _group_by_vehicle_type(vehicle_types, durations_in_hours)
+        fees = np.zeros(durations.shape, dtype=np.int64)
+        for vehicle_type, mask in masks:
+            fees[mask] = [
+                self.calculate_fees(vehicle_type, float(duration)) for duration in durations[mask]
+            ]
+        return fees  # type: ignore[no-any-return]
+
+    def billable_bucket(
+        self, vehicle_type: VehicleType, duration_in_hours: float
+    ) -> Optional[int]:
+        """
+        Tells which durations calculate_fees charges the same, so fee quotes can be memoised,
+        see quotes.py. Models that cannot tell return None and are never memoised
+
+        :return: a bucket number shared by every duration charged the same, or None
+        """
+        return None
+
+    def next_fee_change(
+        self, vehicle_type: VehicleType, duration_in_hours: float
+    ) -> Optional[float]:
+        """
+        Tells when a parked vehicle is next charged more, e.g. to warn drivers before a new
+        day is charged. Models that cannot tell return None
+
+        :return: the next duration, in hours, at (bands) or right past (started units) which
+                 fees change, or None
+        """
+        return None
+
+
+FeeBand = Tuple[int, int, int]
+
+
+@dataclass(frozen=True)
+class Rate:
+    """
+    Declarative rates of a single vehicle type:
+        * bands: (start hour, end hour, fee) bands, contiguous and starting at hour 0
+        * cumulative: if set, every band the duration reached is charged (on top of each other),
+          otherwise only the band the duration falls in is charged
+        * overflow_fee: charged per started overflow_unit_hours once past the last band
+        * overflow_from_entry: if set, overflow units are counted from entry and replace the
+          band fees, otherwise they are counted past the last band and added on top of them
+    """
+
+    bands: Tuple[FeeBand, ...] = ()
+    cumulative: bool = False
+    overflow_fee: int = 0
+    overflow_unit_hours: int = 1
+    overflow_from_entry: bool = False
+
+
+class _CompiledRate(NamedTuple):
+    band_starts: List[int]
+    band_fees: List[int]
+    overflow_from: int
+    overflow_base: int
+    overflow_offset: int
+    overflow_unit_hours: int
+    overflow_fee: int
+    # every breakpoint falls on a whole hour, fees only change at whole hours
+    whole_hours: bool
+
+
+def _compile_rate(rate: Rate) -> _CompiledRate:
+    band_starts: List[int] = []
+    band_fees: List[int] = []
+    hours_passed = 0
+    for start, end, fee in rate.bands:
+        if start != hours_passed or end <= start:
+            raise ValueError("Fee bands should be contiguous and start at hour 0")
+        band_starts.append(start)
+        band_fees.append(fee + band_fees[-1] if rate.cumulative and band_fees else fee)
+        hours_passed = end
+
+    if rate.overflow_from_entry or not band_fees:
+        overflow_base, overflow_offset = 0, 0
+    else:
+        if hours_passed % rate.overflow_unit_hours:
+            raise ValueError("Fee bands should end on a whole overflow unit")
+        overflow_base = band_fees[-1]
+        overflow_offset = hours_passed // rate.overflow_unit_hours
+
+    return _CompiledRate(
+        band_starts,
+        band_fees,
+        hours_passed,
+        overflow_base,
+        overflow_offset,
+        rate.overflow_unit_hours,
+        rate.overflow_fee,
+        all(float(start).is_integer() for start in band_starts)
+        and float(hours_passed).is_integer()
+        and float(rate.overflow_unit_hours).is_integer(),
+    )
+
+
+class TariffFeeModel(FeeModel):
+    """
+    A fee model described by a Rate per vehicle type, rates are compiled once into sorted band
+    breakpoints so pricing is a bisect over a handful of integers, new tariffs only need new
+    Rate instances instead of a new FeeModel subclass
+    """
+
+    def __init__(self, name: str, rates: Dict[VehicleType, Rate]):
+        """
+        :param name: name of the tariff, used in error messages
+        :param rates: rates by vehicle type, unlisted vehicle types are not supported
+        """
+        self.name = name
+        self.rates = dict(rates)
+        self._compiled = {
+            vehicle_type: _compile_rate(rate) for vehicle_type, rate in self.rates.items()
         }
-        return fees[vehicle_type] * math.ceil(duration_in_hours)
 
+    def _compiled_rate(self, vehicle_type: VehicleType) -> _CompiledRate:
+        try:
+            return self._compiled[vehicle_type]
+        except KeyError:
+            raise ValueError(f"Unsupported vehicle type for {self.name}") from None
 
-class StadiumFeeModel(FeeModel):
-    def calculate_fees(self, vehicle_type: VehicleType, duration_in_hours: float) -> int:
-        if vehicle_type == VehicleType.MOTORCYCLE_SCOOTER:
-            fee_intervals = [(0, 4, 30), (4, 12, 60)]
-            per_hour_fee = 100
-        elif vehicle_type == VehicleType.CAR_SUV:
-            fee_intervals = [(0, 4, 60), (4, 12, 120)]
-            per_hour_fee = 200
-        else:
-            raise ValueError("Unsupported vehicle type for StadiumFeeModel")
-
-        total_fee = 0
-        hours_passed = 0
-        for start, end, fee in fee_intervals:
-            if start <= hours_passed < end and hours_passed <= duration_in_hours:
-                total_fee += fee
-            hours_passed += end - start
-
-        charges_past_twelve = 0
-        if duration_in_hours - hours_passed > 0:
-            charges_past_twelve = (math.ceil(duration_in_hours) - hours_passed) * per_hour_fee
-
-        return total_fee + charges_past_twelve
-
-
-class AirportFeeModel(FeeModel):
     def calculate_fees(self, vehicle_type: VehicleType, duration_in_hours: float) -> int:
-        if vehicle_type == VehicleType.MOTORCYCLE_SCOOTER:
-            fee_intervals = [(0, 1, 0), (1, 8, 40), (8, 24, 60)]
-            per_day_fee = 80
-        elif vehicle_type == VehicleType.CAR_SUV:
-            fee_intervals = [(0, 12, 60), (12, 24, 80)]
-            per_day_fee = 100
-        else:
-            raise ValueError("Unsupported vehicle type for AirportFeeModel")
-
-        if duration_in_hours < 24:
-            for start, end, fee in fee_intervals:
-                if start <= duration_in_hours < end:
-                    return fee
-
-        total_days = math.ceil(duration_in_hours / 24)
-        return total_days * per_day_fee
+        rate = self._compiled_rate(vehicle_type)
+        if duration_in_hours >= rate.overflow_from:
+            units = math.ceil(duration_in_hours / rate.overflow_unit_hours)
+            return rate.overflow_base + (units - rate.overflow_offset) * rate.overflow_fee
+
+        band = bisect_right(rate.band_starts, duration_in_hours) - 1
+        return rate.band_fees[band] if band >= 0 else 0
+
+    def billable_bucket(
+        self, vehicle_type: VehicleType, duration_in_hours: float
+    ) -> Optional[int]:
+        # with whole hour breakpoints, every duration strictly between two whole hours is
+        # charged the same, whole hours get a bucket of their own as bands start on them
+        if not self._compiled_rate(vehicle_type).whole_hours:
+            return None
+        hours = math.floor(duration_in_hours)
+        return 2 * hours + (duration_in_hours != hours)
+
+    def next_fee_change(
+        self, vehicle_type: VehicleType, duration_in_hours: float
+    ) -> Optional[float]:
+        rate = self._compiled_rate(vehicle_type)
+        if duration_in_hours >= rate.overflow_from:
+            if not rate.overflow_fee:
+                return None
+            # a started unit is charged in full, fees change right past a whole unit
+            unit = rate.overflow_unit_hours
+            return float((math.floor(duration_in_hours / unit) + 1) * unit)
+
+        band = bisect_right(rate.band_starts, duration_in_hours)
+        return float(
+            rate.band_starts[band] if band < len(rate.band_starts) else rate.overflow_from
+        )
+
+    def calculate_fees_batch(
+        self, vehicle_types: "npt.ArrayLike", durations_in_hours: "npt.ArrayLike"
+    ) -> "npt.NDArray[np.int64]":
+        np = _numpy()
+        durations, masks = _group_by_vehicle_type(vehicle_types, durations_in_hours)
+        fees = np.zeros(durations.shape, dtype=np.int64)
+        for vehicle_type, mask in masks:
+            rate = self._compiled_rate(vehicle_type)
+            d = durations[mask]
+            units = np.ceil(d / rate.overflow_unit_hours).astype(np.int64)
+            overflow = rate.overflow_base + (units - rate.overflow_offset) * rate.overflow_fee
+            band = np.searchsorted(rate.band_starts, d, side="right") - 1
+            band_fees = np.asarray([0] + rate.band_fees, dtype=np.int64)[band + 1]
+            fees[mask] = np.where(d >= rate.overflow_from, overflow, band_fees)
+        return fees  # type: ignore[no-any-return]
+
+
+MALL_RATES: Dict[VehicleType, Rate] = {
+    VehicleType.MOTORCYCLE_SCOOTER: Rate(overflow_fee=10),
+    VehicleType.CAR_SUV: Rate(overflow_fee=20),
+    VehicleType.BUS_TRUCK: Rate(overflow_fee=50),
+}
+STADIUM_RATES: Dict[VehicleType, Rate] = {
+    VehicleType.MOTORCYCLE_SCOOTER: Rate(
+        bands=((0, 4, 30), (4, 12, 60)), cumulative=True, overflow_fee=100
+    ),
+    VehicleType.CAR_SUV: Rate(bands=((0, 4, 60), (4, 12, 120)), cumulative=True, overflow_fee=200),
+}
+AIRPORT_RATES: Dict[VehicleType, Rate] = {
+    VehicleType.MOTORCYCLE_SCOOTER: Rate(
+        bands=((0, 1, 0), (1, 8, 40), (8, 24, 60)),
+        overflow_fee=80,
+        overflow_unit_hours=24,
+        overflow_from_entry=True,
+    ),
+    VehicleType.CAR_SUV: Rate(
+        bands=((0, 12, 60), (12, 24, 80)),
+        overflow_fee=100,
+        overflow_unit_hours=24,
+        overflow_from_entry=True,
+    ),
+}
+
+
+class MallFeeModel(TariffFeeModel):
+    def __init__(self) -> None:
+        super().__init__("MallFeeModel", MALL_RATES)
+
+
+class StadiumFeeModel(TariffFeeModel):
+    def __init__(self) -> None:
+        super().__init__("StadiumFeeModel", STADIUM_RATES)
+
+
+class AirportFeeModel(TariffFeeModel):
+    def __init__(self) -> None:
+        super().__init__("AirportFeeModel", AIRPORT_RATES)
@@ -0,0 +1,253 @@
+from array import array
+from bisect import bisect_right
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from parking.models.spots import FreeSpotIndex
+from parking.models.vehicle import VehicleType
+
+
+class Zone(NamedTuple):
+    """
+    A run of bays of one vehicle type on one floor of a garage
+    """
+
+    name: str
+    floor: int
+    vehicle_type: VehicleType
+    spots: int
+    # from every entrance of the garage, in whatever unit the site measures, e.g. meters
+    distances: Dict[str, float]
+
+
+class _ZoneOrder:
+    """
+    The zones of a vehicle type ordered by distance from an entrance, over a segment tree of
+    their free spot counts, so the nearest zone with a free spot is found in O(log n)
+    """
+
+    __slots__ = ("zones", "_positions", "_size", "_free")
+
+    def __init__(self, zones: List[int], free: Sequence[int]):
+        """
+        :param zones: zone indexes, nearest first
+        :param free: free spot count by zone index
+        """
+        self.zones = zones
+        self._positions = {zone: position for position, zone in enumerate(zones)}
+        self._size = 1
+        while self._size < len(zones):
+            self._size *= 2
+        # node 1 is the root, node n sums the free spots of nodes 2n and 2n + 1
+        self._free = array("q", [0]) * (2 * self._size)
+        for position, zone in enumerate(zones):
+            self._free[self._size + position] = free[zone]
+        for node in range(self._size - 1, 0, -1):
+            self._free[node] = self._free[2 * node] + self._free[2 * node + 1]
+
+    @property
+    def free(self) -> int:
+        return self._free[1]
+
+    def update(self, zone: int, free: int) -> None:
+        node = self._size + self._positions[zone]
+        delta = free - self._free[node]
+        while node:
+            self._free[node] += delta
+            node //= 2
+
+    def nearest(self) -> Optional[int]:
+        """
+        :return: index of the nearest zone with a free spot, None if every zone is full
+        """
+        if not self._free[1]:
+            return None
+        node = 1
+        while node < self._size:
+            node = 2 * node if self._free[2 * node] else 2 * node + 1
+        return self.zones[node - self._size]
+
+
+class Garage:
+    """
+    The bays of a parking lot laid out in zones, over floors, with entrances.
+
+    Spots are numbered across the whole garage, zone after zone in the order the zones are
+    given, so a spot number tells its zone. Every zone keeps its free spots in a FreeSpotIndex
+    and every (entrance, vehicle type) pair orders the zones of the vehicle type by distance
+    from the entrance, so the nearest free spot to an entrance is found in O(log n).
+    Without an entrance zones are taken in the order they are given.
+
+    Vehicle types may overflow into the zones of other vehicle types, e.g. motorcycles into car
+    bays, once every zone of their own is full, so a vehicle is only turned away when the
+    garage is truly full for it. Allocation takes the garage's own lock as an overflowing park
+    touches the zones of another vehicle type than its own
+    """
+
+    def __init__(
+        self,
+        zones: Iterable[Zone],
+        overflow: Optional[Dict[VehicleType, Sequence[VehicleType]]] = None,
+    ):
+        """
+        :param zones: zones of the garage, spots are numbered in their order
+        :param overflow: vehicle types whose zones a vehicle type may park in when its own are
+                         full, by vehicle type, tried in order
+        """
+        self.zones = list(zones)
+        if not self.zones:
+            raise ValueError("A garage needs zones")
+        self.entrances = sorted(self.zones[0].distances)
+        if any(sorted(zone.distances) != self.entrances for zone in self.zones):
+            raise ValueError("Every zone should tell its distance from every entrance")
+        if any(zone.spots < 0 for zone in self.zones):
+            raise ValueError("Parking spot capacity cannot be negative")
+        self.overflow = {
+            vehicle_type: tuple(others) for vehicle_type, others in (overflow or {}).items()
+        }
+        if any(vehicle_type in others for vehicle_type, others in self.overflow.items()):
+            raise ValueError("Vehicle types cannot overflow into their own zones")
+
+        self._first_spots: List[int] = []
+        spot_number = 1
+        for zone in self.zones:
+            self._first_spots.append(spot_number)
+            spot_number += zone.spots
+        self._lock = Lock()
+        self._reset([FreeSpotIndex(zone.spots) for zone in self.zones])
+
+    def _reset(self, free_spots: List[FreeSpotIndex]) -> None:
+        self._free_spots = free_spots
+        free = [len(index) for index in free_spots]
+        self._orders: Dict[Tuple[Optional[str], VehicleType], _ZoneOrder] = {}
+        for vehicle_type in self.spots():
+            zones = [i for i, zone in enumerate(self.zones) if zone.vehicle_type == vehicle_type]
+            self._orders[None, vehicle_type] = _ZoneOrder(zones, free)
+            for entrance in self.entrances:
+                nearest = sorted(
+                    zones,
+                    key=lambda i: (self.zones[i].distances[entrance], self.zones[i].floor, i),
+                )
+                self._orders[entrance, vehicle_type] = _ZoneOrder(nearest, free)
+
+    def spots(self) -> Dict[VehicleType, int]:
+        """
+        :return: spots of every vehicle type, vehicle types that only overflow have none
+        """
+        spots = {vehicle_type: 0 for vehicle_type in self.overflow}
+        for zone in self.zones:
+            spots[zone.vehicle_type] = spots.get(zone.vehicle_type, 0) + zone.spots
+        return spots
+
+    def sections(self) -> Dict[VehicleType, "GarageSection"]:
+        return {vehicle_type: GarageSection(self, vehicle_type) for vehicle_type in self.spots()}
+
+    def zone_of(self, spot_number: int) -> Zone:
+        return self.zones[self._zone_index(spot_number)]
+
+    def _zone_index(self, spot_number: int) -> int:
+        zone = bisect_right(self._first_spots, spot_number) - 1
+        if zone < 0 or spot_number >= self._first_spots[zone] + self.zones[zone].spots:
+            raise ValueError(f"Spot {spot_number} is not in the garage")
+        return zone
+
+    def free(self, vehicle_type: VehicleType) -> int:
+        """
+        :return: free spots in the zones of the vehicle type, overflow excluded
+        """
+        order = self._orders.get((None, vehicle_type))
+        return order.free if order is not None else 0
+
+    def _changed(self, zone: int) -> None:
+        vehicle_type, free = self.zones[zone].vehicle_type, len(self._free_spots[zone])
+        self._orders[None, vehicle_type].update(zone, free)
+        for entrance in self.entrances:
+            self._orders[entrance, vehicle_type].update(zone, free)
+
+    def acquire(
+        self,
+        vehicle_type: VehicleType,
+        entrance: Optional[str] = None,
+        held: Optional[Callable[[VehicleType], int]] = None,
+    ) -> int:
+        """
+        Hands out the free spot nearest to the entrance, in the vehicle type's zones or else in
+        the zones it overflows into
+
+        :param held: if assigned, tells the spots held back in the zones of a vehicle type,
+                     e.g. for reservations, those zones only hand out spots past that many
+        :return: the spot number, or 0 if the garage is full for the vehicle type
+        """
+        if entrance is not None and entrance not in self.entrances:
+            raise ValueError(f"Entrance {entrance} is not in the garage")
+        with self._lock:
+            for section in (vehicle_type, *self.overflow.get(vehicle_type, ())):
+                order = self._orders.get((entrance, section))
+                if order is None or (held is not None and order.free <= held(section)):
+                    continue
+                zone = order.nearest()
+                if zone is not None:
+                    spot_number: int = self._free_spots[zone].acquire()
+                    self._changed(zone)
+                    return self._first_spots[zone] + spot_number - 1
+        return 0
+
+    def release(self, spot_number: int) -> None:
+        zone = self._zone_index(spot_number)
+        with self._lock:
+            self._free_spots[zone].release(spot_number - self._first_spots[zone] + 1)
+            self._changed(zone)
+
+    def restore(self, occupied_spots: Iterable[int]) -> None:
+        """
+        Rebuilds the free spots of a garage whose occupied spot numbers are known
+        """
+        occupied: List[List[int]] = [[] for _ in self.zones]
+        for spot_number in occupied_spots:
+            zone = self._zone_index(spot_number)
+            occupied[zone].append(spot_number - self._first_spots[zone] + 1)
+        with self._lock:
+            self._reset(
+                [
+                    FreeSpotIndex.from_occupied(zone.spots, spots)
+                    for zone, spots in zip(self.zones, occupied)
+                ]
+            )
+
+
+class GarageSection:
+    """
+    A vehicle type's view of a garage, what a parking lot hands spots out of instead of a
+    FreeSpotIndex when it is laid out in a garage. Its length is the free spots of the vehicle
+    type's own zones
+    """
+
+    __slots__ = ("garage", "vehicle_type")
+
+    def __init__(self, garage: Garage, vehicle_type: VehicleType):
+        self.garage = garage
+        self.vehicle_type = vehicle_type
+
+    def __len__(self) -> int:
+        return self.garage.free(self.vehicle_type)
+
+    def acquire(
+        self,
+        entrance: Optional[str] = None,
+        held: Optional[Callable[[VehicleType], int]] = None,
+    ) -> int:
+        return self.garage.acquire(self.vehicle_type, entrance, held)
+
+    def acquire_many(
+        self, count: int, held: Optional[Callable[[VehicleType], int]] = None
+    ) -> List[int]:
+        spots = []
+        for _ in range(count):
+            spot_number = self.garage.acquire(self.vehicle_type, held=held)
+            if not spot_number:
+                break
+            spots.append(spot_number)
+        return spots
+
+    def release(self, spot_number: int) -> None:
+        self.garage.release(spot_number)
@@ -0,0 +1,169 @@
+import fcntl
+import os
+import struct
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Iterator, Optional, Union
+
+from parking.models.sequence import Sequence
+
+DEFAULT_BLOCK_NUMBERS: int = 1000
+_COUNTER = struct.Struct("<q")
+
+
+class SharedCounter:
+    """
+    A counter kept in a small file, shared by every process serving a lot. Numbers are leased
+    in blocks: the file holds the first number not leased yet and is advanced under an
+    exclusive flock, then synced so a lease survives a crash.
+
+    The file is opened once per process, flock would not tell apart processes sharing an
+    open file, so a counter can be handed to forked or spawned workers as is
+    """
+
+    def __init__(self, path: Union[str, Path], start: int = 1):
+        """
+        :param path: counter file, created holding start if missing
+        :param start: first number to be leased from a new counter file
+        """
+        self.path = Path(path)
+        self.start = start
+        self._lock = Lock()
+        self._pid: Optional[int] = None
+        self._fd = -1
+        with self._locked() as fd:
+            if os.fstat(fd).st_size < _COUNTER.size:
+                os.pwrite(fd, _COUNTER.pack(start), 0)
+                os.fsync(fd)
+
+    def _file(self) -> int:
+        if self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    @contextmanager
+    def _locked(self) -> Iterator[int]:
+        """
+        Holds the counter's exclusive flock, threads share the process's open file so they
+        take the thread lock first
+        """
+        with self._lock:
+            fd = self._file()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                yield fd
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    @property
+    def value(self) -> int:
+        """
+        :return: the first number of the next lease
+        """
+        with self._locked() as fd:
+            (number,) = _COUNTER.unpack(os.pread(fd, _COUNTER.size, 0))
+        value: int = number
+        return value
+
+    def lease(self, count: int) -> int:
+        """
+        Leases count consecutive numbers, no other lease of the counter file gets them
+
+        :return: the first number of the lease
+        """
+        if count <= 0:
+            raise ValueError("Leases should hold at least a number")
+        with self._locked() as fd:
+            (number,) = _COUNTER.unpack(os.pread(fd, _COUNTER.size, 0))
+            os.pwrite(fd, _COUNTER.pack(number + count), 0)
+            os.fsync(fd)
+        first: int = number
+        return first
+
+    def advance_to(self, number: int) -> None:
+        """
+        Makes sure no lease hands out numbers below number, e.g. after recovering a journal
+        """
+        with self._locked() as fd:
+            (current,) = _COUNTER.unpack(os.pread(fd, _COUNTER.size, 0))
+            if current < number:
+                os.pwrite(fd, _COUNTER.pack(number), 0)
+                os.fsync(fd)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                os.close(self._fd)
+            self._pid, self._fd = None, -1
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"path": self.path, "start": self.start}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.path, self.start = state["path"], state["start"]
+        self._lock = Lock()
+        self._pid, self._fd = None, -1
+
+
+class BlockSequence(Sequence):
+    """
+    A hi/lo sequence: numbers are handed out of a block leased from a SharedCounter, so several
+    processes (or gates) serving one lot never hand out the same ticket/receipt number and
+    only contend on the counter file once every block_size numbers.
+
+    Numbers increase within a process but interleave between processes, and numbers left in a
+    block when a process stops are never handed out, so numbering has gaps. A block is only
+    handed out of by the process that leased it, a forked process leases its own
+    """
+
+    __slots__ = ("counter", "block_size", "_number", "_end", "_pid")
+
+    def __init__(self, counter: SharedCounter, block_size: int = DEFAULT_BLOCK_NUMBERS):
+        """
+        :param counter: counter shared by the processes numbering the same things
+        :param block_size: numbers leased at once
+        """
+        if block_size <= 0:
+            raise ValueError("Block size should be positive")
+        super().__init__()
+        self.counter = counter
+        self.block_size = block_size
+        # the leased block, numbers left to hand out are [_number, _end), leased by process _pid
+        self._number = 0
+        self._end = 0
+        self._pid = 0
+
+    @property
+    def value(self) -> int:
+        if self._number < self._end and self._pid == os.getpid():
+            return self._number
+        return self.counter.value
+
+    def next(self) -> int:
+        with self._lock:
+            if self._number >= self._end or self._pid != os.getpid():
+                self._lease(self.block_size)
+            number = self._number
+            self._number = number + 1
+        return number
+
+    def next_block(self, count: int) -> int:
+        with self._lock:
+            # blocks are handed out consecutive, a block not fitting the lease takes a new one
+            if self._number + count > self._end or self._pid != os.getpid():
+                self._lease(max(count, self.block_size))
+            number = self._number
+            self._number = number + count
+        return number
+
+    def _lease(self, count: int) -> None:
+        self._number = self.counter.lease(count)
+        self._end = self._number + count
+        self._pid = os.getpid()
+
+    def restart(self, start: int) -> None:
+        with self._lock:
+            self.counter.advance_to(start)
+            self._number = self._end = 0
@@ -0,0 +1,232 @@
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import IO, TYPE_CHECKING, Dict, List, Optional, Set, Tuple, Union
+
+from parking.models.slips import CompactTicket, Ticket, to_epoch_seconds
+from parking.models.vehicle import VEHICLE_TYPES, VEHICLE_TYPE_CODES, VehicleType
+
+if TYPE_CHECKING:
+    from parking.models.parking_lot import ParkingLot
+
+SNAPSHOT_FILE_NAME: str = "snapshot.json"
+SEGMENT_FILE_FORMAT: str = "journal-{0:08}.log"
+
+
+class Journal:
+    """
+    Append-only journal of a parking lot's parks and unparks, one event per line:
+        * P <ticket number> <vehicle type code> <spot number> <entry iso date-time>
+        * U <ticket number> <receipt number>
+
+    Events are fsync-ed in groups, a group is committed once batch_size events are pending or
+    the oldest pending event is older than max_delay seconds, so an unclean stop loses at most
+    the events of the group being built. Every snapshot_every events a compact snapshot of the
+    active sessions and counters is written and a new journal segment started, older segments
+    are deleted, so recovery loads one snapshot and replays a bounded tail whatever the age of
+    the lot.
+    Replaying an event is idempotent, so events journaled while a snapshot is being taken are
+    safe to replay on top of it.
+    Parks are journaled once the lot's locks are released, so another gate may journal the
+    unpark of a ticket ahead of its park. Ticket numbers are never reused, replay drops a park
+    whose ticket was unparked already, in the tail or before the snapshot
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        batch_size: int = 64,
+        max_delay: float = 0.05,
+        snapshot_every: Optional[int] = 100_000,
+    ):
+        """
+        :param directory: where the snapshot and journal segments live, created if missing
+        :param batch_size: events pending before they are written and fsync-ed together
+        :param max_delay: seconds an event may stay pending, checked whenever one is journaled
+        :param snapshot_every: events between snapshots, None only snapshots on demand
+        """
+        if batch_size <= 0:
+            raise ValueError("Journal batch size should be positive")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.snapshot_every = snapshot_every
+        self.events_since_snapshot = 0
+        self._pending: List[str] = []
+        self._pending_since = 0.0
+        self._lock = Lock()
+        segments = self._segments()
+        # never append behind a possibly torn last line, writes always go to a fresh segment
+        self._segment = segments[-1] + 1 if segments else 1
+        self._file: IO[str] = self._open_segment(self._segment)
+
+    def _segments(self) -> List[int]:
+        return sorted(
+            int(path.stem.split("-")[1]) for path in self.directory.glob("journal-*.log")
+        )
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.directory / SEGMENT_FILE_FORMAT.format(segment)
+
+    def _open_segment(self, segment: int) -> IO[str]:
+        return open(self._segment_path(segment), "a", encoding="utf-8")
+
+    def record_park(
+        self, parking_lot: "ParkingLot", vehicle_type: VehicleType, ticket: Ticket
+    ) -> None:
+        self._record(
+            parking_lot,
+            f"P {ticket.ticket_number} {VEHICLE_TYPE_CODES[vehicle_type]} {ticket.spot_number} "
+            f"{ticket.entry_datetime.isoformat()}\n",
+        )
+
+    def record_unpark(
+        self, parking_lot: "ParkingLot", ticket_number: int, receipt_number: int
+    ) -> None:
+        self._record(parking_lot, f"U {ticket_number} {receipt_number}\n")
+
+    def _record(self, parking_lot: "ParkingLot", event: str) -> None:
+        with self._lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append(event)
+            self.events_since_snapshot += 1
+            if (
+                len(self._pending) >= self.batch_size
+                or time.monotonic() - self._pending_since >= self.max_delay
+            ):
+                self._commit()
+            if self.snapshot_every and self.events_since_snapshot >= self.snapshot_every:
+                self._snapshot(parking_lot)
+
+    def commit(self) -> None:
+        """
+        Writes and fsyncs pending events, callers that go idle should call it periodically
+        """
+        with self._lock:
+            self._commit()
+
+    def _commit(self) -> None:
+        if self._pending:
+            self._file.write("".join(self._pending))
+            self._pending.clear()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def snapshot(self, parking_lot: "ParkingLot") -> None:
+        """
+        Writes a snapshot of the lot, then starts a new segment and drops the older ones
+        """
+        with self._lock:
+            self._snapshot(parking_lot)
+
+    def _snapshot(self, parking_lot: "ParkingLot") -> None:
+        self._commit()
+        # events journaled from here on are replayed on top of the snapshot
+        self._file.close()
+        self._segment += 1
+        self._file = self._open_segment(self._segment)
+
+        vehicle_records, ticket_counter, receipt_counter = parking_lot.sessions_snapshot()
+        snapshot = {
+            "segment": self._segment,
+            "ticket_counter": ticket_counter,
+            "receipt_counter": receipt_counter,
+            "sessions": [
+                [
+                    ticket.ticket_number,
+                    VEHICLE_TYPE_CODES[vehicle_type],
+                    ticket.spot_number,
+                    ticket.entry_datetime.isoformat(),
+                ]
+                for vehicle_type, ticket in vehicle_records.values()
+            ],
+        }
+        snapshot_path = self.directory / SNAPSHOT_FILE_NAME
+        temporary_path = snapshot_path.with_suffix(".tmp")
+        with open(temporary_path, "w", encoding="utf-8") as snapshot_file:
+            json.dump(snapshot, snapshot_file, separators=(",", ":"))
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temporary_path, snapshot_path)
+
+        for segment in self._segments():
+            if segment < self._segment:
+                self._segment_path(segment).unlink()
+        self.events_since_snapshot = 0
+
+    def recover(self, parking_lot: "ParkingLot") -> int:
+        """
+        Restores a freshly built lot from the latest snapshot and the journal tail after it.
+        The lot should be built with the same spots it was journaled with
+
+        :param parking_lot: lot to restore the state of
+        :return: number of journal events replayed on top of the snapshot
+        """
+        with self._lock:
+            records: Dict[int, Tuple[VehicleType, CompactTicket]] = {}
+            ticket_counter = receipt_counter = 1
+            first_segment = 1
+            # tickets handed out before the snapshot, those not active then were unparked
+            snapshot_tickets = 1
+
+            snapshot_path = self.directory / SNAPSHOT_FILE_NAME
+            if snapshot_path.exists():
+                with open(snapshot_path, encoding="utf-8") as snapshot_file:
+                    snapshot = json.load(snapshot_file)
+                first_segment = snapshot["segment"]
+                ticket_counter = snapshot_tickets = snapshot["ticket_counter"]
+                receipt_counter = snapshot["receipt_counter"]
+                for ticket_number, code, spot_number, entry in snapshot["sessions"]:
+                    ticket = CompactTicket(
+                        ticket_number,
+                        spot_number,
+                        to_epoch_seconds(datetime.fromisoformat(entry)),
+                    )
+                    records[ticket_number] = (VEHICLE_TYPES[code], ticket)
+
+            replayed = 0
+            unparked: Set[int] = set()
+            for segment in self._segments():
+                if not first_segment <= segment < self._segment:
+                    continue
+                with open(self._segment_path(segment), encoding="utf-8") as segment_file:
+                    for line in segment_file:
+                        if not line.endswith("\n"):
+                            # torn write of the last group, never committed
+                            break
+                        event = line.split()
+                        if event[0] == "P":
+                            ticket_number = int(event[1])
+                            ticket_counter = max(ticket_counter, ticket_number + 1)
+                            replayed += 1
+                            if ticket_number in unparked or (
+                                ticket_number < snapshot_tickets and ticket_number not in records
+                            ):
+                                # journaled after the ticket's unpark
+                                continue
+                            ticket = CompactTicket(
+                                ticket_number,
+                                int(event[3]),
+                                to_epoch_seconds(datetime.fromisoformat(event[4])),
+                            )
+                            records[ticket_number] = (VEHICLE_TYPES[int(event[2])], ticket)
+                        else:
+                            ticket_number = int(event[1])
+                            records.pop(ticket_number, None)
+                            unparked.add(ticket_number)
+                            receipt_counter = max(receipt_counter, int(event[2]) + 1)
+                            replayed += 1
+
+            parking_lot.restore(records, ticket_counter, receipt_counter)
+            self.events_since_snapshot = replayed
+            return replayed
+
+    def close(self) -> None:
+        with self._lock:
+            self._commit()
+            self._file.close()
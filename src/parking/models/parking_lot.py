@@ -1,12 +1,55 @@
-from datetime import datetime, timedelta
-from typing import Dict, Tuple, Optional, Union, Text
+import math
+from collections import Counter
+from contextlib import ExitStack, nullcontext
+from datetime import datetime
+from threading import Lock
+from time import perf_counter_ns
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Set,
+    Tuple,
+    Optional,
+    Union,
+    Text,
+    cast,
+)
 
+from parking.models.analytics import LotAnalytics
+from parking.models.archive import SessionArchive
+from parking.models.board import OccupancyBoard
+from parking.models.clock import Clock, SystemClock
+from parking.models.entry_index import EntryTimeIndex
 from parking.models.fees import FeeModel
-from parking.models.slips import Ticket, Receipt
+from parking.models.garage import Garage, GarageSection
+from parking.models.quotes import QuoteCache
+from parking.models.reservations import Reservation, Reservations
+from parking.models.sequence import Sequence
+from parking.models.slips import (
+    CompactTicket,
+    Ticket,
+    Receipt,
+    from_epoch_seconds,
+    to_epoch_seconds,
+)
+from parking.models.spots import FreeSpotIndex
+from parking.models.storage import SessionStore
+from parking.models.sweeper import SessionSweeper
 from parking.models.vehicle import VehicleType
 
+if TYPE_CHECKING:
+    from parking.metrics import LotMetrics
+    from parking.models.journal import Journal
+
 SEC_PER_HR: int = 3600
 ERROR_MSG = Text
+_ENTRY_TIME_TYPES = frozenset((datetime, type(None)))
+UNKNOWN_TICKET_MSG: Text = "Ticket {} has not been commissioned by this parking lot"
 
 
 class ParkingLot:
@@ -15,7 +58,25 @@ class ParkingLot:
     """
 
     def __init__(
-        self, name: str, spots: Dict[VehicleType, int], fee_models: Dict[VehicleType, FeeModel]
+        self,
+        name: str,
+        spots: Dict[VehicleType, int],
+        fee_models: Dict[VehicleType, FeeModel],
+        archive: Optional[SessionArchive] = None,
+        concurrent: bool = False,
+        journal: Optional["Journal"] = None,
+        analytics: Optional[LotAnalytics] = None,
+        quotes: Optional[QuoteCache] = None,
+        metrics: Optional["LotMetrics"] = None,
+        storage: Optional[SessionStore] = None,
+        sweeper: Optional[SessionSweeper] = None,
+        clock: Optional[Clock] = None,
+        reservations: Optional[Reservations] = None,
+        garage: Optional[Garage] = None,
+        tickets: Optional[Sequence] = None,
+        receipts: Optional[Sequence] = None,
+        board: Optional[OccupancyBoard] = None,
+        entry_index: Optional[EntryTimeIndex] = None,
     ):
         """
         Parking Lot constructor, that initialises service state
@@ -23,31 +84,254 @@ class ParkingLot:
         :param name: name of the parking lot, just descriptive
         :param spots: how many spots are assigned for each vehicle type
         :param fee_models: fee models assigned by vehicle type, see fees.py
+        :param archive:
+                where closed sessions are kept, see archive.py for retention/spilling. The
+                default archive holds the last DEFAULT_MAX_SESSIONS closed sessions at most and
+                has no on_spill, older ones are dropped (with a warning on the first spill),
+                pass an archive with an on_spill, or with max_sessions=None, to keep them all.
+                Receipts are not affected, storage keeps every session if assigned
+        :param concurrent:
+                if set, the lot can be shared between gate threads, every vehicle type gets
+                its own lock so parks/unparks of different vehicle types do not contend
+        :param journal: if assigned, parks/unparks are journaled there, see journal.py
+        :param analytics: if assigned, running occupancy/revenue aggregates are kept there,
+                          see analytics.py for bucketing
+        :param quotes: if assigned, fees are quoted through that cache instead of straight from
+                       the fee models, see quotes.py
+        :param metrics: if assigned, calls are counted and timed there, see metrics.py
+        :param storage: if assigned, every session and receipt is stored there, see storage.py
+        :param sweeper: if assigned, watches active sessions for overstays and fee changes,
+                        see sweeper.py
+        :param clock: where the current time is read from, the system clock by default,
+                      see clock.py
+        :param reservations:
+                if assigned, spots can be reserved ahead on a best effort basis, see reserve
+                and reservations.py
+        :param garage:
+                if assigned, spots are laid out in its zones and handed out nearest to the
+                entrance a vehicle comes in through, see garage.py. Spots should be its spots
+        :param tickets: where ticket numbers are handed out from, a sequence of its own by
+                        default, e.g. a BlockSequence shared with other processes serving the
+                        lot, see id_blocks.py
+        :param receipts: where receipt numbers are handed out from, as tickets
+        :param board: if assigned, occupancy is published there on every park/unpark for
+                      readers in other processes, see board.py
+        :param entry_index:
+                if assigned, active sessions are indexed there by entry time, so
+                parked_longer_than only visits the sessions it returns instead of scanning
+                every active session, see entry_index.py
         """
+        if garage is not None and garage.spots() != spots:
+            raise ValueError("Spots should be the spots of the garage zones")
         self.name = name
         self.spots = spots
         self.occupied_spots = {vehicle_type: 0 for vehicle_type in spots.keys()}
-        self.vehicle_records: Dict[int, Tuple[VehicleType, Ticket]] = {}
+        self.garage = garage
+        self.free_spots: Dict[VehicleType, Union[FreeSpotIndex, GarageSection]] = (
+            dict(garage.sections())
+            if garage is not None
+            else {
+                vehicle_type: FreeSpotIndex(capacity) for vehicle_type, capacity in spots.items()
+            }
+        )
+        # active sessions only, closed ones move to the archive on unpark. Times are kept in
+        # epoch seconds internally, date-times are only built once the tickets/receipts returned
+        # are read or rendered
+        self.vehicle_records: Dict[int, Tuple[VehicleType, CompactTicket]] = {}
+        self.archive = archive if archive is not None else SessionArchive()
         self.fee_models = fee_models
-        self.ticket_counter = 1
-        self.receipt_counter = 1
+        self.tickets = tickets if tickets is not None else Sequence()
+        self.receipts = receipts if receipts is not None else Sequence()
+        # a vehicle type's occupancy is published under the spot lock of the vehicle type
+        self.board = board
+        if board is not None:
+            board.publish_all(self.occupied_spots)
+        self.concurrent = concurrent
+        self._spot_locks: Dict[VehicleType, ContextManager[object]] = {
+            vehicle_type: Lock() if concurrent else nullcontext() for vehicle_type in spots
+        }
+        # sections of the garage a vehicle type overflows into, their spot locks are taken too
+        # when a vehicle of the type parks or unparks
+        self._sections: Dict[VehicleType, Tuple[VehicleType, ...]] = {
+            vehicle_type: (vehicle_type, *others)
+            for vehicle_type, others in (garage.overflow.items() if garage is not None else ())
+            if others
+        }
+        # guards what every vehicle type shares: the archive, the entry index and the analytics
+        self._records_lock: ContextManager[object] = Lock() if concurrent else nullcontext()
+        self.journal = journal
+        self.analytics = analytics
+        self.quotes = quotes
+        self.metrics = metrics
+        self.storage = storage
+        self.sweeper = sweeper
+        # active sessions by entry time, guarded by the records lock
+        self.entry_index = entry_index
+        self.clock = clock if clock is not None else SystemClock()
+        # guarded by the spot lock of the reservations' vehicle type
+        self.reservations = reservations
+
+    @property
+    def ticket_counter(self) -> int:
+        """
+        :return: the ticket number handed out to the next parked vehicle
+        """
+        next_ticket_number: int = self.tickets.value
+        return next_ticket_number
+
+    @property
+    def receipt_counter(self) -> int:
+        """
+        :return: the receipt number handed out to the next unparked vehicle
+        """
+        next_receipt_number: int = self.receipts.value
+        return next_receipt_number
 
     def park_vehicle(
-        self, vehicle_type: VehicleType, fake_entry_time: Optional[datetime] = None
+        self,
+        vehicle_type: VehicleType,
+        fake_entry_time: Optional[datetime] = None,
+        reservation_number: Optional[int] = None,
+        entrance: Optional[str] = None,
     ) -> Union[Ticket, ERROR_MSG]:
         """
         When called, parks a vehicle by editing service state:
-            * increments occupied_spots of vehicle type by 1
-            * assigns a spot number
+            * increments occupied_spots of vehicle type by 1, of the vehicle type whose bay it
+              took when it overflowed
+            * assigns the lowest free spot number, or the nearest free one to the entrance
             * creates a ticket
-            * updates vehicle records
+            * updates vehicle records, and the lot analytics if assigned
             * increments tickets handed out by 1
 
         :param vehicle_type: vehicle type being parked, see VehicleType enum
         :param fake_entry_time:
-                if assigned, uses that as a parking entry time instead of current time
+                if assigned, uses that as a parking entry time instead of the clock's time
+        :param reservation_number:
+                if assigned, parks in the spot held for that reservation, vehicles without one
+                cannot take the spots held for reservations whose window started
+        :param entrance:
+                if assigned, parks in the free spot nearest to that entrance of the garage,
+                or in a vehicle type it overflows into when its own zones are full
         :return: a parking lot ticket or an error message
         """
+        # exact type checks let valid calls skip the validation call, as in park_many
+        if type(vehicle_type) is not VehicleType or type(fake_entry_time) not in _ENTRY_TIME_TYPES:
+            self._validate_park(vehicle_type, fake_entry_time)
+        if entrance is not None and self.garage is None:
+            raise ValueError("Entrances are only known to parking lots laid out in a garage")
+
+        started = perf_counter_ns() if self.metrics is not None else 0
+        entry_time = to_epoch_seconds(fake_entry_time) if fake_entry_time else self.clock.now()
+        with self._section_locks(vehicle_type):
+            if self.reservations is not None or reservation_number is not None:
+                # reservations are held and claimed by the clock, whatever the entry time
+                now = self.clock.now() if fake_entry_time else entry_time
+                spot_number = self._acquire_reserved(
+                    vehicle_type, reservation_number, now, entrance
+                )
+            elif entrance is not None:
+                spot_number = self._acquire_near(vehicle_type, entrance)
+            else:
+                spot_number = self.free_spots[vehicle_type].acquire()
+            if not spot_number:
+                if self.metrics is not None:
+                    self.metrics.record_park(vehicle_type, False, perf_counter_ns() - started)
+                return "No space available"
+            bay_type = (
+                vehicle_type if self.garage is None else self._bay_type(vehicle_type, spot_number)
+            )
+            self.occupied_spots[bay_type] += 1
+            if self.board is not None:
+                self.board.publish(bay_type, self.occupied_spots[bay_type])
+            ticket_number = self.tickets.next()
+            self.vehicle_records[ticket_number] = (
+                vehicle_type,
+                CompactTicket(ticket_number, spot_number, entry_time),
+            )
+            ticket = Ticket(ticket_number, spot_number, None, entry_time)
+            if self.storage is not None:
+                # stored before any gate can unpark the ticket, so its close finds its row
+                self.storage.record_park(vehicle_type, ticket)
+        if self.analytics is not None or self.entry_index is not None:
+            with self._records_lock:
+                if self.analytics is not None:
+                    self.analytics.record_park(bay_type, entry_time)
+                if self.entry_index is not None:
+                    self.entry_index.add(ticket_number, entry_time)
+        if self.sweeper is not None:
+            self.sweeper.watch(
+                ticket_number, vehicle_type, entry_time, self.fee_models[vehicle_type]
+            )
+        if self.journal is not None:
+            self.journal.record_park(self, vehicle_type, ticket)
+        if self.metrics is not None:
+            self.metrics.record_park(vehicle_type, True, perf_counter_ns() - started)
+        return ticket
+
+    def _acquire_near(
+        self,
+        vehicle_type: VehicleType,
+        entrance: Optional[str],
+        held: Optional[Callable[[VehicleType], int]] = None,
+    ) -> int:
+        """
+        :param held: if assigned, tells the spots held for reservations by vehicle type
+        :return: the spot number, or 0 if none is free for the vehicle
+        """
+        free_spots = self.free_spots[vehicle_type]
+        spot_number: int
+        if isinstance(free_spots, GarageSection):
+            # held spots are minded in every section the vehicle may overflow into
+            spot_number = free_spots.acquire(entrance, held)
+        elif held is not None and len(free_spots) <= held(vehicle_type):
+            spot_number = 0
+        else:
+            spot_number = free_spots.acquire()
+        return spot_number
+
+    def _held(self, now: int) -> Callable[[VehicleType], int]:
+        """
+        :return: spots held right now for reservations, by vehicle type, to be called under the
+                 spot lock of the vehicle type
+        """
+        indexes = self.reservations.indexes if self.reservations is not None else {}
+
+        def held(vehicle_type: VehicleType) -> int:
+            index = indexes.get(vehicle_type)
+            spots: int = index.held(now) if index is not None else 0
+            return spots
+
+        return held
+
+    def _acquire_reserved(
+        self,
+        vehicle_type: VehicleType,
+        reservation_number: Optional[int],
+        now: int,
+        entrance: Optional[str] = None,
+    ) -> int:
+        """
+        Hands out a spot, minding the spots held for reservations, under the spot locks of the
+        vehicle type's sections
+
+        :return: the spot number, or 0 if none is free for the vehicle
+        """
+        if self.reservations is None:
+            raise ValueError("Spots cannot be reserved in this parking lot")
+        index = self.reservations.indexes.get(vehicle_type)
+        if reservation_number is None:
+            return self._acquire_near(vehicle_type, entrance, self._held(now))
+        elif index is None or reservation_number not in index:
+            raise ValueError(f"Reservation {reservation_number} is not held")
+        # the claimed reservation's spot is not held anymore, for its own vehicle to take
+        index.claim(reservation_number, now)
+        spot_number = self._acquire_near(vehicle_type, entrance, self._held(now))
+        if not spot_number:
+            index.unclaim(reservation_number)
+        return spot_number
+
+    @staticmethod
+    def _validate_park(vehicle_type: VehicleType, fake_entry_time: Optional[datetime]) -> None:
         if not isinstance(vehicle_type, VehicleType):
             raise ValueError(f"Vehicle type passed is not recognised: {type(vehicle_type)}")
         elif fake_entry_time and not isinstance(fake_entry_time, datetime):
@@ -55,23 +339,14 @@ class ParkingLot:
                 "Vehicle entry time to the parking needs to be a valid Date time instance"
             )
 
-        if self.occupied_spots[vehicle_type] < self.spots[vehicle_type]:
-            self.occupied_spots[vehicle_type] += 1
-            spot_number = self.occupied_spots[vehicle_type]
-            ticket = Ticket(self.ticket_counter, spot_number, fake_entry_time or datetime.now())
-            self.vehicle_records[self.ticket_counter] = (vehicle_type, ticket)
-            self.ticket_counter += 1
-            return ticket
-        else:
-            return "No space available"
-
     def unpark_vehicle(self, ticket_number: int, fake_duration: Optional[int] = None) -> Receipt:
         """
         When called, unparks a vehicle by editing service state:
-            * retrieves vehicle info from vehicle records
+            * moves vehicle info from vehicle records to the closed-session archive
+            * updates the lot analytics, if assigned
             * calculates fees to be paid based on vehicle type and total duration spent in parking
             * creates a receipt to be returned
-            * decrements parking lot occupied spots by 1
+            * decrements parking lot occupied spots by 1 and frees the ticket's spot
             * increments released receipts by 1
 
         :param ticket_number: vehicle type being parked, see VehicleType enum
@@ -79,31 +354,534 @@ class ParkingLot:
                 if assigned, uses that as total time spent inside a parking lot, in seconds
         :return: a parking lot receipt
         """
-        if ticket_number not in self.vehicle_records:
-            raise ValueError(
-                f"Ticket {ticket_number} has not been commissioned by this parking lot"
+        started = perf_counter_ns() if self.metrics is not None else 0
+        vehicle_type, ticket, exit_time, fees_paid = self._quote(ticket_number, fake_duration)
+
+        with self._section_locks(vehicle_type):
+            # another gate may have unparked the same ticket in the meantime
+            if self.vehicle_records.pop(ticket_number, None) is None:
+                raise ValueError(UNKNOWN_TICKET_MSG.format(ticket_number))
+            bay_type = (
+                vehicle_type
+                if self.garage is None
+                else self._bay_type(vehicle_type, ticket.spot_number)
+            )
+            self.occupied_spots[bay_type] -= 1
+            self.free_spots[vehicle_type].release(ticket.spot_number)
+            if self.board is not None:
+                self.board.publish(bay_type, self.occupied_spots[bay_type])
+
+        receipt_number = self.receipts.next()
+        if self.journal is not None:
+            self.journal.record_unpark(self, ticket_number, receipt_number)
+
+        receipt = Receipt(receipt_number, None, None, fees_paid, ticket.entry_time, exit_time)
+
+        with self._records_lock:
+            self.archive.append(
+                ticket_number, vehicle_type, ticket.entry_time, exit_time, fees_paid
             )
+            if self.analytics is not None:
+                self.analytics.record_unpark(vehicle_type, exit_time, fees_paid, bay_type)
+            if self.entry_index is not None:
+                self.entry_index.remove(ticket_number, ticket.entry_time)
+        if self.sweeper is not None:
+            self.sweeper.unwatch(ticket_number)
+        if self.storage is not None:
+            self.storage.record_unpark(ticket_number, receipt)
+
+        if self.metrics is not None:
+            self.metrics.record_unpark(vehicle_type, perf_counter_ns() - started)
+        return receipt
+
+    def _locked(self, vehicle_types: Iterable[VehicleType]) -> ExitStack:
+        """
+        :return: a context holding the spot locks of the given vehicle types and of the sections
+                 they overflow into, always taken in the same order so bulk calls never
+                 deadlock each other
+        """
+        stack = ExitStack()
+        wanted = set(vehicle_types)
+        for vehicle_type in list(wanted):
+            wanted.update(self._sections.get(vehicle_type, ()))
+        for vehicle_type, lock in self._spot_locks.items():
+            if vehicle_type in wanted:
+                stack.enter_context(lock)
+        return stack
+
+    def _section_locks(self, vehicle_type: VehicleType) -> ContextManager[object]:
+        """
+        :return: the spot lock of the vehicle type, or the spot locks of every section of the
+                 garage it overflows into
+        """
+        # vehicle types are only looked up when some overflow, Enum.__hash__ is not free
+        if self._sections and vehicle_type in self._sections:
+            return self._locked((vehicle_type,))
+        return self._spot_locks[vehicle_type]
+
+    def _bay_type(self, vehicle_type: VehicleType, spot_number: int) -> VehicleType:
+        """
+        :return: the vehicle type whose bay the spot is, occupancy is counted against it so a
+                 vehicle that overflowed takes a spot of the section it parked in
+        """
+        if self.garage is None or vehicle_type not in self._sections:
+            return vehicle_type
+        bay_type: VehicleType = self.garage.zone_of(spot_number).vehicle_type
+        return bay_type
+
+    def park_many(
+        self,
+        vehicle_types: Iterable[VehicleType],
+        fake_entry_times: Optional[Iterable[Optional[datetime]]] = None,
+    ) -> List[Union[Ticket, ERROR_MSG, ValueError]]:
+        """
+        Parks many vehicles at once, e.g. events a gate buffered while offline, as
+        park_vehicle would one by one but taking every lock once, handing spots and ticket
+        numbers out in blocks and reading the clock once
+
+        :param vehicle_types: vehicle types being parked
+        :param fake_entry_times: if assigned, entry times of the vehicles, same length
+        :return: per vehicle, in order, a ticket, "No space available" or the ValueError
+                 park_vehicle would have raised
+        """
+        vehicle_types = list(vehicle_types)
+        entry_times = (
+            list(fake_entry_times) if fake_entry_times is not None else [None] * len(vehicle_types)
+        )
+        if len(entry_times) != len(vehicle_types):
+            raise ValueError("Vehicle types and entry times should have the same length")
+
+        started = perf_counter_ns() if self.metrics is not None else 0
+        now = self.clock.now()
+        results: List[Union[Ticket, ERROR_MSG, ValueError]] = ["No space available"] * len(
+            vehicle_types
+        )
+        # positions of the valid requests, they get a ticket unless their section fills up
+        pending: Union[range, List[int]] = range(len(vehicle_types))
+        requested: Dict[VehicleType, int] = Counter(vehicle_types)
+        # the whole batch is validated at once, requests are only looked at one by one to
+        # single out the invalid ones
+        if not (
+            requested.keys() <= self._spot_locks.keys()
+            and all(type(entry_time) in _ENTRY_TIME_TYPES for entry_time in entry_times)
+        ):
+            pending, requested = [], {}
+            for position, (vehicle_type, entry_time) in enumerate(zip(vehicle_types, entry_times)):
+                try:
+                    self._validate_park(vehicle_type, entry_time)
+                    if vehicle_type not in self._spot_locks:
+                        raise ValueError(f"No spots are assigned to {vehicle_type.name}")
+                except ValueError as e:
+                    results[position] = e
+                    continue
+                pending.append(position)
+                requested[vehicle_type] = requested.get(vehicle_type, 0) + 1
+
+        parked: List[Tuple[VehicleType, CompactTicket, Ticket]] = []
+        with self._locked(requested):
+            spots: Dict[VehicleType, Iterator[int]] = {}
+            acquired_spots = 0
+            bay_types: Set[VehicleType] = set()
+            held = self._held(now) if self.reservations is not None else None
+            for vehicle_type, count in requested.items():
+                free_spots = self.free_spots[vehicle_type]
+                if isinstance(free_spots, GarageSection):
+                    acquired = free_spots.acquire_many(count, held)
+                else:
+                    if held is not None:
+                        count = max(0, min(count, len(free_spots) - held(vehicle_type)))
+                    acquired = free_spots.acquire_many(count)
+                if vehicle_type in self._sections:
+                    for spot_number in acquired:
+                        bay_type = self._bay_type(vehicle_type, spot_number)
+                        self.occupied_spots[bay_type] += 1
+                        bay_types.add(bay_type)
+                else:
+                    self.occupied_spots[vehicle_type] += len(acquired)
+                    bay_types.add(vehicle_type)
+                spots[vehicle_type] = iter(acquired)
+                acquired_spots += len(acquired)
+            if self.board is not None:
+                for bay_type in bay_types:
+                    self.board.publish(bay_type, self.occupied_spots[bay_type])
+            ticket_number = self.tickets.next_block(acquired_spots)
+            records = self.vehicle_records
+            for position in pending:
+                vehicle_type = vehicle_types[position]
+                spot_number = next(spots[vehicle_type], 0)
+                if spot_number:
+                    entry_datetime = entry_times[position]
+                    entry_time = to_epoch_seconds(entry_datetime) if entry_datetime else now
+                    compact = CompactTicket(ticket_number, spot_number, entry_time)
+                    records[ticket_number] = (vehicle_type, compact)
+                    ticket = compact.to_ticket()
+                    results[position] = ticket
+                    parked.append((vehicle_type, compact, ticket))
+                    ticket_number += 1
+            if self.storage is not None:
+                # stored before any gate can unpark the tickets, so their closes find their rows
+                for vehicle_type, _, ticket in parked:
+                    self.storage.record_park(vehicle_type, ticket)
+
+        if self.analytics is not None or self.entry_index is not None:
+            with self._records_lock:
+                if self.analytics is not None:
+                    self.analytics.record_parks(
+                        (self._bay_type(vehicle_type, compact.spot_number), compact.entry_time)
+                        for vehicle_type, compact, _ in parked
+                    )
+                if self.entry_index is not None:
+                    self.entry_index.add_many(
+                        (compact.ticket_number, compact.entry_time) for _, compact, _ in parked
+                    )
+        if self.sweeper is not None or self.journal is not None:
+            for vehicle_type, compact, ticket in parked:
+                if self.sweeper is not None:
+                    self.sweeper.watch(
+                        compact.ticket_number,
+                        vehicle_type,
+                        compact.entry_time,
+                        self.fee_models[vehicle_type],
+                    )
+                if self.journal is not None:
+                    self.journal.record_park(self, vehicle_type, ticket)
+        if self.metrics is not None and pending:
+            elapsed = (perf_counter_ns() - started) // len(pending)
+            for position in pending:
+                self.metrics.record_park(
+                    vehicle_types[position], isinstance(results[position], Ticket), elapsed
+                )
+        return results
+
+    def unpark_many(
+        self,
+        ticket_numbers: Iterable[int],
+        fake_durations: Optional[Iterable[Optional[int]]] = None,
+    ) -> List[Union[Receipt, ValueError]]:
+        """
+        Unparks many vehicles at once, as unpark_vehicle would one by one but taking every
+        lock once, handing receipt numbers out in a block and reading the clock once
+
+        :param ticket_numbers: tickets of the vehicles leaving
+        :param fake_durations: if assigned, durations of the stays in seconds, same length
+        :return: per ticket, in order, a receipt or the ValueError unpark_vehicle would have
+                 raised
+        """
+        ticket_numbers = list(ticket_numbers)
+        durations = (
+            list(fake_durations) if fake_durations is not None else [None] * len(ticket_numbers)
+        )
+        if len(durations) != len(ticket_numbers):
+            raise ValueError("Ticket numbers and durations should have the same length")
+
+        started = perf_counter_ns() if self.metrics is not None else 0
+        now = self.clock.now()
+        # None until the ticket's receipt is issued
+        results: List[Optional[Union[Receipt, ValueError]]] = []
+        # (position, vehicle type, ticket, exit time, fees)
+        quoted: List[Tuple[int, VehicleType, CompactTicket, int, int]] = []
+        # a batch often holds many stays of the same length, e.g. a replayed day, each
+        # (vehicle type, duration) is quoted once
+        fees: Dict[Tuple[VehicleType, int], int] = {}
+        records = self.vehicle_records
+        for position, (ticket_number, duration) in enumerate(zip(ticket_numbers, durations)):
+            record = records.get(ticket_number)
+            if record is None:
+                results.append(ValueError(UNKNOWN_TICKET_MSG.format(ticket_number)))
+                continue
+            elif duration and duration <= 0:
+                results.append(ValueError("Vehicle parking duration should be positive"))
+                continue
+            vehicle_type, ticket = record
+            exit_time = ticket.entry_time + duration if duration else now
+            stay = exit_time - ticket.entry_time
+            fees_paid = fees.get((vehicle_type, stay))
+            if fees_paid is None:
+                fees_paid = fees[vehicle_type, stay] = self._quote_hours(
+                    vehicle_type, stay / SEC_PER_HR
+                )
+            quoted.append((position, vehicle_type, ticket, exit_time, fees_paid))
+            results.append(None)
+
+        closed: List[Tuple[int, VehicleType, CompactTicket, int, int]] = []
+        # vehicle type of the bay each closed ticket took
+        closed_bays: List[VehicleType] = []
+        with self._locked({vehicle_type for _, vehicle_type, _, _, _ in quoted}):
+            for item in quoted:
+                position, vehicle_type, ticket, _, _ = item
+                # another gate may have unparked the same ticket in the meantime
+                if records.pop(ticket.ticket_number, None) is None:
+                    results[position] = ValueError(UNKNOWN_TICKET_MSG.format(ticket.ticket_number))
+                    continue
+                bay_type = self._bay_type(vehicle_type, ticket.spot_number)
+                self.occupied_spots[bay_type] -= 1
+                self.free_spots[vehicle_type].release(ticket.spot_number)
+                closed.append(item)
+                closed_bays.append(bay_type)
+            if self.board is not None:
+                for bay_type in set(closed_bays):
+                    self.board.publish(bay_type, self.occupied_spots[bay_type])
+
+        receipt_number = self.receipts.next_block(len(closed))
+        receipts: List[Receipt] = []
+        for position, vehicle_type, ticket, exit_time, fees_paid in closed:
+            receipt = Receipt(receipt_number, None, None, fees_paid, ticket.entry_time, exit_time)
+            results[position] = receipt
+            receipts.append(receipt)
+            if self.journal is not None:
+                self.journal.record_unpark(self, ticket.ticket_number, receipt_number)
+            receipt_number += 1
+
+        with self._records_lock:
+            self.archive.extend(
+                (ticket.ticket_number, vehicle_type, ticket.entry_time, exit_time, fees_paid)
+                for _, vehicle_type, ticket, exit_time, fees_paid in closed
+            )
+            if self.entry_index is not None:
+                self.entry_index.remove_many(
+                    (ticket.ticket_number, ticket.entry_time) for _, _, ticket, _, _ in closed
+                )
+            if self.analytics is not None:
+                self.analytics.record_unparks(
+                    (item[1], item[3], item[4], bay_type)
+                    for item, bay_type in zip(closed, closed_bays)
+                )
+        if self.sweeper is not None or self.storage is not None:
+            for (_, _, ticket, _, _), receipt in zip(closed, receipts):
+                if self.sweeper is not None:
+                    self.sweeper.unwatch(ticket.ticket_number)
+                if self.storage is not None:
+                    self.storage.record_unpark(ticket.ticket_number, receipt)
+        if self.metrics is not None and closed:
+            elapsed = (perf_counter_ns() - started) // len(closed)
+            for _, vehicle_type, _, _, _ in closed:
+                self.metrics.record_unpark(vehicle_type, elapsed)
+        return cast(List[Union[Receipt, ValueError]], results)
+
+    def _quote(
+        self, ticket_number: int, fake_duration: Optional[int]
+    ) -> Tuple[VehicleType, CompactTicket, int, int]:
+        """
+        :return: vehicle type, ticket, exit time (epoch seconds) and fees of a parked vehicle
+                 leaving now or after fake_duration
+        """
+        record = self.vehicle_records.get(ticket_number)
+        if record is None:
+            raise ValueError(UNKNOWN_TICKET_MSG.format(ticket_number))
         elif fake_duration and fake_duration <= 0:
             raise ValueError("Vehicle parking duration should be positive")
 
-        vehicle_type, ticket = self.vehicle_records[ticket_number]
+        vehicle_type, ticket = record
 
-        duration_in_hours = (
-            fake_duration or (datetime.now() - ticket.entry_datetime).total_seconds()
-        ) / SEC_PER_HR
+        # the clock is read once, billed duration and exit time always agree
+        exit_time = ticket.entry_time + fake_duration if fake_duration else self.clock.now()
+        fees = self._quote_hours(vehicle_type, (exit_time - ticket.entry_time) / SEC_PER_HR)
+        return vehicle_type, ticket, exit_time, fees
 
-        fees_paid = self.fee_models[vehicle_type].calculate_fees(vehicle_type, duration_in_hours)
+    def _quote_hours(self, vehicle_type: VehicleType, duration_in_hours: float) -> int:
+        fee_model = self.fee_models[vehicle_type]
+        started = perf_counter_ns() if self.metrics is not None else 0
+        fees: int = (
+            self.quotes.quote(fee_model, vehicle_type, duration_in_hours)
+            if self.quotes is not None
+            else fee_model.calculate_fees(vehicle_type, duration_in_hours)
+        )
+        if self.metrics is not None:
+            self.metrics.record_fees(
+                getattr(fee_model, "name", type(fee_model).__name__), perf_counter_ns() - started
+            )
+        return fees
+
+    def quote_fees(self, ticket_number: int, fake_duration: Optional[int] = None) -> int:
+        """
+        Quotes the fees a parked vehicle would pay if it left now, without unparking it,
+        e.g. for exit kiosks polling the amount due
+
+        :param ticket_number: ticket of the parked vehicle
+        :param fake_duration:
+                if assigned, uses that as total time spent inside a parking lot, in seconds
+        :return: fees to be paid on exit
+        """
+        return self._quote(ticket_number, fake_duration)[3]
+
+    def parked_longer_than(self, hours: float, now: Optional[datetime] = None) -> List[Ticket]:
+        """
+        Answered from the entry index if the lot has one, by scanning every active session
+        otherwise
+
+        :param hours: parked duration
+        :param now: if assigned, measures durations up to then instead of the current time
+        :return: tickets of the vehicles parked for longer than hours, longest parked first
+        """
+        now_time = to_epoch_seconds(now) if now else self.clock.now()
+        entered_before = math.ceil(now_time - hours * SEC_PER_HR)
+        if self.entry_index is None:
+            return [
+                ticket.to_ticket()
+                for _, _, ticket in sorted(
+                    (ticket.entry_time, ticket_number, ticket)
+                    for ticket_number, (_, ticket) in list(self.vehicle_records.items())
+                    if ticket.entry_time < entered_before
+                )
+            ]
+        with self._records_lock:
+            ticket_numbers = self.entry_index.entered_before(entered_before)
+        return [
+            record[1].to_ticket()
+            for record in map(self.vehicle_records.get, ticket_numbers)
+            if record is not None
+        ]
+
+    def sweep(self, now: Optional[datetime] = None) -> int:
+        """
+        Runs the sweeper's overstay and fee change callbacks that came due, callers should
+        call it periodically
 
-        receipt = Receipt(
-            receipt_number=self.receipt_counter,
-            entry_datetime=ticket.entry_datetime,
-            exit_datetime=ticket.entry_datetime + timedelta(seconds=fake_duration)
-            if fake_duration
-            else datetime.now(),
-            fees_paid=fees_paid,
+        :param now: if assigned, sweeps up to then instead of the current time
+        :return: number of callbacks run
+        """
+        if self.sweeper is None:
+            return 0
+        fired: int = self.sweeper.advance(to_epoch_seconds(now) if now else self.clock.now())
+        return fired
+
+    def reserve(
+        self, vehicle_type: VehicleType, start: datetime, end: datetime
+    ) -> Union[Reservation, ERROR_MSG]:
+        """
+        Reserves a spot ahead, for a vehicle parking with the reservation number within the
+        window, its spot is held from the start of the window until it parks or the window ends.
+        Reservations are best effort: nothing is held before the window starts, as walk-ins
+        do not say when they leave, so walk-ins parked by then may have filled the lot. The
+        reserved vehicle then gets "No space available", and the first spots freed in its
+        window go to it rather than to walk-ins
+
+        :param vehicle_type: vehicle type the spot is reserved for
+        :param start: start of the window, rounded down to the reservation slots
+        :param end: end of the window, rounded up to the reservation slots
+        :return: the reservation or "No space available"
+        """
+        if self.reservations is None:
+            raise ValueError("Spots cannot be reserved in this parking lot")
+        index = self.reservations.index(vehicle_type)
+        start_time, end_time = to_epoch_seconds(start), to_epoch_seconds(end)
+        with self._spot_locks[vehicle_type]:
+            now = self.clock.now()
+            if not index.is_available(start_time, end_time, now):
+                return "No space available"
+            reservation_number = self.reservations.numbers.next()
+            index.reserve(reservation_number, start_time, end_time, now)
+        return Reservation(
+            reservation_number,
+            vehicle_type,
+            from_epoch_seconds(start_time),
+            from_epoch_seconds(end_time),
         )
 
-        self.occupied_spots[vehicle_type] -= 1
-        self.receipt_counter += 1
+    def cancel_reservation(self, reservation_number: int) -> None:
+        if self.reservations is None:
+            raise ValueError("Spots cannot be reserved in this parking lot")
+        vehicle_type = self.reservations.vehicle_type(reservation_number)
+        with self._spot_locks[vehicle_type]:
+            self.reservations.indexes[vehicle_type].cancel(reservation_number, self.clock.now())
 
-        return receipt
+    def is_available(self, vehicle_type: VehicleType, start: datetime, end: datetime) -> bool:
+        """
+        :return: whether a spot can still be reserved from start to end
+        """
+        if self.reservations is None:
+            raise ValueError("Spots cannot be reserved in this parking lot")
+        index = self.reservations.index(vehicle_type)
+        with self._spot_locks[vehicle_type]:
+            available: bool = index.is_available(
+                to_epoch_seconds(start), to_epoch_seconds(end), self.clock.now()
+            )
+        return available
+
+    def next_free_window(
+        self, vehicle_type: VehicleType, hours: float, after: Optional[datetime] = None
+    ) -> Optional[datetime]:
+        """
+        :param vehicle_type: vehicle type the spot would be reserved for
+        :param hours: length of the window
+        :param after: earliest start of the window, now if not assigned
+        :return: the earliest start of a window a spot can still be reserved for, None if none
+                 is within the reservation horizon
+        """
+        if self.reservations is None:
+            raise ValueError("Spots cannot be reserved in this parking lot")
+        index = self.reservations.index(vehicle_type)
+        with self._spot_locks[vehicle_type]:
+            now = self.clock.now()
+            start = index.next_free_window(
+                math.ceil(hours * SEC_PER_HR), to_epoch_seconds(after) if after else now, now
+            )
+        return from_epoch_seconds(start) if start is not None else None
+
+    def set_fee_model(self, vehicle_type: VehicleType, fee_model: FeeModel) -> None:
+        """
+        Changes the tariff of a vehicle type, vehicles already parked pay the new tariff on exit
+        """
+        previous = self.fee_models.get(vehicle_type)
+        self.fee_models[vehicle_type] = fee_model
+        if previous is not None and self.quotes is not None:
+            self.quotes.invalidate(previous)
+
+    def sessions_snapshot(
+        self,
+    ) -> Tuple[Dict[int, Tuple[VehicleType, CompactTicket]], int, int]:
+        """
+        Takes a consistent copy of the service state, even while gates are parking/unparking
+
+        :return: active vehicle records, next ticket number and next receipt number
+        """
+        with ExitStack() as stack:
+            for lock in self._spot_locks.values():
+                stack.enter_context(lock)
+            return dict(self.vehicle_records), self.ticket_counter, self.receipt_counter
+
+    def restore(
+        self,
+        vehicle_records: Dict[int, Tuple[VehicleType, CompactTicket]],
+        ticket_counter: int,
+        receipt_counter: int,
+    ) -> None:
+        """
+        Replaces the service state of a lot, e.g. with state recovered from a journal
+
+        :param vehicle_records: active vehicle records by ticket number
+        :param ticket_counter: ticket number to be handed out next
+        :param receipt_counter: receipt number to be handed out next
+        """
+        self.vehicle_records = dict(vehicle_records)
+        self.occupied_spots = {vehicle_type: 0 for vehicle_type in self.spots}
+        occupied: Dict[VehicleType, List[int]] = {vehicle_type: [] for vehicle_type in self.spots}
+        for vehicle_type, ticket in self.vehicle_records.values():
+            self.occupied_spots[self._bay_type(vehicle_type, ticket.spot_number)] += 1
+            occupied[vehicle_type].append(ticket.spot_number)
+        if self.garage is not None:
+            # spots of a garage are numbered across the garage, and overflowed vehicles park
+            # in the zones of another vehicle type
+            self.garage.restore(spot for spots in occupied.values() for spot in spots)
+        else:
+            self.free_spots = {
+                vehicle_type: FreeSpotIndex.from_occupied(capacity, occupied[vehicle_type])
+                for vehicle_type, capacity in self.spots.items()
+            }
+        if self.analytics is not None:
+            self.analytics.reset_occupancy(self.occupied_spots)
+        if self.board is not None:
+            self.board.publish_all(self.occupied_spots)
+        if self.entry_index is not None:
+            self.entry_index.clear()
+            self.entry_index.add_many(
+                (ticket_number, ticket.entry_time)
+                for ticket_number, (_, ticket) in self.vehicle_records.items()
+            )
+        if self.sweeper is not None:
+            for ticket_number, (vehicle_type, ticket) in self.vehicle_records.items():
+                self.sweeper.watch(
+                    ticket_number, vehicle_type, ticket.entry_time, self.fee_models[vehicle_type]
+                )
+        self.tickets.restart(ticket_counter)
+        self.receipts.restart(receipt_counter)
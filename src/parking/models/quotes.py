@@ -0,0 +1,88 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Tuple
+
+from parking.models.fees import FeeModel
+from parking.models.vehicle import VehicleType
+
+DEFAULT_MAX_QUOTES: int = 4096
+
+QuoteKey = Tuple[FeeModel, VehicleType, int]
+
+
+class QuoteCache:
+    """
+    A bounded LRU cache in front of FeeModel.calculate_fees. Fee models charge whole billable
+    units, so quotes are keyed by (fee model, vehicle type, billable bucket) instead of the
+    exact duration, see FeeModel.billable_bucket. Models that cannot tell their buckets are
+    priced directly, without caching.
+
+    Parking lots only quote through a cache they are handed: the built in tariffs are compiled
+    and price a stay faster than a lookup here, a cache pays off for fee models that are
+    costly to price, e.g. ones calling out to a tariff service.
+
+    Cached quotes go stale when a tariff changes, call invalidate afterwards
+    """
+
+    __slots__ = ("max_quotes", "hits", "misses", "_quotes", "_lock")
+
+    def __init__(self, max_quotes: int = DEFAULT_MAX_QUOTES):
+        """
+        :param max_quotes: quotes kept, the least recently used ones are evicted past that
+        """
+        if max_quotes <= 0:
+            raise ValueError("Quote cache size should be positive")
+        self.max_quotes = max_quotes
+        self.hits = 0
+        self.misses = 0
+        self._quotes: "OrderedDict[QuoteKey, int]" = OrderedDict()
+        self._lock = Lock()
+
+    def quote(
+        self, fee_model: FeeModel, vehicle_type: VehicleType, duration_in_hours: float
+    ) -> int:
+        """
+        :return: the fees calculate_fees charges, from the cache when possible
+        """
+        fees: Optional[int]
+        bucket = fee_model.billable_bucket(vehicle_type, duration_in_hours)
+        if bucket is None:
+            fees = fee_model.calculate_fees(vehicle_type, duration_in_hours)
+            return fees
+
+        key = (fee_model, vehicle_type, bucket)
+        with self._lock:
+            fees = self._quotes.get(key)
+            if fees is not None:
+                self._quotes.move_to_end(key)
+                self.hits += 1
+                return fees
+            self.misses += 1
+
+        fees = fee_model.calculate_fees(vehicle_type, duration_in_hours)
+        with self._lock:
+            self._quotes[key] = fees
+            if len(self._quotes) > self.max_quotes:
+                self._quotes.popitem(last=False)
+        return fees
+
+    def invalidate(self, fee_model: Optional[FeeModel] = None) -> None:
+        """
+        Drops cached quotes, e.g. after a tariff change
+
+        :param fee_model: if assigned, only the quotes of that fee model are dropped
+        """
+        with self._lock:
+            if fee_model is None:
+                self._quotes.clear()
+            else:
+                for key in [key for key in self._quotes if key[0] is fee_model]:
+                    del self._quotes[key]
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return len(self._quotes)
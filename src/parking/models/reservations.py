@@ -0,0 +1,313 @@
+import heapq
+from array import array
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from parking.models.sequence import Sequence
+from parking.models.slips import from_epoch_seconds
+from parking.models.vehicle import VehicleType
+
+DEFAULT_SLOT_SECONDS: int = 15 * 60
+DEFAULT_HORIZON_DAYS: int = 90
+SEC_PER_DAY: int = 24 * 3600
+
+
+class Reservation(NamedTuple):
+    reservation_number: int
+    vehicle_type: VehicleType
+    start_datetime: datetime
+    end_datetime: datetime
+
+
+class CapacityTimeline:
+    """
+    Counts of reservations per time slot, in a segment tree supporting adding to a range of
+    slots and the maximum over a range in O(log n).
+    The tree is a ring of slots slots: slot number s lives at s % slots, so it never needs
+    rebasing as time goes by, as long as the slots in use never span more than a revolution
+    """
+
+    __slots__ = ("slots", "_max", "_add")
+
+    def __init__(self, slots: int):
+        """
+        :param slots: slots of the ring, a power of 2
+        """
+        if slots <= 0 or slots & (slots - 1):
+            raise ValueError("Timeline slots should be a power of 2")
+        self.slots = slots
+        # node 1 is the root, node n covers the slots of nodes 2n and 2n + 1. _add holds what
+        # was added to a node's whole range, _max the node's maximum including its own _add
+        self._max = array("q", [0]) * (2 * slots)
+        self._add = array("q", [0]) * (2 * slots)
+
+    def _ranges(self, first: int, last: int) -> List[Tuple[int, int, int]]:
+        """
+        :return: (ring start, ring end, slot number at ring start) of the ring ranges covering
+                 slot numbers [first, last), latest first
+        """
+        start, end = first % self.slots, first % self.slots + (last - first)
+        if end <= self.slots:
+            return [(start, end, first)]
+        return [(0, end - self.slots, first + self.slots - start), (start, self.slots, first)]
+
+    def add(self, first: int, last: int, delta: int) -> None:
+        """
+        Adds delta to the counts of slot numbers [first, last)
+        """
+        for start, end, _ in self._ranges(first, last):
+            self._update(1, 0, self.slots, start, end, delta)
+
+    def _update(self, node: int, low: int, high: int, start: int, end: int, delta: int) -> None:
+        if end <= low or high <= start:
+            return
+        if start <= low and high <= end:
+            self._add[node] += delta
+            self._max[node] += delta
+            return
+        middle = (low + high) // 2
+        self._update(2 * node, low, middle, start, end, delta)
+        self._update(2 * node + 1, middle, high, start, end, delta)
+        self._max[node] = max(self._max[2 * node], self._max[2 * node + 1]) + self._add[node]
+
+    def max(self, first: int, last: int) -> int:
+        """
+        :return: highest count of slot numbers [first, last)
+        """
+        return max(
+            self._query(1, 0, self.slots, start, end)
+            for start, end, _ in self._ranges(first, last)
+        )
+
+    def _query(self, node: int, low: int, high: int, start: int, end: int) -> int:
+        if start <= low and high <= end:
+            return self._max[node]
+        middle = (low + high) // 2
+        if end <= middle:
+            highest = self._query(2 * node, low, middle, start, end)
+        elif middle <= start:
+            highest = self._query(2 * node + 1, middle, high, start, end)
+        else:
+            highest = max(
+                self._query(2 * node, low, middle, start, end),
+                self._query(2 * node + 1, middle, high, start, end),
+            )
+        return highest + self._add[node]
+
+    def last_at_least(self, first: int, last: int, count: int) -> Optional[int]:
+        """
+        :return: the latest slot number in [first, last) whose count is at least count
+        """
+        for start, end, offset in self._ranges(first, last):
+            found = self._last_at_least(1, 0, self.slots, start, end, count)
+            if found >= 0:
+                return offset + found - start
+        return None
+
+    def _last_at_least(
+        self, node: int, low: int, high: int, start: int, end: int, count: int
+    ) -> int:
+        if end <= low or high <= start or self._max[node] < count:
+            return -1
+        if high - low == 1:
+            return low
+        # counts below a node exclude what was added to the node itself
+        count -= self._add[node]
+        middle = (low + high) // 2
+        found = self._last_at_least(2 * node + 1, middle, high, start, end, count)
+        if found < 0:
+            found = self._last_at_least(2 * node, low, middle, start, end, count)
+        return found
+
+
+class ReservationIndex:
+    """
+    Reservations of a single vehicle type section, over the next horizon_days:
+        * a CapacityTimeline of how many reservations every slot_seconds slot holds, so
+          availability of a window and the next free window take O(log n)
+        * how many spots are held right now, for reservations whose window started but whose
+          vehicle did not park yet, so walk-ins leave them free. It is kept up to date from
+          heaps of window starts and ends, looking at it costs O(1) when no window started or
+          ended since the last look
+    Capacity is only promised against other reservations, spots are not held before a
+    window starts, so walk-ins parked by then may leave none free for it.
+    Windows are rounded out to whole slots. Times are epoch seconds, and should not go back
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        slot_seconds: int = DEFAULT_SLOT_SECONDS,
+        horizon_days: int = DEFAULT_HORIZON_DAYS,
+    ):
+        """
+        :param capacity: spots that may be reserved at the same time
+        :param slot_seconds: resolution of reservation windows
+        :param horizon_days: how far ahead reservations may end
+        """
+        if capacity < 0 or slot_seconds <= 0 or horizon_days <= 0:
+            raise ValueError("Reservation capacity and horizon should be positive")
+        self.capacity = capacity
+        self.slot_seconds = slot_seconds
+        self.horizon_seconds = horizon_days * SEC_PER_DAY
+        # reservations span at most the horizon and are dropped once over, so the slots in
+        # use never span more than twice the horizon
+        slots = 1
+        while slots < 2 * (self.horizon_seconds // slot_seconds + 2):
+            slots *= 2
+        self._timeline = CapacityTimeline(slots)
+        # reservation number -> (start, end) of the reservations not over nor cancelled
+        self._windows: Dict[int, Tuple[int, int]] = {}
+        self._claimed: Set[int] = set()
+        self._starts: List[Tuple[int, int]] = []
+        self._ends: List[Tuple[int, int]] = []
+        self._held = 0
+
+    def _slots(self, start: int, end: int) -> Tuple[int, int]:
+        return start // self.slot_seconds, -(-end // self.slot_seconds)
+
+    def _check_window(self, start: int, end: int, now: int) -> None:
+        if not now <= start < end <= now + self.horizon_seconds:
+            raise ValueError(
+                "Reservation windows should start from now on and end within "
+                f"{self.horizon_seconds // SEC_PER_DAY} days"
+            )
+
+    def held(self, now: int) -> int:
+        """
+        :return: spots held right now for reservations whose vehicle did not park yet
+        """
+        starts, ends = self._starts, self._ends
+        if (starts and starts[0][0] <= now) or (ends and ends[0][0] <= now):
+            self._expire(now)
+        return self._held
+
+    def _expire(self, now: int) -> None:
+        while self._starts and self._starts[0][0] <= now:
+            _, number = heapq.heappop(self._starts)
+            if number in self._windows and number not in self._claimed:
+                self._held += 1
+        while self._ends and self._ends[0][0] <= now:
+            _, number = heapq.heappop(self._ends)
+            window = self._windows.pop(number, None)
+            if window is None:
+                continue
+            if number in self._claimed:
+                self._claimed.discard(number)
+            else:
+                # a no show
+                self._held -= 1
+            self._timeline.add(*self._slots(*window), -1)
+
+    def is_available(self, start: int, end: int, now: int) -> bool:
+        """
+        :return: whether one more reservation fits within [start, end)
+        """
+        self._check_window(start, end, now)
+        self.held(now)
+        return self._timeline.max(*self._slots(start, end)) < self.capacity
+
+    def next_free_window(self, duration: int, after: int, now: int) -> Optional[int]:
+        """
+        :param duration: length of the window, in seconds
+        :param after: earliest start of the window
+        :return: the earliest start from after on of a window of duration one more reservation
+                 fits in, None if there is none within the horizon
+        """
+        start = max(after, now)
+        self.held(now)
+        while start + duration <= now + self.horizon_seconds:
+            first, last = self._slots(start, start + duration)
+            full = self._timeline.last_at_least(first, last, self.capacity)
+            if full is None:
+                return start
+            # every window overlapping that slot is full too
+            start = (full + 1) * self.slot_seconds
+        return None
+
+    def __contains__(self, reservation_number: int) -> bool:
+        return reservation_number in self._windows
+
+    def reserve(self, reservation_number: int, start: int, end: int, now: int) -> None:
+        if not self.is_available(start, end, now):
+            raise ValueError("No capacity left for the reservation window")
+        self._timeline.add(*self._slots(start, end), 1)
+        self._windows[reservation_number] = (start, end)
+        heapq.heappush(self._starts, (start, reservation_number))
+        heapq.heappush(self._ends, (end, reservation_number))
+
+    def cancel(self, reservation_number: int, now: int) -> None:
+        self.held(now)
+        if reservation_number in self._claimed:
+            raise ValueError(f"Reservation {reservation_number} has been used already")
+        window = self._windows.pop(reservation_number, None)
+        if window is None:
+            raise ValueError(f"Reservation {reservation_number} is not held")
+        if window[0] <= now:
+            self._held -= 1
+        self._timeline.add(*self._slots(*window), -1)
+
+    def claim(self, reservation_number: int, now: int) -> None:
+        """
+        Releases the spot held for a reservation whose vehicle is parking, the reservation
+        keeps counting against its window's capacity until the window is over
+        """
+        self.held(now)
+        window = self._windows.get(reservation_number)
+        if window is None or reservation_number in self._claimed:
+            raise ValueError(f"Reservation {reservation_number} is not held")
+        elif not window[0] <= now < window[1]:
+            raise ValueError(
+                f"Reservation {reservation_number} is for "
+                f"{from_epoch_seconds(window[0])} to {from_epoch_seconds(window[1])}"
+            )
+        self._claimed.add(reservation_number)
+        self._held -= 1
+
+    def unclaim(self, reservation_number: int) -> None:
+        """
+        Holds the spot of a claimed reservation again, e.g. its vehicle could not park. A
+        reservation whose window is over is not held anymore
+        """
+        if reservation_number in self._claimed and reservation_number in self._windows:
+            self._claimed.discard(reservation_number)
+            self._held += 1
+
+
+class Reservations:
+    """
+    Advance reservations of a parking lot, an index per vehicle type, see ReservationIndex.
+    A vehicle type's index is guarded by the lot's lock of that vehicle type
+    """
+
+    def __init__(
+        self,
+        capacity: Dict[VehicleType, int],
+        slot_seconds: int = DEFAULT_SLOT_SECONDS,
+        horizon_days: int = DEFAULT_HORIZON_DAYS,
+    ):
+        """
+        :param capacity: spots that may be reserved at the same time, by vehicle type
+        :param slot_seconds: resolution of reservation windows
+        :param horizon_days: how far ahead reservations may end
+        """
+        self.indexes = {
+            vehicle_type: ReservationIndex(spots, slot_seconds, horizon_days)
+            for vehicle_type, spots in capacity.items()
+        }
+        self.numbers = Sequence()
+
+    def index(self, vehicle_type: VehicleType) -> ReservationIndex:
+        index = self.indexes.get(vehicle_type)
+        if index is None:
+            raise ValueError(f"No spots can be reserved for {vehicle_type.name}")
+        return index
+
+    def vehicle_type(self, reservation_number: int) -> VehicleType:
+        """
+        :return: vehicle type of a reservation not over nor cancelled
+        """
+        for vehicle_type, index in self.indexes.items():
+            if reservation_number in index:
+                return vehicle_type
+        raise ValueError(f"Reservation {reservation_number} is not held")
@@ -0,0 +1,48 @@
+from threading import Lock
+
+
+class Sequence:
+    """
+    Hands out increasing numbers, each number is handed out exactly once even when the
+    sequence is shared between threads
+    """
+
+    __slots__ = ("_lock", "_next")
+
+    def __init__(self, start: int = 1):
+        """
+        :param start: first number to be handed out
+        """
+        self._lock = Lock()
+        self._next = start
+
+    @property
+    def value(self) -> int:
+        """
+        :return: the number the next call to next() hands out
+        """
+        return self._next
+
+    def next(self) -> int:
+        with self._lock:
+            number = self._next
+            self._next = number + 1
+        return number
+
+    def next_block(self, count: int) -> int:
+        """
+        Hands out count consecutive numbers at once
+
+        :return: the first number of the block
+        """
+        with self._lock:
+            number = self._next
+            self._next = number + count
+        return number
+
+    def restart(self, start: int) -> None:
+        """
+        :param start: number to be handed out next, e.g. recovered from a journal
+        """
+        with self._lock:
+            self._next = start
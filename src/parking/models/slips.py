@@ -1,35 +1,275 @@
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Text
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional, Text, Union
 
 DATE_FORMAT: Text = "%d-%b-%Y %H:%M:%S"
+# compact slips count seconds from this naive epoch, so no time zone is involved either way
+EPOCH: datetime = datetime(1970, 1, 1)
+
+
+def to_epoch_seconds(moment: datetime) -> int:
+    if moment.tzinfo is not None:
+        # naive date-times are local time, aware ones are taken to local time too
+        moment = moment.astimezone().replace(tzinfo=None)
+    # timedelta keeps days/seconds floored, cheaper than dividing by a timedelta
+    elapsed = moment - EPOCH
+    return elapsed.days * 86400 + elapsed.seconds
+
+
+def from_epoch_seconds(seconds: int) -> datetime:
+    return EPOCH + timedelta(0, seconds)
+
+
+@lru_cache(maxsize=4096)
+def format_epoch_seconds(seconds: int) -> Text:
+    """
+    :return: the moment in DATE_FORMAT, cached as slips issued within the same second, or a
+             ticket and its receipt, render the same date-time
+    """
+    return from_epoch_seconds(seconds).strftime(DATE_FORMAT)
+
+
+def format_moment(moment: Union[datetime, int]) -> Text:
+    """
+    :param moment: a date-time, or epoch seconds
+    """
+    if isinstance(moment, int):
+        return format_epoch_seconds(moment)
+    return moment.strftime(DATE_FORMAT)
+
+
+def render_ticket(ticket_number: int, spot_number: int, entry: Union[datetime, int]) -> Text:
+    """
+    :param entry: entry date-time, or epoch seconds
+    """
+    return (
+        f"Parking Ticket:\n\tTicket Number: {ticket_number:03}\n"
+        f"\tSpot Number: {spot_number}\n"
+        f"\tEntry Date-time: {format_moment(entry)}"
+    )
+
+
+def render_receipt(
+    receipt_number: int,
+    entry: Union[datetime, int],
+    exit: Union[datetime, int],
+    fees_paid: float,
+) -> Text:
+    """
+    :param entry: entry date-time, or epoch seconds
+    :param exit: exit date-time, or epoch seconds
+    """
+    return (
+        f"Parking Receipt:\n\tReceipt Number: R-{receipt_number:03}\n"
+        f"\tEntry Date-time: {format_moment(entry)}\n"
+        f"\tExit Date-time: {format_moment(exit)}\n"
+        f"\tFees: {fees_paid}"
+    )
 
 
-@dataclass
 class Ticket:
-    ticket_number: int
-    spot_number: int
-    entry_datetime: datetime
+    """
+    A parking ticket. Tickets a parking lot issues are built from the epoch seconds it keeps,
+    their entry date-time is only built when asked for or rendered
+    """
 
-    def __str__(self) -> Text:
+    __slots__ = ("ticket_number", "spot_number", "_entry_datetime", "_entry_time")
+
+    def __init__(
+        self,
+        ticket_number: int,
+        spot_number: int,
+        entry_datetime: Optional[datetime],
+        entry_time: int = 0,
+    ):
+        """
+        :param entry_datetime: entry date-time, if None it is built from entry_time when needed
+        :param entry_time: entry time in epoch seconds, only read if entry_datetime is None
+        """
+        self.ticket_number = ticket_number
+        self.spot_number = spot_number
+        self._entry_datetime = entry_datetime
+        self._entry_time = entry_time
+
+    @property
+    def entry_datetime(self) -> datetime:
+        if self._entry_datetime is None:
+            self._entry_datetime = from_epoch_seconds(self._entry_time)
+        return self._entry_datetime
+
+    @entry_datetime.setter
+    def entry_datetime(self, entry_datetime: datetime) -> None:
+        self._entry_datetime = entry_datetime
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Ticket):
+            return NotImplemented
+        return (self.ticket_number, self.spot_number, self.entry_datetime) == (
+            other.ticket_number,
+            other.spot_number,
+            other.entry_datetime,
+        )
+
+    def __repr__(self) -> Text:
         return (
-            f"Parking Ticket:\n\tTicket Number: {'{0:03}'.format(self.ticket_number)}\n"
-            f"\tSpot Number: {self.spot_number}\n"
-            f"\tEntry Date-time: {self.entry_datetime.strftime(DATE_FORMAT)}"
+            f"Ticket(ticket_number={self.ticket_number!r}, spot_number={self.spot_number!r}, "
+            f"entry_datetime={self.entry_datetime!r})"
         )
 
+    def __str__(self) -> Text:
+        # issued tickets render off their epoch seconds, without building their date-time
+        entry = self._entry_datetime if self._entry_datetime is not None else self._entry_time
+        return render_ticket(self.ticket_number, self.spot_number, entry)
+
 
-@dataclass
 class Receipt:
+    """
+    A parking receipt. Receipts a parking lot issues are built from the epoch seconds it
+    keeps, their date-times are only built when asked for or rendered
+    """
+
+    __slots__ = (
+        "receipt_number",
+        "fees_paid",
+        "_entry_datetime",
+        "_exit_datetime",
+        "_entry_time",
+        "_exit_time",
+    )
+
+    def __init__(
+        self,
+        receipt_number: int,
+        entry_datetime: Optional[datetime],
+        exit_datetime: Optional[datetime],
+        fees_paid: float,
+        entry_time: int = 0,
+        exit_time: int = 0,
+    ):
+        """
+        :param entry_datetime: entry date-time, if None it is built from entry_time when needed
+        :param exit_datetime: exit date-time, if None it is built from exit_time when needed
+        :param entry_time: entry time in epoch seconds, only read if entry_datetime is None
+        :param exit_time: exit time in epoch seconds, only read if exit_datetime is None
+        """
+        self.receipt_number = receipt_number
+        self.fees_paid = fees_paid
+        self._entry_datetime = entry_datetime
+        self._exit_datetime = exit_datetime
+        self._entry_time = entry_time
+        self._exit_time = exit_time
+
+    @property
+    def entry_datetime(self) -> datetime:
+        if self._entry_datetime is None:
+            self._entry_datetime = from_epoch_seconds(self._entry_time)
+        return self._entry_datetime
+
+    @entry_datetime.setter
+    def entry_datetime(self, entry_datetime: datetime) -> None:
+        self._entry_datetime = entry_datetime
+
+    @property
+    def exit_datetime(self) -> datetime:
+        if self._exit_datetime is None:
+            self._exit_datetime = from_epoch_seconds(self._exit_time)
+        return self._exit_datetime
+
+    @exit_datetime.setter
+    def exit_datetime(self, exit_datetime: datetime) -> None:
+        self._exit_datetime = exit_datetime
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Receipt):
+            return NotImplemented
+        return (
+            self.receipt_number,
+            self.entry_datetime,
+            self.exit_datetime,
+            self.fees_paid,
+        ) == (other.receipt_number, other.entry_datetime, other.exit_datetime, other.fees_paid)
+
+    def __repr__(self) -> Text:
+        return (
+            f"Receipt(receipt_number={self.receipt_number!r}, "
+            f"entry_datetime={self.entry_datetime!r}, exit_datetime={self.exit_datetime!r}, "
+            f"fees_paid={self.fees_paid!r})"
+        )
+
+    def __str__(self) -> Text:
+        # issued receipts render off their epoch seconds, without building their date-times
+        return render_receipt(
+            self.receipt_number,
+            self._entry_datetime if self._entry_datetime is not None else self._entry_time,
+            self._exit_datetime if self._exit_datetime is not None else self._exit_time,
+            self.fees_paid,
+        )
+
+
+@dataclass(slots=True)
+class CompactTicket:
+    """
+    A Ticket holding its entry time as whole epoch seconds, for tickets kept around in bulk.
+    The entry date-time is only built when asked for or rendered, renders exactly as a Ticket.
+    Not frozen, a parking lot builds one per park and a frozen dataclass sets every field
+    through object.__setattr__
+    """
+
+    ticket_number: int
+    spot_number: int
+    entry_time: int
+
+    @classmethod
+    def from_ticket(cls, ticket: Ticket) -> "CompactTicket":
+        return cls(
+            ticket.ticket_number, ticket.spot_number, to_epoch_seconds(ticket.entry_datetime)
+        )
+
+    @property
+    def entry_datetime(self) -> datetime:
+        return from_epoch_seconds(self.entry_time)
+
+    def to_ticket(self) -> Ticket:
+        return Ticket(self.ticket_number, self.spot_number, None, self.entry_time)
+
+    def __str__(self) -> Text:
+        return render_ticket(self.ticket_number, self.spot_number, self.entry_time)
+
+
+@dataclass(slots=True, frozen=True)
+class CompactReceipt:
+    """
+    A Receipt holding its entry/exit times as whole epoch seconds, for receipts kept around in
+    bulk. Date-times are only built when asked for or rendered, renders exactly as a Receipt
+    """
+
     receipt_number: int
-    entry_datetime: datetime
-    exit_datetime: datetime
+    entry_time: int
+    exit_time: int
     fees_paid: float
 
-    def __str__(self) -> Text:
-        return (
-            f"Parking Receipt:\n\tReceipt Number: R-{'{0:03}'.format(self.receipt_number)}\n"
-            f"\tEntry Date-time: {self.entry_datetime.strftime(DATE_FORMAT)}\n"
-            f"\tExit Date-time: {self.exit_datetime.strftime(DATE_FORMAT)}\n"
-            f"\tFees: {self.fees_paid}"
+    @classmethod
+    def from_receipt(cls, receipt: Receipt) -> "CompactReceipt":
+        return cls(
+            receipt.receipt_number,
+            to_epoch_seconds(receipt.entry_datetime),
+            to_epoch_seconds(receipt.exit_datetime),
+            receipt.fees_paid,
         )
+
+    @property
+    def entry_datetime(self) -> datetime:
+        return from_epoch_seconds(self.entry_time)
+
+    @property
+    def exit_datetime(self) -> datetime:
+        return from_epoch_seconds(self.exit_time)
+
+    def to_receipt(self) -> Receipt:
+        return Receipt(
+            self.receipt_number, None, None, self.fees_paid, self.entry_time, self.exit_time
+        )
+
+    def __str__(self) -> Text:
+        return render_receipt(self.receipt_number, self.entry_time, self.exit_time, self.fees_paid)
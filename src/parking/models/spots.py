@@ -0,0 +1,89 @@
+import heapq
+from typing import Iterable, List
+
+
+class FreeSpotIndex:
+    """
+    Keeps track of the free spot numbers of a single vehicle type section.
+
+    Spots that have never been handed out are served from a high water mark, spots released
+    below it are kept in a min-heap, so the lowest free spot is always handed out first in
+    O(log n) regardless of the order vehicles leave in
+    """
+
+    __slots__ = ("capacity", "_released", "_next_fresh")
+
+    def __init__(self, capacity: int):
+        """
+        :param capacity: total number of spots in the section, numbered 1..capacity
+        """
+        if capacity < 0:
+            raise ValueError("Parking spot capacity cannot be negative")
+        self.capacity = capacity
+        self._released: List[int] = []
+        self._next_fresh = 1
+
+    @classmethod
+    def from_occupied(cls, capacity: int, occupied_spots: Iterable[int]) -> "FreeSpotIndex":
+        """
+        Rebuilds the index of a section whose occupied spot numbers are known, e.g. on recovery
+
+        :param capacity: total number of spots in the section, numbered 1..capacity
+        :param occupied_spots: spot numbers currently taken
+        """
+        index = cls(capacity)
+        occupied = set(occupied_spots)
+        if occupied:
+            if not occupied <= set(range(1, capacity + 1)):
+                raise ValueError("Occupied spots should be within the section capacity")
+            index._next_fresh = max(occupied) + 1
+            index._released = [
+                spot for spot in range(1, index._next_fresh) if spot not in occupied
+            ]
+        return index
+
+    def __len__(self) -> int:
+        """
+        :return: number of free spots left in the section
+        """
+        return self.capacity - self._next_fresh + 1 + len(self._released)
+
+    @property
+    def occupied(self) -> int:
+        return self.capacity - len(self)
+
+    def acquire(self) -> int:
+        """
+        Hands out the lowest free spot number
+
+        :return: the spot number, or 0 if the section is full
+        """
+        if self._released:
+            return heapq.heappop(self._released)
+        if self._next_fresh <= self.capacity:
+            spot_number = self._next_fresh
+            self._next_fresh += 1
+            return spot_number
+        return 0
+
+    def acquire_many(self, count: int) -> List[int]:
+        """
+        Hands out the count lowest free spot numbers, fewer if the section fills up
+
+        :return: the spot numbers, lowest first
+        """
+        spots = [heapq.heappop(self._released) for _ in range(min(count, len(self._released)))]
+        fresh = min(count - len(spots), self.capacity - self._next_fresh + 1)
+        spots.extend(range(self._next_fresh, self._next_fresh + fresh))
+        self._next_fresh += fresh
+        return spots
+
+    def release(self, spot_number: int) -> None:
+        """
+        Gives a previously acquired spot back to the section
+
+        :param spot_number: spot number handed out by acquire
+        """
+        if not 1 <= spot_number < self._next_fresh:
+            raise ValueError(f"Spot {spot_number} has not been handed out")
+        heapq.heappush(self._released, spot_number)
@@ -0,0 +1,265 @@
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from queue import Queue
+from threading import Lock
+from typing import Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from parking.models.slips import Receipt, Ticket, from_epoch_seconds, to_epoch_seconds
+from parking.models.vehicle import VEHICLE_TYPES, VEHICLE_TYPE_CODES, VehicleType
+
+
+class StoredSession(NamedTuple):
+    """
+    A parking session as stored, exit fields are None while the vehicle is parked
+    """
+
+    ticket_number: int
+    vehicle_type: VehicleType
+    spot_number: int
+    entry_datetime: datetime
+    exit_datetime: Optional[datetime]
+    receipt_number: Optional[int]
+    fees_paid: Optional[float]
+
+
+class SessionStore(ABC):
+    """
+    Where a parking lot keeps every session and receipt it ever issued, unlike the archive
+    history is not bounded by memory
+    """
+
+    @abstractmethod
+    def record_park(self, vehicle_type: VehicleType, ticket: Ticket) -> None:
+        pass
+
+    @abstractmethod
+    def record_unpark(self, ticket_number: int, receipt: Receipt) -> None:
+        pass
+
+    @abstractmethod
+    def find_session(self, ticket_number: int) -> Optional[StoredSession]:
+        pass
+
+    @abstractmethod
+    def sessions_between(self, start: datetime, end: datetime) -> List[StoredSession]:
+        """
+        :return: sessions that entered within [start, end), by entry time
+        """
+        pass
+
+    def commit(self) -> None:
+        """
+        Makes recorded sessions durable and visible to readers, if the store batches them
+        """
+
+    def close(self) -> None:
+        pass
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    ticket_number INTEGER PRIMARY KEY,
+    vehicle_type INTEGER NOT NULL,
+    spot_number INTEGER NOT NULL,
+    entry_time INTEGER NOT NULL,
+    exit_time INTEGER,
+    receipt_number INTEGER,
+    fees_paid REAL
+);
+CREATE INDEX IF NOT EXISTS sessions_entry_time ON sessions (entry_time);
+"""
+_INSERT_SESSION = (
+    "INSERT OR REPLACE INTO sessions (ticket_number, vehicle_type, spot_number, entry_time) "
+    "VALUES (?, ?, ?, ?)"
+)
+_CLOSE_SESSION = (
+    "UPDATE sessions SET exit_time = ?, receipt_number = ?, fees_paid = ? "
+    "WHERE ticket_number = ?"
+)
+_SELECT_SESSIONS = (
+    "SELECT ticket_number, vehicle_type, spot_number, entry_time, exit_time, receipt_number, "
+    "fees_paid FROM sessions"
+)
+_FIND_SESSION = f"{_SELECT_SESSIONS} WHERE ticket_number = ?"
+_SESSIONS_BETWEEN = (
+    f"{_SELECT_SESSIONS} WHERE entry_time >= ? AND entry_time < ? ORDER BY entry_time"
+)
+_CLOSED_SESSIONS_BETWEEN = (
+    "SELECT vehicle_type, entry_time, exit_time, fees_paid FROM sessions "
+    "WHERE entry_time >= ? AND entry_time < ? AND exit_time IS NOT NULL"
+)
+
+
+_Row = Tuple[int, int, int, int, Optional[int], Optional[int], Optional[float]]
+
+
+def _stored_session(row: _Row) -> StoredSession:
+    ticket_number, vehicle_type, spot_number, entry_time, exit_time, receipt_number, fees = row
+    return StoredSession(
+        ticket_number,
+        VEHICLE_TYPES[vehicle_type],
+        spot_number,
+        from_epoch_seconds(entry_time),
+        from_epoch_seconds(exit_time) if exit_time is not None else None,
+        receipt_number,
+        fees,
+    )
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Keeps sessions in a sqlite3 database in WAL mode, one row per ticket, indexed by ticket
+    number (the primary key) and entry time, times are stored as whole epoch seconds.
+
+    Writes are batched like the journal's: they are committed in one transaction once
+    batch_size are pending or the oldest is older than max_delay seconds. Reads go through a
+    small pool of reader connections, in WAL mode readers see the last commit and neither
+    block nor are blocked by the writer, so reporting never stalls the gates
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        batch_size: int = 256,
+        max_delay: float = 0.05,
+        readers: int = 4,
+    ):
+        """
+        :param path: database file, created if missing
+        :param batch_size: writes pending before they are committed together
+        :param max_delay: seconds a write may stay pending, checked whenever one is recorded
+        :param readers: reader connections pooled for lookups and reports
+        """
+        if batch_size <= 0 or readers <= 0:
+            raise ValueError("Store batch size and readers should be positive")
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        # WAL is consistent after a crash with NORMAL, commits only skip the fsync
+        self._writer.execute("PRAGMA synchronous=NORMAL")
+        self._writer.executescript(_SCHEMA)
+        self._pending_parks: List[Tuple[int, int, int, int]] = []
+        self._pending_unparks: List[Tuple[int, int, float, int]] = []
+        self._pending_since = 0.0
+        self._lock = Lock()
+        self._readers: "Queue[sqlite3.Connection]" = Queue()
+        for _ in range(readers):
+            self._readers.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        # connections are shared between gate/report threads, never used by two at once
+        return sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+
+    def record_park(self, vehicle_type: VehicleType, ticket: Ticket) -> None:
+        with self._lock:
+            self._mark_pending()
+            self._pending_parks.append(
+                (
+                    ticket.ticket_number,
+                    VEHICLE_TYPE_CODES[vehicle_type],
+                    ticket.spot_number,
+                    to_epoch_seconds(ticket.entry_datetime),
+                )
+            )
+            self._commit_if_due()
+
+    def record_unpark(self, ticket_number: int, receipt: Receipt) -> None:
+        with self._lock:
+            self._mark_pending()
+            self._pending_unparks.append(
+                (
+                    to_epoch_seconds(receipt.exit_datetime),
+                    receipt.receipt_number,
+                    receipt.fees_paid,
+                    ticket_number,
+                )
+            )
+            self._commit_if_due()
+
+    def _mark_pending(self) -> None:
+        if not self._pending_parks and not self._pending_unparks:
+            self._pending_since = time.monotonic()
+
+    def _commit_if_due(self) -> None:
+        if (
+            len(self._pending_parks) + len(self._pending_unparks) >= self.batch_size
+            or time.monotonic() - self._pending_since >= self.max_delay
+        ):
+            self._commit()
+
+    def commit(self) -> None:
+        """
+        Commits pending writes, callers that go idle should call it periodically
+        """
+        with self._lock:
+            self._commit()
+
+    def _commit(self) -> None:
+        if not self._pending_parks and not self._pending_unparks:
+            return
+        with self._writer:
+            self._writer.execute("BEGIN")
+            # a pending unpark's session is either committed already or pending in this batch,
+            # lots record a park under their spot lock, before its ticket can be unparked
+            self._writer.executemany(_INSERT_SESSION, self._pending_parks)
+            self._writer.executemany(_CLOSE_SESSION, self._pending_unparks)
+        self._pending_parks.clear()
+        self._pending_unparks.clear()
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        connection = self._readers.get()
+        try:
+            yield connection
+        finally:
+            self._readers.put(connection)
+
+    def find_session(self, ticket_number: int) -> Optional[StoredSession]:
+        with self._reader() as reader:
+            row = reader.execute(_FIND_SESSION, (ticket_number,)).fetchone()
+        return _stored_session(row) if row is not None else None
+
+    def sessions_between(self, start: datetime, end: datetime) -> List[StoredSession]:
+        with self._reader() as reader:
+            rows = reader.execute(
+                _SESSIONS_BETWEEN, (to_epoch_seconds(start), to_epoch_seconds(end))
+            ).fetchall()
+        return [_stored_session(row) for row in rows]
+
+    def closed_sessions(
+        self, start: datetime, end: datetime, chunk_size: int
+    ) -> Iterator[List[Tuple[int, int, int, float]]]:
+        """
+        Streams the closed sessions that entered within [start, end), in no particular order,
+        chunk_size rows at a time so history of any length is read in bounded memory.
+        A reader connection is held until the iteration is over
+
+        :return: chunks of (vehicle type code, entry time, exit time, fees) rows, times are
+                 epoch seconds
+        """
+        if chunk_size <= 0:
+            raise ValueError("Chunk size should be positive")
+        with self._reader() as reader:
+            cursor = reader.execute(
+                _CLOSED_SESSIONS_BETWEEN, (to_epoch_seconds(start), to_epoch_seconds(end))
+            )
+            try:
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        return
+                    yield rows
+            finally:
+                cursor.close()
+
+    def close(self) -> None:
+        self.commit()
+        self._writer.close()
+        while not self._readers.empty():
+            self._readers.get().close()
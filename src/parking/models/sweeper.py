@@ -0,0 +1,188 @@
+import math
+from functools import partial
+from threading import Lock
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from parking.models.fees import FeeModel
+from parking.models.vehicle import VehicleType
+
+SEC_PER_HR: int = 3600
+DEFAULT_TICK_SECONDS: int = 60
+DEFAULT_SLOTS: int = 1024
+
+Timer = Tuple[int, Callable[[], None]]
+
+
+class TimingWheel:
+    """
+    A hashed timing wheel: timers hash into one of slots slots by their deadline tick, so
+    scheduling and cancelling are O(1) and advancing the clock only visits the slots of the
+    ticks that passed. A timer due more than a revolution away stays in its slot and is skipped
+    until its revolution comes, so every timer is visited about deadline / (slots * tick) times.
+    Timers fire on the first advance to their deadline's tick or later, the current tick's slot
+    is visited again by every advance so timers scheduled in the past fire on the next one
+    """
+
+    __slots__ = ("tick_seconds", "_slots", "_slot_of", "_tick")
+
+    def __init__(
+        self, now: int, tick_seconds: int = DEFAULT_TICK_SECONDS, slots: int = DEFAULT_SLOTS
+    ):
+        """
+        :param now: current time, in epoch seconds
+        :param tick_seconds: resolution of the wheel
+        :param slots: slots of the wheel, a revolution lasts slots ticks
+        """
+        if tick_seconds <= 0 or slots <= 0:
+            raise ValueError("Timing wheel ticks and slots should be positive")
+        self.tick_seconds = tick_seconds
+        self._slots: List[Dict[Hashable, Timer]] = [{} for _ in range(slots)]
+        self._slot_of: Dict[Hashable, int] = {}
+        self._tick = now // tick_seconds
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def schedule(self, key: Hashable, deadline: int, callback: Callable[[], None]) -> None:
+        """
+        Schedules callback at the deadline (epoch seconds), replacing the timer with the same
+        key if any, deadlines already passed fire on the next advance
+        """
+        self.cancel(key)
+        deadline_tick = max(-(-deadline // self.tick_seconds), self._tick)
+        slot = deadline_tick % len(self._slots)
+        self._slots[slot][key] = (deadline_tick, callback)
+        self._slot_of[key] = slot
+
+    def cancel(self, key: Hashable) -> None:
+        slot = self._slot_of.pop(key, None)
+        if slot is not None:
+            del self._slots[slot][key]
+
+    def advance(self, now: int) -> List[Callable[[], None]]:
+        """
+        Moves the clock to now (epoch seconds)
+
+        :return: callbacks of the timers that came due, for the caller to run
+        """
+        now_tick = max(now // self.tick_seconds, self._tick)
+        slots = len(self._slots)
+        due: List[Callable[[], None]] = []
+        for tick in range(self._tick, self._tick + 1 + min(now_tick - self._tick, slots - 1)):
+            timers = self._slots[tick % slots]
+            for key in [key for key, (deadline, _) in timers.items() if deadline <= now_tick]:
+                due.append(timers.pop(key)[1])
+                del self._slot_of[key]
+        self._tick = now_tick
+        return due
+
+
+class SessionSweeper:
+    """
+    Watches active sessions and calls back, from advance, when:
+        * a session has been parked for overstay_hours, once
+        * a session's fees are about to change, e.g. a new day is charged, see
+          FeeModel.next_fee_change, once per change
+    Timers live in a TimingWheel so a session costs O(1) amortised whatever the lot size
+    """
+
+    def __init__(
+        self,
+        overstay_hours: Optional[float] = None,
+        on_overstay: Optional[Callable[[int, VehicleType], None]] = None,
+        on_fee_change: Optional[Callable[[int, VehicleType, float], None]] = None,
+        tick_seconds: int = DEFAULT_TICK_SECONDS,
+        slots: int = DEFAULT_SLOTS,
+    ):
+        """
+        :param overstay_hours: parked duration past which on_overstay is called
+        :param on_overstay: called with the ticket number and vehicle type of an overstay
+        :param on_fee_change:
+                called with the ticket number, vehicle type and the parked duration (in hours)
+                fees change at
+        :param tick_seconds: resolution of the callbacks
+        :param slots: slots of the timing wheel
+        """
+        self.overstay_hours = overstay_hours
+        self.on_overstay = on_overstay
+        self.on_fee_change = on_fee_change
+        self.tick_seconds = tick_seconds
+        self.slots = slots
+        self._wheel: Optional[TimingWheel] = None
+        # ticket number -> (vehicle type, entry epoch seconds, fee model)
+        self._sessions: Dict[int, Tuple[VehicleType, int, FeeModel]] = {}
+        self._lock = Lock()
+
+    def _timers(self, now: int) -> TimingWheel:
+        if self._wheel is None:
+            self._wheel = TimingWheel(now, self.tick_seconds, self.slots)
+        return self._wheel
+
+    def watch(
+        self,
+        ticket_number: int,
+        vehicle_type: VehicleType,
+        entry_time: int,
+        fee_model: FeeModel,
+    ) -> None:
+        """
+        :param entry_time: entry time of the session, in epoch seconds
+        """
+        with self._lock:
+            wheel = self._timers(entry_time)
+            self._sessions[ticket_number] = (vehicle_type, entry_time, fee_model)
+            if self.overstay_hours is not None and self.on_overstay is not None:
+                wheel.schedule(
+                    ("overstay", ticket_number),
+                    entry_time + math.ceil(self.overstay_hours * SEC_PER_HR),
+                    partial(self.on_overstay, ticket_number, vehicle_type),
+                )
+            if self.on_fee_change is not None:
+                self._schedule_fee_change(ticket_number, 0.0)
+
+    def _schedule_fee_change(self, ticket_number: int, duration_in_hours: float) -> None:
+        vehicle_type, entry_time, fee_model = self._sessions[ticket_number]
+        hours = fee_model.next_fee_change(vehicle_type, duration_in_hours)
+        if hours is not None and self._wheel is not None:
+            self._wheel.schedule(
+                ("fee", ticket_number),
+                entry_time + math.ceil(hours * SEC_PER_HR),
+                partial(self._fee_changed, ticket_number, vehicle_type, hours),
+            )
+
+    def _fee_changed(self, ticket_number: int, vehicle_type: VehicleType, hours: float) -> None:
+        with self._lock:
+            if ticket_number not in self._sessions:
+                return
+            self._schedule_fee_change(ticket_number, hours)
+        if self.on_fee_change is not None:
+            self.on_fee_change(ticket_number, vehicle_type, hours)
+
+    def unwatch(self, ticket_number: int) -> None:
+        with self._lock:
+            if self._sessions.pop(ticket_number, None) is not None and self._wheel is not None:
+                self._wheel.cancel(("overstay", ticket_number))
+                self._wheel.cancel(("fee", ticket_number))
+
+    def advance(self, now: int) -> int:
+        """
+        Runs the callbacks that came due by now (epoch seconds), outside the sweeper's lock so
+        they may unpark vehicles. Fee changes are followed one after the other, so a long
+        advance reports every change the session went through
+
+        :return: number of callbacks run
+        """
+        fired = 0
+        while True:
+            with self._lock:
+                if self._wheel is None:
+                    return fired
+                due = self._wheel.advance(now)
+            if not due:
+                return fired
+            for callback in due:
+                callback()
+            fired += len(due)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
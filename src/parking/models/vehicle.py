@@ -5,3 +5,12 @@ class VehicleType(Enum):
     MOTORCYCLE_SCOOTER = "Motorcycle/Scooter"
     CAR_SUV = "Car/SUV"
     BUS_TRUCK = "Bus/Truck"
+
+    # members are singletons compared by identity, the identity hash keeps the per call dict
+    # lookups by vehicle type in C instead of going through Enum.__hash__
+    __hash__ = object.__hash__
+
+
+# stable small integer codes, used wherever vehicle types are stored in typed arrays
+VEHICLE_TYPES = list(VehicleType)
+VEHICLE_TYPE_CODES = {vehicle_type: code for code, vehicle_type in enumerate(VEHICLE_TYPES)}
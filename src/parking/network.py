@@ -0,0 +1,191 @@
+import multiprocessing
+import zlib
+from datetime import datetime
+from multiprocessing.connection import Connection
+from typing import Any, Dict, Hashable, Iterable, List, NamedTuple, Optional, Tuple, Union, cast
+
+from parking.models.fees import FeeModel
+from parking.models.parking_lot import ERROR_MSG, ParkingLot
+from parking.models.slips import Receipt, Ticket
+from parking.models.vehicle import VehicleType
+
+LotId = Hashable
+Result = Union[Ticket, Receipt, ERROR_MSG, Exception]
+
+PARK = "park"
+UNPARK = "unpark"
+FREE_SPOTS = "free_spots"
+
+
+class LotConfig(NamedTuple):
+    name: str
+    spots: Dict[VehicleType, int]
+    fee_models: Dict[VehicleType, FeeModel]
+
+
+class Request(NamedTuple):
+    """
+    A park or unpark call routed to a lot:
+        * Request(PARK, lot_id, vehicle_type, fake_entry_time)
+        * Request(UNPARK, lot_id, ticket_number, fake_duration)
+    """
+
+    operation: str
+    lot_id: LotId
+    argument: Any
+    fake: Any = None
+
+
+def _run_requests(parking_lots: Dict[LotId, ParkingLot], requests: List[Request]) -> List[Result]:
+    results: List[Result] = []
+    for request in requests:
+        parking_lot = parking_lots.get(request.lot_id)
+        if parking_lot is None:
+            results.append(ValueError(f"Lot {request.lot_id} is not part of this network"))
+            continue
+        try:
+            if request.operation == PARK:
+                results.append(parking_lot.park_vehicle(request.argument, request.fake))
+            elif request.operation == UNPARK:
+                results.append(parking_lot.unpark_vehicle(request.argument, request.fake))
+            else:
+                raise ValueError(f"Unknown operation {request.operation}")
+        except Exception as e:
+            # a failing request is answered with its exception, the worker keeps serving
+            results.append(e)
+    return results
+
+
+def _free_spots(parking_lots: Dict[LotId, ParkingLot]) -> Dict[VehicleType, int]:
+    free: Dict[VehicleType, int] = {}
+    for parking_lot in parking_lots.values():
+        for vehicle_type, spots in parking_lot.free_spots.items():
+            free[vehicle_type] = free.get(vehicle_type, 0) + len(spots)
+    return free
+
+
+def _worker(connection: Connection, configs: Dict[LotId, LotConfig]) -> None:
+    """
+    Owns the lots of one shard, answers one message per batch of requests until closed
+    """
+    parking_lots = {lot_id: ParkingLot(*config) for lot_id, config in configs.items()}
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        elif message == FREE_SPOTS:
+            connection.send(_free_spots(parking_lots))
+        else:
+            connection.send(_run_requests(parking_lots, message))
+
+
+class ParkingNetwork:
+    """
+    Runs many independent parking lots sharded across a pool of worker processes, each lot
+    lives in exactly one worker and calls are routed to it by lot id. Batches are split per
+    worker and sent to all workers before any answer is awaited, so workers run in parallel.
+    A network should be driven from a single thread
+    """
+
+    def __init__(self, lots: Dict[LotId, LotConfig], workers: Optional[int] = None):
+        """
+        :param lots: configuration of every lot by lot id, see LotConfig
+        :param workers: worker processes to shard the lots across, defaults to the cpu count
+        """
+        workers = min(workers or multiprocessing.cpu_count(), max(1, len(lots)))
+        self._shard_of = {lot_id: self._shard(lot_id, workers) for lot_id in lots}
+        self._connections: List[Connection] = []
+        self._processes: List[multiprocessing.process.BaseProcess] = []
+        for shard in range(workers):
+            configs = {
+                lot_id: LotConfig(*config)
+                for lot_id, config in lots.items()
+                if self._shard_of[lot_id] == shard
+            }
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_worker, args=(child, configs), daemon=True)
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+    @staticmethod
+    def _shard(lot_id: LotId, workers: int) -> int:
+        # stable across processes, unlike hash() of strings
+        return zlib.crc32(repr(lot_id).encode()) % workers
+
+    def execute(self, requests: Iterable[Request]) -> List[Result]:
+        """
+        Runs a batch of requests, requests to the same lot run in the given order
+
+        :return: a result per request, in request order, failed requests get their exception
+        """
+        batches: Dict[int, List[Tuple[int, Request]]] = {}
+        results: List[Result] = []
+        for position, request in enumerate(requests):
+            results.append(ValueError(f"Lot {request.lot_id} is not part of this network"))
+            shard = self._shard_of.get(request.lot_id)
+            if shard is not None:
+                batches.setdefault(shard, []).append((position, request))
+
+        for shard, batch in batches.items():
+            self._connections[shard].send([request for _, request in batch])
+        for shard, batch in batches.items():
+            for (position, _), result in zip(batch, self._connections[shard].recv()):
+                results[position] = result
+        return results
+
+    def _call(self, request: Request) -> Union[Ticket, Receipt, ERROR_MSG]:
+        result = self.execute([request])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def park_vehicle(
+        self, lot_id: LotId, vehicle_type: VehicleType, fake_entry_time: Optional[datetime] = None
+    ) -> Union[Ticket, ERROR_MSG]:
+        """
+        See ParkingLot.park_vehicle, parks in the lot with the given id
+        """
+        return cast(
+            Union[Ticket, ERROR_MSG],
+            self._call(Request(PARK, lot_id, vehicle_type, fake_entry_time)),
+        )
+
+    def unpark_vehicle(
+        self, lot_id: LotId, ticket_number: int, fake_duration: Optional[int] = None
+    ) -> Receipt:
+        """
+        See ParkingLot.unpark_vehicle, unparks from the lot with the given id
+        """
+        return cast(Receipt, self._call(Request(UNPARK, lot_id, ticket_number, fake_duration)))
+
+    def free_spots(self) -> Dict[VehicleType, int]:
+        """
+        :return: free spots of every vehicle type, summed over the whole network
+        """
+        for connection in self._connections:
+            connection.send(FREE_SPOTS)
+        free: Dict[VehicleType, int] = {}
+        for connection in self._connections:
+            for vehicle_type, spots in connection.recv().items():
+                free[vehicle_type] = free.get(vehicle_type, 0) + spots
+        return free
+
+    def close(self) -> None:
+        for connection in self._connections:
+            connection.send(None)
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections.clear()
+        self._processes.clear()
+
+    def __enter__(self) -> "ParkingNetwork":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
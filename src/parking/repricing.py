@@ -0,0 +1,258 @@
+import os
+from array import array
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from parking.models.archive import SessionArchive
+from parking.models.fees import FeeModel
+from parking.models.parking_lot import SEC_PER_HR
+from parking.models.storage import SqliteSessionStore
+from parking.models.vehicle import VEHICLE_TYPES, VehicleType
+
+if TYPE_CHECKING:
+    import numpy as np
+    import numpy.typing as npt
+
+DEFAULT_CHUNK_SESSIONS: int = 65_536
+# hours where duration bands start, the first band starts at 0 and the last is open ended
+DEFAULT_DURATION_BANDS: Tuple[float, ...] = (1, 4, 12, 24)
+# what the sessions were actually charged, reported next to the candidate fee models
+ACTUAL: str = "actual"
+
+DurationBand = Tuple[float, float]
+
+
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError as e:  # pragma: no cover - depends on the environment
+        raise ImportError(
+            "Repricing requires numpy, install the batch extra: "
+            "pip install 'parking-lot-demo[batch]'"
+        ) from e
+    return numpy
+
+
+class SessionChunk(NamedTuple):
+    """
+    Closed sessions, column by column: vehicle type codes (see VEHICLE_TYPE_CODES), stay
+    durations in seconds and fees paid. Typed arrays pickle as their raw bytes, so chunks are
+    cheap to hand to worker processes
+    """
+
+    vehicle_types: "array[int]"
+    durations: "array[int]"
+    fees: "array[float]"
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[int, int, int, float]]) -> "SessionChunk":
+        """
+        :param rows: (vehicle type code, entry time, exit time, fees) rows, as
+                     SqliteSessionStore.closed_sessions streams them
+        """
+        chunk = cls(array("b"), array("q"), array("d"))
+        vehicle_types, durations, fees = (
+            chunk.vehicle_types.append,
+            chunk.durations.append,
+            chunk.fees.append,
+        )
+        for vehicle_type, entry_time, exit_time, fees_paid in rows:
+            vehicle_types(vehicle_type)
+            durations(exit_time - entry_time)
+            fees(fees_paid)
+        return chunk
+
+    @classmethod
+    def from_archive(cls, archive: SessionArchive) -> "SessionChunk":
+        """
+        Copies the closed sessions of an archive, e.g. from its on_spill callback
+        """
+        durations = array(
+            "q", (exit - entry for entry, exit in zip(archive.entry_times, archive.exit_times))
+        )
+        return cls(array("b", archive.vehicle_types), durations, array("d", archive.fees))
+
+
+def store_chunks(
+    store: SqliteSessionStore,
+    start: datetime,
+    end: datetime,
+    chunk_size: int = DEFAULT_CHUNK_SESSIONS,
+) -> Iterator[SessionChunk]:
+    """
+    :return: the closed sessions that entered the store within [start, end), chunk by chunk
+    """
+    for rows in store.closed_sessions(start, end, chunk_size):
+        yield SessionChunk.from_rows(rows)
+
+
+class RepricingReport(NamedTuple):
+    """
+    Revenue of the repriced sessions under a fee model, by vehicle type and duration band.
+    Bands are (from hours, to hours), the last one ends at infinity
+    """
+
+    fee_model: str
+    sessions: Dict[Tuple[VehicleType, DurationBand], int]
+    revenue: Dict[Tuple[VehicleType, DurationBand], float]
+
+    def total(self) -> float:
+        return sum(self.revenue.values())
+
+    def by_vehicle_type(self) -> Dict[VehicleType, float]:
+        revenue: Dict[VehicleType, float] = {}
+        for (vehicle_type, _), fees in self.revenue.items():
+            revenue[vehicle_type] = revenue.get(vehicle_type, 0) + fees
+        return revenue
+
+    def by_duration_band(self) -> Dict[DurationBand, float]:
+        revenue: Dict[DurationBand, float] = {}
+        for (_, band), fees in self.revenue.items():
+            revenue[band] = revenue.get(band, 0) + fees
+        return revenue
+
+
+class _Totals(NamedTuple):
+    """
+    Running sums of repriced chunks: sessions by (vehicle type code, band) and revenue by
+    (ACTUAL then every fee model, vehicle type code, band)
+    """
+
+    sessions: "npt.NDArray[np.int64]"
+    revenue: "npt.NDArray[np.float64]"
+
+
+def _reprice_chunk(
+    fee_models: Sequence[FeeModel], bands: Sequence[float], chunk: SessionChunk
+) -> _Totals:
+    np = _numpy()
+    codes = np.frombuffer(chunk.vehicle_types, dtype=np.int8).astype(np.int64)
+    hours = np.frombuffer(chunk.durations, dtype=np.int64) / SEC_PER_HR
+    cells = len(VEHICLE_TYPES) * (len(bands) + 1)
+    # a cell per (vehicle type, duration band), sums are bin counts over the cells
+    cell = codes * (len(bands) + 1) + np.searchsorted(bands, hours, side="right")
+    revenue = np.empty((len(fee_models) + 1, cells))
+    revenue[0] = np.bincount(cell, weights=np.frombuffer(chunk.fees), minlength=cells)
+    for i, fee_model in enumerate(fee_models, 1):
+        fees = fee_model.calculate_fees_batch(codes, hours)
+        revenue[i] = np.bincount(cell, weights=fees, minlength=cells)
+    return _Totals(np.bincount(cell, minlength=cells), revenue)
+
+
+# fee models and bands of a worker process, handed over once when the worker starts
+_worker_fee_models: Sequence[FeeModel] = ()
+_worker_bands: Sequence[float] = ()
+
+
+def _start_worker(fee_models: Sequence[FeeModel], bands: Sequence[float]) -> None:
+    global _worker_fee_models, _worker_bands
+    _worker_fee_models, _worker_bands = fee_models, bands
+
+
+def _reprice_in_worker(chunk: SessionChunk) -> _Totals:
+    return _reprice_chunk(_worker_fee_models, _worker_bands, chunk)
+
+
+def _repriced(
+    chunks: Iterable[SessionChunk],
+    fee_models: List[FeeModel],
+    bands: Tuple[float, ...],
+    workers: Optional[int],
+) -> Iterator[_Totals]:
+    if workers == 1:
+        for chunk in chunks:
+            yield _reprice_chunk(fee_models, bands, chunk)
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(
+        workers, initializer=_start_worker, initargs=(fee_models, bands)
+    ) as executor:
+        # chunks in flight, read ahead of the pool but no further
+        pending: Deque["Future[_Totals]"] = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_reprice_in_worker, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def reprice(
+    chunks: Iterable[SessionChunk],
+    fee_models: Dict[str, FeeModel],
+    bands: Sequence[float] = DEFAULT_DURATION_BANDS,
+    workers: Optional[int] = None,
+) -> Dict[str, RepricingReport]:
+    """
+    Reprices closed sessions under candidate fee models, every fee model prices every
+    session, e.g. to compare last quarter's revenue under tariffs before changing one.
+
+    Chunks are priced across a pool of worker processes, each reduced to revenue sums per
+    (vehicle type, duration band) right away, and only a few chunks per worker are read ahead
+    of the pool, so memory stays bounded whatever the number of sessions. Fee models are
+    handed to the workers once, they should be picklable. Requires numpy.
+
+    :param chunks: closed sessions, e.g. store_chunks or a generator over spilled archives
+    :param fee_models: candidate fee models by name, each should price every vehicle type
+                       of the sessions
+    :param bands: hours where duration bands start, increasing
+    :param workers: worker processes, defaults to the cpu count, 1 runs in this process
+    :return: a report by fee model name, and one of the fees actually paid under ACTUAL
+    """
+    if ACTUAL in fee_models:
+        raise ValueError(f"{ACTUAL} names the fees actually paid, not a candidate fee model")
+    if any(low >= high for low, high in zip((0, *bands), bands)):
+        raise ValueError("Duration bands should start past 0 and increase")
+    band_starts = tuple(bands)
+
+    totals: Optional[_Totals] = None
+    for chunk_totals in _repriced(chunks, list(fee_models.values()), band_starts, workers):
+        totals = (
+            chunk_totals
+            if totals is None
+            else _Totals(
+                totals.sessions + chunk_totals.sessions, totals.revenue + chunk_totals.revenue
+            )
+        )
+    return _reports([ACTUAL, *fee_models], band_starts, totals)
+
+
+def _reports(
+    names: List[str], bands: Tuple[float, ...], totals: Optional[_Totals]
+) -> Dict[str, RepricingReport]:
+    starts = (0.0, *bands)
+    ends = (*bands, float("inf"))
+    cells = [
+        (vehicle_type, (starts[band], ends[band]))
+        for vehicle_type in VEHICLE_TYPES
+        for band in range(len(starts))
+    ]
+    if totals is None:
+        return {name: RepricingReport(name, {}, {}) for name in names}
+    sessions = {cell: int(count) for cell, count in zip(cells, totals.sessions) if count}
+    return {
+        name: RepricingReport(
+            name,
+            sessions,
+            {
+                cell: float(totals.revenue[i, j])
+                for j, cell in enumerate(cells)
+                if cell in sessions
+            },
+        )
+        for i, name in enumerate(names)
+    }
@@ -0,0 +1,120 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, Dict
+
+from parking.models.parking_lot import ParkingLot
+from parking.models.slips import Receipt
+from parking.models.vehicle import VehicleType
+
+READ_CHUNK_SIZE: int = 64 * 1024
+
+
+class ParkingServer:
+    """
+    Serves one parking lot to gate controllers over a TCP line protocol, one request per line:
+        * PARK <vehicle type name> [<entry iso date-time>]
+        * UNPARK <ticket number> [<duration in seconds>]
+        * QUOTE <ticket number> [<duration in seconds>], fees due if the vehicle left now
+    every request is answered with one JSON line, in request order, so gates can pipeline.
+    All connections are served from a single event loop, so the lot needs no locking
+    """
+
+    def __init__(self, parking_lot: ParkingLot):
+        self.parking_lot = parking_lot
+
+    def handle_request(self, line: str) -> Dict[str, Any]:
+        """
+        Runs a single request line against the parking lot
+
+        :param line: request line, without the line break
+        :return: the JSON-able response
+        """
+        command, *args = line.split()
+        try:
+            if command == "PARK" and 1 <= len(args) <= 2:
+                # only the name lookup is the request's fault, KeyErrors out of the lot are not
+                try:
+                    vehicle_type = VehicleType[args[0]]
+                except KeyError as e:
+                    return {"error": f"Vehicle type passed is not recognised: {e}"}
+                if vehicle_type not in self.parking_lot.spots:
+                    return {"error": f"No spots are assigned to {vehicle_type.name}"}
+                entry_time = datetime.fromisoformat(args[1]) if len(args) == 2 else None
+                ticket = self.parking_lot.park_vehicle(vehicle_type, fake_entry_time=entry_time)
+                if isinstance(ticket, str):
+                    return {"error": ticket}
+                return {
+                    "ticket_number": ticket.ticket_number,
+                    "spot_number": ticket.spot_number,
+                    "entry_datetime": ticket.entry_datetime.isoformat(),
+                }
+            elif command == "UNPARK" and 1 <= len(args) <= 2:
+                duration = int(args[1]) if len(args) == 2 else None
+                receipt: Receipt = self.parking_lot.unpark_vehicle(
+                    int(args[0]), fake_duration=duration
+                )
+                return {
+                    "receipt_number": receipt.receipt_number,
+                    "entry_datetime": receipt.entry_datetime.isoformat(),
+                    "exit_datetime": receipt.exit_datetime.isoformat(),
+                    "fees_paid": receipt.fees_paid,
+                }
+            elif command == "QUOTE" and 1 <= len(args) <= 2:
+                duration = int(args[1]) if len(args) == 2 else None
+                return {"fees": self.parking_lot.quote_fees(int(args[0]), fake_duration=duration)}
+        except ValueError as e:
+            return {"error": str(e)}
+        return {"error": f"Malformed request: {line}"}
+
+    def handle_line(self, line: bytes) -> Dict[str, Any]:
+        """
+        Runs a raw request line, any failure is answered with an error instead of dropping the
+        gate's connection
+
+        :param line: request line as read, without the line break
+        :return: the JSON-able response
+        """
+        try:
+            return self.handle_request(line.decode())
+        except UnicodeDecodeError:
+            return {"error": "Request line is not valid UTF-8"}
+        except Exception as e:
+            return {"error": f"Request failed: {type(e).__name__}: {e}"}
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        # requests are read in chunks, every complete line of a chunk is answered with a single
+        # write, so pipelined requests do not cost one syscall each
+        partial = b""
+        try:
+            while chunk := await reader.read(READ_CHUNK_SIZE):
+                *lines, partial = (partial + chunk).split(b"\n")
+                responses = [self.handle_line(line) for line in lines if line.strip()]
+                too_long = len(partial) > READ_CHUNK_SIZE
+                if too_long:
+                    responses.append({"error": "Request line too long"})
+                if responses:
+                    writer.write(b"".join(json.dumps(r).encode() + b"\n" for r in responses))
+                    await writer.drain()
+                if too_long:
+                    return
+            if partial.strip():
+                writer.write(json.dumps(self.handle_line(partial)).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765) -> asyncio.AbstractServer:
+        """
+        Starts accepting gate connections, returns the started server
+        """
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8765) -> None:
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
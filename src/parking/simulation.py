@@ -0,0 +1,241 @@
+import argparse
+import heapq
+import os
+import random
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from parking.models.archive import SessionArchive, discard_spilled
+from parking.models.clock import SimulatedClock
+from parking.models.fees import FeeModel
+from parking.models.parking_lot import SEC_PER_HR, ParkingLot
+from parking.models.vehicle import VEHICLE_TYPE_CODES, VehicleType
+
+DEFAULT_START: datetime = datetime(2022, 5, 29)
+
+
+class ArrivalProfile(NamedTuple):
+    """
+    Traffic of a vehicle type: arrivals are a Poisson process, dwell times are exponentially
+    distributed around their mean
+    """
+
+    arrivals_per_hour: float
+    mean_dwell_hours: float
+
+
+class SimulationConfig(NamedTuple):
+    spots: Dict[VehicleType, int]
+    fee_models: Dict[VehicleType, FeeModel]
+    profiles: Dict[VehicleType, ArrivalProfile]
+    hours: float = 24
+    start: datetime = DEFAULT_START
+
+
+class Replication(NamedTuple):
+    """
+    Outcome of one simulated run, revenue includes vehicles still parked when the run ended
+    as they are charged on their way out
+    """
+
+    seed: int
+    parked: Dict[VehicleType, int]
+    rejections: Dict[VehicleType, int]
+    peak_occupancy: Dict[VehicleType, int]
+    mean_occupancy: Dict[VehicleType, float]
+    revenue: float
+
+
+def _arrivals(
+    profiles: Dict[VehicleType, ArrivalProfile], horizon: float, rng: random.Random
+) -> List[Tuple[float, int, VehicleType, int]]:
+    """
+    :return: (arrival second, vehicle type code, vehicle type, dwell seconds) ordered by time
+    """
+    arrivals = []
+    for vehicle_type, profile in profiles.items():
+        if profile.arrivals_per_hour <= 0 or profile.mean_dwell_hours <= 0:
+            raise ValueError("Arrival rates and dwell times should be positive")
+        moment = rng.expovariate(profile.arrivals_per_hour / SEC_PER_HR)
+        while moment < horizon:
+            dwell = rng.expovariate(1 / (profile.mean_dwell_hours * SEC_PER_HR))
+            arrivals.append(
+                (moment, VEHICLE_TYPE_CODES[vehicle_type], vehicle_type, max(1, round(dwell)))
+            )
+            moment += rng.expovariate(profile.arrivals_per_hour / SEC_PER_HR)
+    arrivals.sort()
+    return arrivals
+
+
+def run_replication(config: SimulationConfig, seed: int) -> Replication:
+    """
+    Drives a fresh parking lot through one stochastic day (or however many hours) on a
+    simulated clock, set to the time of every arrival and departure
+
+    :param config: the site and its traffic
+    :param seed: seeds the random streams, the same seed replays the same replication
+    """
+    if not config.profiles.keys() <= config.spots.keys():
+        raise ValueError("Every simulated vehicle type needs spots assigned")
+    rng = random.Random(seed)
+    horizon = config.hours * SEC_PER_HR
+    clock = SimulatedClock(config.start)
+    start_time = clock.now()
+    # the replication keeps its own aggregates, closed sessions are not kept
+    parking_lot = ParkingLot(
+        "Simulated Parking Lot",
+        config.spots,
+        config.fee_models,
+        archive=SessionArchive(on_spill=discard_spilled),
+        clock=clock,
+    )
+
+    parked = {vehicle_type: 0 for vehicle_type in config.spots}
+    rejections = {vehicle_type: 0 for vehicle_type in config.spots}
+    peak_occupancy = {vehicle_type: 0 for vehicle_type in config.spots}
+    # time weighted occupancy, integrated up to the horizon
+    occupancy_seconds = {vehicle_type: 0.0 for vehicle_type in config.spots}
+    last_change = {vehicle_type: 0.0 for vehicle_type in config.spots}
+    occupied = parking_lot.occupied_spots
+    revenue = 0.0
+
+    def advance(vehicle_type: VehicleType, moment: float) -> None:
+        moment = min(moment, horizon)
+        occupancy_seconds[vehicle_type] += occupied[vehicle_type] * (
+            moment - last_change[vehicle_type]
+        )
+        last_change[vehicle_type] = moment
+
+    # (exit second, ticket number, vehicle type) of parked vehicles
+    departures: List[Tuple[int, int, VehicleType]] = []
+
+    def depart(until: float) -> None:
+        nonlocal revenue
+        while departures and departures[0][0] <= until:
+            exit_moment, ticket_number, vehicle_type = heapq.heappop(departures)
+            advance(vehicle_type, exit_moment)
+            clock.time = start_time + exit_moment
+            revenue += parking_lot.unpark_vehicle(ticket_number).fees_paid
+
+    for moment, _, vehicle_type, dwell in _arrivals(config.profiles, horizon, rng):
+        depart(moment)
+        advance(vehicle_type, moment)
+        clock.time = start_time + int(moment)
+        ticket = parking_lot.park_vehicle(vehicle_type)
+        if isinstance(ticket, str):
+            rejections[vehicle_type] += 1
+            continue
+        parked[vehicle_type] += 1
+        peak_occupancy[vehicle_type] = max(peak_occupancy[vehicle_type], occupied[vehicle_type])
+        heapq.heappush(departures, (int(moment) + dwell, ticket.ticket_number, vehicle_type))
+    depart(float("inf"))
+
+    return Replication(
+        seed,
+        parked,
+        rejections,
+        peak_occupancy,
+        {vehicle_type: area / horizon for vehicle_type, area in occupancy_seconds.items()},
+        revenue,
+    )
+
+
+class Distribution(NamedTuple):
+    mean: float
+    p5: float
+    p50: float
+    p95: float
+
+    @classmethod
+    def of(cls, values: Iterable[float]) -> "Distribution":
+        ordered = sorted(values)
+
+        def percentile(q: float) -> float:
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+        return cls(statistics.fmean(ordered), percentile(0.05), percentile(0.5), percentile(0.95))
+
+
+class SimulationResult(NamedTuple):
+    replications: List[Replication]
+
+    def summary(self) -> Dict[str, Distribution]:
+        """
+        :return: distribution of every outcome over the replications, by outcome name
+        """
+        summary = {
+            "revenue": Distribution.of(r.revenue for r in self.replications),
+            "rejections": Distribution.of(sum(r.rejections.values()) for r in self.replications),
+        }
+        for vehicle_type in self.replications[0].parked:
+            name = vehicle_type.name
+            summary[f"rejections[{name}]"] = Distribution.of(
+                r.rejections[vehicle_type] for r in self.replications
+            )
+            summary[f"peak_occupancy[{name}]"] = Distribution.of(
+                r.peak_occupancy[vehicle_type] for r in self.replications
+            )
+            summary[f"mean_occupancy[{name}]"] = Distribution.of(
+                r.mean_occupancy[vehicle_type] for r in self.replications
+            )
+        return summary
+
+
+def simulate(
+    config: SimulationConfig,
+    replications: int,
+    seed: int = 0,
+    workers: Optional[int] = None,
+) -> SimulationResult:
+    """
+    Runs independent replications across a pool of worker processes, replication i is seeded
+    with seed + i so results do not depend on how many workers ran them
+
+    :param config: the site and its traffic
+    :param replications: how many replications to run
+    :param seed: seed of the first replication
+    :param workers: worker processes, defaults to the cpu count, 1 runs in this process
+    """
+    if replications <= 0:
+        raise ValueError("Replications should be positive")
+    seeds = range(seed, seed + replications)
+    if workers == 1:
+        return SimulationResult([run_replication(config, s) for s in seeds])
+    workers = workers or os.cpu_count() or 1
+    # a few chunks per worker, so the config is not pickled once per replication
+    chunksize = max(1, replications // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return SimulationResult(
+            list(
+                executor.map(run_replication, [config] * replications, seeds, chunksize=chunksize)
+            )
+        )
+
+
+def parse_profiles(
+    arrivals: Iterable[str], dwell: Iterable[str]
+) -> Dict[VehicleType, ArrivalProfile]:
+    """
+    :param arrivals: TYPE=ARRIVALS_PER_HOUR pairs, e.g. CAR_SUV=40
+    :param dwell: TYPE=MEAN_DWELL_HOURS pairs, e.g. CAR_SUV=2.5
+    :return: arrival profile of each vehicle type listed in both
+    """
+    parsed: List[Dict[VehicleType, float]] = []
+    for pairs in (arrivals, dwell):
+        rates = {}
+        for pair in pairs:
+            vehicle_type, _, rate = pair.partition("=")
+            try:
+                rates[VehicleType[vehicle_type]] = float(rate)
+            except (KeyError, ValueError):
+                raise argparse.ArgumentTypeError(f"Invalid rate {pair}, expected TYPE=NUMBER")
+        parsed.append(rates)
+    arrival_rates, dwell_hours = parsed
+    if arrival_rates.keys() != dwell_hours.keys():
+        raise argparse.ArgumentTypeError("Every vehicle type needs both arrivals and dwell")
+    return {
+        vehicle_type: ArrivalProfile(rate, dwell_hours[vehicle_type])
+        for vehicle_type, rate in arrival_rates.items()
+    }
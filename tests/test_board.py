@@ -0,0 +1,109 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from parking.models.board import (
+    _SEQUENCE,
+    Occupancy,
+    OccupancyBoard,
+    OccupancyBoardReader,
+    _slot,
+)
+from parking.models.fees import MallFeeModel
+from parking.models.parking_lot import ParkingLot
+from parking.models.vehicle import VEHICLE_TYPE_CODES, VehicleType
+
+CAR, MOTORCYCLE = VehicleType.CAR_SUV, VehicleType.MOTORCYCLE_SCOOTER
+
+
+def read_board(name):
+    with OccupancyBoardReader(name) as reader:
+        return reader.snapshot()
+
+
+def test_parking_lot_publishes_its_occupancy_to_other_processes():
+    spots = {CAR: 3, MOTORCYCLE: 2}
+    with OccupancyBoard(spots) as board:
+        parking_lot = ParkingLot(
+            name="Mall Parking Lot",
+            spots=spots,
+            fee_models={CAR: MallFeeModel(), MOTORCYCLE: MallFeeModel()},
+            concurrent=True,
+            board=board,
+        )
+        reader = OccupancyBoardReader(board.name)
+        assert reader.snapshot() == {CAR: Occupancy(0, 3), MOTORCYCLE: Occupancy(0, 2)}
+
+        ticket = parking_lot.park_vehicle(CAR)
+        parking_lot.park_many([MOTORCYCLE, MOTORCYCLE, CAR])
+        assert reader.read(CAR) == Occupancy(2, 3) and reader.read(CAR).free == 1
+        parking_lot.unpark_vehicle(ticket.ticket_number)
+        parking_lot.unpark_many([2])
+
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            snapshot = executor.submit(read_board, board.name).result()
+        assert snapshot == {CAR: Occupancy(1, 3), MOTORCYCLE: Occupancy(1, 2)}
+        reader.close()
+
+    with pytest.raises(FileNotFoundError):
+        OccupancyBoardReader(board.name)
+
+
+class PairedBoard(OccupancyBoard):
+    """
+    Publishes the occupancy as the total too, one count after the other within the slot's
+    seqlock, so a read mixing two writes is told apart
+    """
+
+    def publish(self, vehicle_type, occupied):
+        code = VEHICLE_TYPE_CODES[vehicle_type]
+        offset, sequence = _slot(code), self._sequences[code]
+        _SEQUENCE.pack_into(self._buffer, offset, sequence + 1)
+        _SEQUENCE.pack_into(self._buffer, offset + 8, occupied)
+        # hands readers the CPU mid-write
+        time.sleep(0)
+        _SEQUENCE.pack_into(self._buffer, offset + 16, occupied)
+        _SEQUENCE.pack_into(self._buffer, offset, sequence + 2)
+        self._sequences[code] = sequence + 2
+
+
+def read_board_while_published(name, reads):
+    with OccupancyBoardReader(name) as reader:
+        return [tuple(reader.read(CAR)) for _ in range(reads)]
+
+
+def test_board_readers_in_other_processes_never_see_a_torn_write():
+    with PairedBoard({CAR: 0}) as board:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            reads = executor.submit(read_board_while_published, board.name, 50_000)
+            occupied = 0
+            while not reads.done():
+                occupied += 1
+                board.publish(CAR, occupied)
+                time.sleep(0)
+            seen = reads.result()
+
+    assert all(occupied == total for occupied, total in seen)
+    assert seen == sorted(seen)
+
+
+def die_mid_write(board):
+    # forked, the writer's mapping is shared, it leaves the slot's sequence odd
+    board._buffer[_slot(VEHICLE_TYPE_CODES[CAR])] += 1
+    os._exit(0)
+
+
+def test_board_readers_give_up_on_a_writer_that_died_mid_write():
+    with OccupancyBoard({CAR: 3}) as board:
+        board.publish(CAR, 1)
+        writer = multiprocessing.get_context("fork").Process(target=die_mid_write, args=(board,))
+        writer.start()
+        writer.join()
+
+        with OccupancyBoardReader(board.name, timeout=0.05) as reader:
+            assert reader.read(MOTORCYCLE) == Occupancy(0, 0)
+            with pytest.raises(TimeoutError, match="CAR_SUV stayed unreadable for 0.05s"):
+                reader.read(CAR)
@@ -0,0 +1,65 @@
+import csv
+from datetime import datetime
+
+import pytest
+
+from parking.models.export import (
+    BinaryReceiptExporter,
+    BinaryReceiptReader,
+    CsvReceiptExporter,
+)
+from parking.models.slips import CompactReceipt, Receipt, from_epoch_seconds, to_epoch_seconds
+
+ENTRY = datetime(2022, 5, 29, 14, 4, 7)
+EXIT = datetime(2022, 5, 29, 15, 34, 7)
+
+
+def make_receipts(count):
+    for receipt_number in range(1, count + 1):
+        receipt = Receipt(receipt_number, ENTRY, EXIT, 10 * receipt_number)
+        yield receipt if receipt_number % 2 else CompactReceipt.from_receipt(receipt)
+
+
+def test_csv_exporter_streams_receipts_in_chunks(tmp_path):
+    with CsvReceiptExporter(tmp_path / "receipts.csv", chunk_size=2) as exporter:
+        exporter.write_many(make_receipts(5))
+        assert exporter.exported == 4
+    assert exporter.exported == 5
+
+    with open(tmp_path / "receipts.csv", newline="") as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == ["receipt_number", "entry_time", "exit_time", "fees_paid"]
+    assert rows[2] == ["2", str(to_epoch_seconds(ENTRY)), str(to_epoch_seconds(EXIT)), "20"]
+    assert [row[0] for row in rows[1:]] == ["1", "2", "3", "4", "5"]
+    # times are seconds of the local wall clock since 1970-01-01 00:00, not Unix timestamps
+    assert from_epoch_seconds(int(rows[2][1])) == ENTRY
+
+
+def test_csv_exporter_keeps_fractional_fees(tmp_path):
+    with CsvReceiptExporter(tmp_path / "receipts.csv") as exporter:
+        exporter.write(Receipt(1, ENTRY, EXIT, 12.5))
+
+    with open(tmp_path / "receipts.csv", newline="") as file:
+        assert list(csv.reader(file))[1][3] == "12.5"
+
+
+def test_binary_export_is_scanned_in_place(tmp_path):
+    with BinaryReceiptExporter(tmp_path / "receipts.bin", chunk_size=3) as exporter:
+        exporter.write_many(make_receipts(7))
+        exporter.write(Receipt(8, ENTRY, EXIT, 80))
+
+    with BinaryReceiptReader(tmp_path / "receipts.bin") as reader:
+        assert len(reader) == 8
+        chunks = [
+            (list(chunk.receipt_numbers), set(chunk.exit_times), sum(chunk.fees))
+            for chunk in reader.chunks()
+        ]
+    assert chunks == [
+        ([1, 2, 3], {to_epoch_seconds(EXIT)}, 60),
+        ([4, 5, 6], {to_epoch_seconds(EXIT)}, 150),
+        ([7, 8], {to_epoch_seconds(EXIT)}, 150),
+    ]
+
+    (tmp_path / "receipts.csv").write_text("receipt_number\n")
+    with pytest.raises(ValueError, match="is not a receipts export"):
+        BinaryReceiptReader(tmp_path / "receipts.csv")
@@ -0,0 +1,147 @@
+from datetime import datetime
+
+import pytest
+
+from parking.models.analytics import LotAnalytics
+from parking.models.board import Occupancy, OccupancyBoard, OccupancyBoardReader
+from parking.models.clock import SimulatedClock
+from parking.models.fees import MallFeeModel
+from parking.models.garage import Garage, Zone
+from parking.models.parking_lot import ParkingLot
+from parking.models.reservations import Reservations
+from parking.models.vehicle import VehicleType
+
+CAR, MOTORCYCLE = VehicleType.CAR_SUV, VehicleType.MOTORCYCLE_SCOOTER
+
+
+def make_parking_lot(overflow=None):
+    garage = Garage(
+        [
+            Zone("A", 0, CAR, 2, {"north": 10, "south": 90}),
+            Zone("M", 0, MOTORCYCLE, 1, {"north": 20, "south": 80}),
+            Zone("B", 1, CAR, 2, {"north": 60, "south": 15}),
+        ],
+        overflow=overflow,
+    )
+    parking_lot = ParkingLot(
+        name="Mall Garage",
+        spots=garage.spots(),
+        fee_models={vehicle_type: MallFeeModel() for vehicle_type in garage.spots()},
+        garage=garage,
+    )
+    return parking_lot, garage
+
+
+def test_garage_hands_out_the_nearest_free_spot_to_the_entrance():
+    parking_lot, garage = make_parking_lot()
+
+    assert garage.spots() == {CAR: 4, MOTORCYCLE: 1}
+    # spots are numbered across the garage, zone after zone
+    assert parking_lot.park_vehicle(CAR, entrance="south").spot_number == 4
+    assert parking_lot.park_vehicle(CAR, entrance="south").spot_number == 5
+    assert garage.zone_of(5).name == "B"
+    assert parking_lot.park_vehicle(CAR, entrance="south").spot_number == 1
+    # without an entrance, spots are handed out in zone order
+    assert parking_lot.park_vehicle(CAR).spot_number == 2
+    assert parking_lot.park_vehicle(CAR, entrance="north") == "No space available"
+    assert len(parking_lot.free_spots[CAR]) == 0
+
+    parking_lot.unpark_vehicle(2)
+    assert parking_lot.park_vehicle(CAR, entrance="north").spot_number == 5
+    with pytest.raises(ValueError, match="Entrance west is not in the garage"):
+        parking_lot.park_vehicle(CAR, entrance="west")
+
+
+def test_garage_overflows_once_a_vehicle_type_is_full():
+    parking_lot, garage = make_parking_lot(overflow={MOTORCYCLE: [CAR]})
+
+    assert parking_lot.park_vehicle(MOTORCYCLE, entrance="south").spot_number == 3
+    # motorcycles take car bays, nearest first, only once their own zone is full
+    assert parking_lot.park_vehicle(MOTORCYCLE, entrance="south").spot_number == 4
+    assert len(parking_lot.free_spots[CAR]) == 3
+    for _ in range(3):
+        parking_lot.park_vehicle(CAR)
+    # the garage is truly full for motorcycles
+    assert parking_lot.park_vehicle(MOTORCYCLE) == "No space available"
+
+    # an overflowed vehicle frees the car bay it took
+    parking_lot.unpark_vehicle(2)
+    assert len(parking_lot.free_spots[CAR]) == 1
+    assert parking_lot.park_vehicle(CAR).spot_number == 4
+
+    # restored state rebuilds the garage from the spots taken
+    parking_lot.restore(*parking_lot.sessions_snapshot())
+    assert parking_lot.park_vehicle(MOTORCYCLE) == "No space available"
+    parking_lot.unpark_vehicle(1)
+    assert parking_lot.park_vehicle(MOTORCYCLE, entrance="north").spot_number == 3
+
+    with pytest.raises(ValueError, match="distance from every entrance"):
+        Garage([Zone("A", 0, CAR, 1, {"north": 1}), Zone("B", 0, CAR, 1, {})])
+    with pytest.raises(ValueError, match="Spots should be the spots of the garage zones"):
+        ParkingLot("Mall Garage", {CAR: 5}, {CAR: MallFeeModel()}, garage=garage)
+
+
+def test_garage_overflow_minds_the_spots_held_for_reservations():
+    garage = Garage(
+        [Zone("M", 0, MOTORCYCLE, 1, {"north": 10}), Zone("A", 0, CAR, 1, {"north": 20})],
+        overflow={MOTORCYCLE: [CAR]},
+    )
+    clock = SimulatedClock(datetime(2022, 5, 29, 8))
+    parking_lot = ParkingLot(
+        name="Mall Garage",
+        spots=garage.spots(),
+        fee_models={vehicle_type: MallFeeModel() for vehicle_type in garage.spots()},
+        clock=clock,
+        reservations=Reservations({CAR: 1, MOTORCYCLE: 1}),
+        garage=garage,
+        concurrent=True,
+    )
+    # no reservation is held, a motorcycle overflows once its own zone is full
+    assert parking_lot.park_vehicle(MOTORCYCLE).spot_number == 1
+    overflowed = parking_lot.park_vehicle(MOTORCYCLE)
+    assert overflowed.spot_number == 2
+    parking_lot.unpark_vehicle(overflowed.ticket_number)
+
+    # the car bay is held for a reservation whose window started, motorcycles cannot take it
+    reservation = parking_lot.reserve(CAR, datetime(2022, 5, 29, 10), datetime(2022, 5, 29, 12))
+    clock.set(datetime(2022, 5, 29, 10, 30))
+    assert parking_lot.park_vehicle(MOTORCYCLE) == "No space available"
+    assert parking_lot.park_many([MOTORCYCLE]) == ["No space available"]
+    ticket = parking_lot.park_vehicle(CAR, reservation_number=reservation.reservation_number)
+    assert ticket.spot_number == 2
+
+
+def test_garage_counts_an_overflowed_vehicle_against_the_bay_it_took():
+    garage = Garage(
+        [Zone("M", 0, MOTORCYCLE, 1, {"north": 10}), Zone("A", 0, CAR, 2, {"north": 20})],
+        overflow={MOTORCYCLE: [CAR]},
+    )
+    with OccupancyBoard(garage.spots()) as board, OccupancyBoardReader(board.name) as reader:
+        parking_lot = ParkingLot(
+            name="Mall Garage",
+            spots=garage.spots(),
+            fee_models={vehicle_type: MallFeeModel() for vehicle_type in garage.spots()},
+            analytics=LotAnalytics(),
+            garage=garage,
+            board=board,
+        )
+        parking_lot.park_vehicle(MOTORCYCLE)
+        overflowed = parking_lot.park_vehicle(MOTORCYCLE)
+        parked = parking_lot.park_many([MOTORCYCLE])
+        # both motorcycles past the first took car bays, the car section shows them
+        assert parking_lot.occupied_spots == {MOTORCYCLE: 1, CAR: 2}
+        assert parking_lot.analytics.occupancy(CAR) == 2
+        assert reader.read(CAR) == Occupancy(2, 2)
+        assert reader.read(MOTORCYCLE) == Occupancy(1, 1)
+        assert parking_lot.park_vehicle(CAR) == "No space available"
+
+        parking_lot.restore(*parking_lot.sessions_snapshot())
+        assert parking_lot.occupied_spots == {MOTORCYCLE: 1, CAR: 2}
+        assert reader.read(CAR) == Occupancy(2, 2)
+
+        parking_lot.unpark_vehicle(overflowed.ticket_number)
+        parking_lot.unpark_many([parked[0].ticket_number])
+        assert parking_lot.occupied_spots == {MOTORCYCLE: 1, CAR: 0}
+        assert parking_lot.analytics.occupancy(CAR) == 0
+        assert parking_lot.analytics.occupancy(MOTORCYCLE) == 1
+        assert reader.read(CAR) == Occupancy(0, 2)
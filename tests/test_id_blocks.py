@@ -0,0 +1,77 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from parking.models.fees import MallFeeModel
+from parking.models.id_blocks import BlockSequence, SharedCounter
+from parking.models.parking_lot import ParkingLot
+from parking.models.vehicle import VehicleType
+
+
+def take_numbers(counter, count):
+    sequence = BlockSequence(counter, block_size=7)
+    return [sequence.next() for _ in range(count)]
+
+
+def take_forked_numbers(sequence, connection):
+    connection.send([sequence.next(), sequence.next_block(3)])
+
+
+def test_block_sequences_never_hand_out_the_same_number(tmp_path):
+    counter = SharedCounter(tmp_path / "tickets.seq")
+    first, second = BlockSequence(counter, block_size=10), BlockSequence(counter, block_size=10)
+
+    assert [first.next(), second.next(), first.next()] == [1, 11, 2]
+    # a block that does not fit what is left of the lease takes a new one
+    assert first.next_block(9) == 21
+    assert first.value == 30 and counter.value == 31
+
+    with ProcessPoolExecutor(max_workers=3) as executor:
+        taken = list(executor.map(take_numbers, [counter] * 6, [50] * 6))
+    numbers = [number for process in taken for number in process]
+    assert len(set(numbers)) == 300 and min(numbers) == 31
+    assert all(process == sorted(process) for process in taken)
+
+    # recovering past leased numbers drops the block in use
+    second.restart(1000)
+    assert second.next() == 1000
+    assert SharedCounter(tmp_path / "tickets.seq", start=5).value == 1010
+
+
+def test_forked_processes_lease_blocks_of_their_own(tmp_path):
+    sequence = BlockSequence(SharedCounter(tmp_path / "tickets.seq"), block_size=10)
+    assert sequence.next() == 1
+
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.get_context("fork").Process(
+        target=take_forked_numbers, args=(sequence, child)
+    )
+    process.start()
+    # the child inherited the block 1-10, it leases 11-20 instead of handing out 2 again
+    assert parent.recv() == [11, 12]
+    process.join()
+    assert [sequence.next(), sequence.next_block(3)] == [2, 3]
+
+
+def test_parking_lots_share_ticket_and_receipt_numbering(tmp_path):
+    tickets, receipts = SharedCounter(tmp_path / "tickets.seq"), SharedCounter(tmp_path / "r.seq")
+
+    def make_parking_lot():
+        return ParkingLot(
+            name="Mall Parking Lot",
+            spots={VehicleType.CAR_SUV: 10},
+            fee_models={VehicleType.CAR_SUV: MallFeeModel()},
+            tickets=BlockSequence(tickets, block_size=10),
+            receipts=BlockSequence(receipts, block_size=10),
+        )
+
+    gate, other_gate = make_parking_lot(), make_parking_lot()
+    entry_time = datetime(2022, 5, 29, 14, 4, 7)
+    gate.park_vehicle(VehicleType.CAR_SUV, entry_time)
+    ticket = other_gate.park_vehicle(VehicleType.CAR_SUV, entry_time)
+
+    assert ticket.ticket_number == 11
+    assert "Ticket Number: 011" in str(ticket)
+    assert [t.ticket_number for t in other_gate.park_many([VehicleType.CAR_SUV] * 2)] == [12, 13]
+    receipt = other_gate.unpark_vehicle(ticket.ticket_number, 3600)
+    assert "Receipt Number: R-001" in str(receipt)
@@ -0,0 +1,94 @@
+import io
+
+from parking import interpreter
+from parking.interpreter import CommandInterpreter
+
+
+def run(commands):
+    output, errors = io.StringIO(), io.StringIO()
+    failures = CommandInterpreter(output, errors).run(io.StringIO(commands))
+    return failures, output.getvalue(), errors.getvalue()
+
+
+def test_interpreter_streams_tickets_and_receipts_of_example_one():
+    failures, output, errors = run(
+        "# Example 1: Small motorcycle/scooter parking lot\n"
+        "LOT scooters mall MOTORCYCLE_SCOOTER=2\n"
+        "PARK scooters MOTORCYCLE_SCOOTER 2022-05-29T14:04:07\n"
+        "PARK scooters MOTORCYCLE_SCOOTER 2022-05-29T14:44:07\n"
+        "PARK scooters MOTORCYCLE_SCOOTER\n"
+        "\n"
+        "UNPARK scooters 2 3360\n"
+    )
+
+    assert (failures, errors) == (0, "")
+    assert output == (
+        "scooters\n"
+        "Parking Ticket:\n\tTicket Number: 001\n"
+        "\tSpot Number: 1\n"
+        "\tEntry Date-time: 29-May-2022 14:04:07\n"
+        "Parking Ticket:\n\tTicket Number: 002\n"
+        "\tSpot Number: 2\n"
+        "\tEntry Date-time: 29-May-2022 14:44:07\n"
+        "No space available\n"
+        "Parking Receipt:\n\tReceipt Number: R-001\n"
+        "\tEntry Date-time: 29-May-2022 14:44:07\n"
+        "\tExit Date-time: 29-May-2022 15:40:07\n"
+        "\tFees: 10\n"
+    )
+
+
+def test_interpreter_drives_several_lots_independently():
+    failures, output, _ = run(
+        "LOT mall mall CAR_SUV=1\n"
+        "LOT stadium stadium CAR_SUV=1\n"
+        "PARK mall CAR_SUV\n"
+        "PARK stadium CAR_SUV\n"
+        "UNPARK mall 1 3600\n"
+        "UNPARK stadium 1 3600\n"
+    )
+
+    assert failures == 0
+    assert "Fees: 20\n" in output
+    assert "Fees: 60\n" in output
+
+
+def test_interpreter_reports_bad_commands_and_carries_on():
+    failures, output, errors = run(
+        "LOT mall mall CAR_SUV=1\n"
+        "PARK airport CAR_SUV\n"
+        "UNPARK mall 7\n"
+        "FLY mall CAR_SUV\n"
+        "PARK mall CAR_SUV\n"
+    )
+
+    assert failures == 3
+    assert errors == (
+        "Line 2: Unknown lot or vehicle type 'airport'\n"
+        "Line 3: Ticket 7 has not been commissioned by this parking lot\n"
+        "Line 4: Malformed command: FLY mall CAR_SUV\n"
+    )
+    assert "Ticket Number: 001" in output
+
+
+class RecordingOutput(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def writelines(self, lines):
+        self.batches.append(len(lines))
+        super().writelines(lines)
+
+
+def test_interpreter_writes_its_output_in_batches(monkeypatch):
+    monkeypatch.setattr(interpreter, "OUTPUT_BATCH_LINES", 2)
+    output = RecordingOutput()
+    failures = CommandInterpreter(output).run(
+        ["LOT mall mall CAR_SUV=2\n"] + ["PARK mall CAR_SUV 2022-05-29T14:04:07\n"] * 3
+    )
+
+    assert failures == 0
+    assert output.batches == [2, 2]
+    assert output.getvalue().count("Entry Date-time: 29-May-2022 14:04:07") == 2
+    assert output.getvalue().endswith("No space available\n")
@@ -0,0 +1,109 @@
+from datetime import datetime
+
+import pytest
+
+from parking.models.fees import MallFeeModel
+from parking.models.journal import Journal
+from parking.models.parking_lot import ParkingLot
+from parking.models.vehicle import VehicleType
+
+
+def make_parking_lot(journal):
+    return ParkingLot(
+        name="Mall Parking Lot",
+        spots={VehicleType.CAR_SUV: 5, VehicleType.BUS_TRUCK: 2},
+        fee_models={VehicleType.CAR_SUV: MallFeeModel(), VehicleType.BUS_TRUCK: MallFeeModel()},
+        journal=journal,
+    )
+
+
+def run_traffic(parking_lot):
+    tickets = [
+        parking_lot.park_vehicle(VehicleType.CAR_SUV, datetime(2022, 5, 29, 14, minute))
+        for minute in range(4)
+    ]
+    parking_lot.park_vehicle(VehicleType.BUS_TRUCK, datetime(2022, 5, 29, 15, 0))
+    parking_lot.unpark_vehicle(tickets[1].ticket_number, fake_duration=600)
+    parking_lot.unpark_vehicle(tickets[2].ticket_number, fake_duration=600)
+    parking_lot.park_vehicle(VehicleType.CAR_SUV, datetime(2022, 5, 29, 16, 0))
+
+
+@pytest.mark.parametrize("snapshot_every", [None, 3])
+def test_journal_recovers_the_lot_state(tmp_path, snapshot_every):
+    journal = Journal(tmp_path, batch_size=4, snapshot_every=snapshot_every)
+    parking_lot = make_parking_lot(journal)
+    run_traffic(parking_lot)
+    journal.close()
+
+    recovered_journal = Journal(tmp_path)
+    recovered = make_parking_lot(recovered_journal)
+    recovered_journal.recover(recovered)
+
+    assert recovered.vehicle_records == parking_lot.vehicle_records
+    assert recovered.occupied_spots == parking_lot.occupied_spots
+    assert recovered.ticket_counter == parking_lot.ticket_counter == 7
+    assert recovered.receipt_counter == parking_lot.receipt_counter == 3
+    # spot 2 went to the last car, spot 3 is the lowest free one
+    assert recovered.park_vehicle(VehicleType.CAR_SUV).spot_number == 3
+    recovered_journal.close()
+
+
+def test_journal_snapshots_bound_the_replayed_tail(tmp_path):
+    journal = Journal(tmp_path, batch_size=1, snapshot_every=3)
+    run_traffic(make_parking_lot(journal))
+    journal.close()
+
+    recovered_journal = Journal(tmp_path)
+    assert recovered_journal.recover(make_parking_lot(recovered_journal)) == 2
+    assert len(list(tmp_path.glob("journal-*.log"))) == 2
+
+
+def test_journal_ignores_a_torn_last_event(tmp_path):
+    journal = Journal(tmp_path, batch_size=1, snapshot_every=None)
+    parking_lot = make_parking_lot(journal)
+    parking_lot.park_vehicle(VehicleType.CAR_SUV, datetime(2022, 5, 29, 14, 0))
+    journal.close()
+    with open(next(tmp_path.glob("journal-*.log")), "a") as segment:
+        segment.write("P 2 1 2 2022-05-29")
+
+    recovered_journal = Journal(tmp_path)
+    recovered = make_parking_lot(recovered_journal)
+
+    assert recovered_journal.recover(recovered) == 1
+    assert list(recovered.vehicle_records) == [1]
+
+
+def test_journal_loses_nothing_once_committed(tmp_path):
+    journal = Journal(tmp_path, batch_size=100, max_delay=60, snapshot_every=None)
+    parking_lot = make_parking_lot(journal)
+    parking_lot.park_vehicle(VehicleType.CAR_SUV, datetime(2022, 5, 29, 14, 0))
+    journal.commit()
+
+    recovered_journal = Journal(tmp_path)
+    recovered = make_parking_lot(recovered_journal)
+    recovered_journal.recover(recovered)
+
+    assert list(recovered.vehicle_records) == [1]
+
+
+@pytest.mark.parametrize("snapshot_between", [False, True])
+def test_journal_drops_a_park_journaled_after_its_unpark(tmp_path, snapshot_between):
+    journal = Journal(tmp_path, batch_size=1, snapshot_every=None)
+    parking_lot = make_parking_lot(None)
+    ticket = parking_lot.park_vehicle(VehicleType.CAR_SUV, datetime(2022, 5, 29, 14, 0))
+    parking_lot.unpark_vehicle(ticket.ticket_number, fake_duration=600)
+    # another gate unparked the ticket before its park got journaled
+    journal.record_unpark(parking_lot, ticket.ticket_number, 1)
+    if snapshot_between:
+        journal.snapshot(parking_lot)
+    journal.record_park(parking_lot, VehicleType.CAR_SUV, ticket)
+    journal.close()
+
+    recovered_journal = Journal(tmp_path)
+    recovered = make_parking_lot(recovered_journal)
+    recovered_journal.recover(recovered)
+
+    assert recovered.vehicle_records == {}
+    assert recovered.occupied_spots[VehicleType.CAR_SUV] == 0
+    assert (recovered.ticket_counter, recovered.receipt_counter) == (2, 2)
+    recovered_journal.close()
@@ -0,0 +1,67 @@
+from datetime import datetime
+from urllib.request import urlopen
+
+from parking.metrics import LotMetrics, render_metrics, start_metrics_server
+from parking.models.fees import MallFeeModel
+from parking.models.parking_lot import ParkingLot
+from parking.models.vehicle import VehicleType
+
+
+def make_parking_lot(metrics=None):
+    return ParkingLot(
+        name="Mall Parking Lot",
+        spots={VehicleType.CAR_SUV: 1},
+        fee_models={VehicleType.CAR_SUV: MallFeeModel()},
+        metrics=metrics,
+    )
+
+
+def test_metrics_count_and_time_parks_and_unparks():
+    parking_lot = make_parking_lot(LotMetrics())
+    ticket = parking_lot.park_vehicle(VehicleType.CAR_SUV, datetime(2022, 5, 29, 14, 4, 7))
+    parking_lot.park_vehicle(VehicleType.CAR_SUV)
+    parking_lot.unpark_vehicle(ticket.ticket_number, fake_duration=3600)
+
+    metrics = parking_lot.metrics
+    assert metrics.parks == {VehicleType.CAR_SUV: 1}
+    assert metrics.rejections == {VehicleType.CAR_SUV: 1}
+    assert metrics.unparks == {VehicleType.CAR_SUV: 1}
+    assert metrics.operations["park"].count == 2
+    assert metrics.operations["unpark"].count == 1
+    assert metrics.fee_models["MallFeeModel"].count == 1
+
+    exposition = render_metrics([parking_lot])
+    labels = 'lot="Mall Parking Lot",vehicle_type="CAR_SUV"'
+    assert f"parking_parks_total{{{labels}}} 1" in exposition
+    assert f"parking_rejections_total{{{labels}}} 1" in exposition
+    assert f"parking_occupied_spots{{{labels}}} 0" in exposition
+    assert (
+        'parking_operation_duration_seconds_bucket{lot="Mall Parking Lot",operation="park",'
+        'le="+Inf"} 2'
+    ) in exposition
+    assert (
+        'parking_fee_calculation_duration_seconds_count{lot="Mall Parking Lot",'
+        'fee_model="MallFeeModel"} 1'
+    ) in exposition
+
+
+def test_lots_without_metrics_only_export_occupancy():
+    parking_lot = make_parking_lot()
+    parking_lot.park_vehicle(VehicleType.CAR_SUV)
+
+    exposition = render_metrics([parking_lot])
+    assert 'parking_occupied_spots{lot="Mall Parking Lot",vehicle_type="CAR_SUV"} 1' in exposition
+    assert "parking_parks_total{" not in exposition
+
+
+def test_metrics_server_serves_the_exposition():
+    parking_lot = make_parking_lot(LotMetrics())
+    parking_lot.park_vehicle(VehicleType.CAR_SUV)
+    server = start_metrics_server([parking_lot], port=0)
+    try:
+        with urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert "parking_parks_total" in response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
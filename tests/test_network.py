@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import pytest
+
+from parking.models.fees import MallFeeModel, StadiumFeeModel
+from parking.models.slips import Receipt, Ticket
+from parking.models.vehicle import VehicleType
+from parking.network import PARK, UNPARK, LotConfig, ParkingNetwork, Request
+
+
+@pytest.fixture
+def network():
+    lots = {
+        f"mall-{i}": LotConfig(
+            f"Mall {i}",
+            {VehicleType.CAR_SUV: 2, VehicleType.MOTORCYCLE_SCOOTER: 3},
+            {VehicleType.CAR_SUV: MallFeeModel(), VehicleType.MOTORCYCLE_SCOOTER: MallFeeModel()},
+        )
+        for i in range(6)
+    }
+    lots["stadium"] = LotConfig(
+        "Stadium", {VehicleType.CAR_SUV: 1}, {VehicleType.CAR_SUV: StadiumFeeModel()}
+    )
+    with ParkingNetwork(lots, workers=3) as network:
+        yield network
+
+
+def test_network_routes_calls_to_independent_lots(network):
+    ticket = network.park_vehicle("stadium", VehicleType.CAR_SUV, datetime(2022, 5, 29, 14, 4, 7))
+    assert str(ticket) == (
+        "Parking Ticket:\n\tTicket Number: 001\n"
+        "\tSpot Number: 1\n"
+        "\tEntry Date-time: 29-May-2022 14:04:07"
+    )
+    assert network.park_vehicle("mall-0", VehicleType.CAR_SUV).ticket_number == 1
+    assert network.park_vehicle("stadium", VehicleType.CAR_SUV) == "No space available"
+
+    receipt = network.unpark_vehicle("stadium", 1, fake_duration=47100)
+    assert receipt.fees_paid == 580
+    with pytest.raises(ValueError, match="Ticket 1 has not been commissioned"):
+        network.unpark_vehicle("stadium", 1)
+    with pytest.raises(ValueError, match="Lot airport is not part of this network"):
+        network.park_vehicle("airport", VehicleType.CAR_SUV)
+
+
+def test_network_runs_batches_across_workers_in_order(network):
+    parks = [Request(PARK, f"mall-{i % 6}", VehicleType.CAR_SUV) for i in range(14)]
+    tickets = network.execute(parks)
+
+    assert [ticket.ticket_number for ticket in tickets[:12]] == [1] * 6 + [2] * 6
+    assert tickets[12:] == ["No space available"] * 2
+
+    results = network.execute(
+        [Request(UNPARK, "mall-3", 2, 3600), Request(UNPARK, "mall-3", 9, 3600)]
+    )
+    assert isinstance(results[0], Receipt) and results[0].fees_paid == 20
+    assert isinstance(results[1], ValueError)
+
+
+def test_network_sums_free_spots_over_all_lots(network):
+    network.execute([Request(PARK, f"mall-{i}", VehicleType.MOTORCYCLE_SCOOTER) for i in range(6)])
+
+    assert network.free_spots() == {
+        VehicleType.CAR_SUV: 6 * 2 + 1,
+        VehicleType.MOTORCYCLE_SCOOTER: 6 * 2,
+    }
+    assert isinstance(network.park_vehicle("mall-1", VehicleType.CAR_SUV), Ticket)
+
+
+def test_network_answers_failing_requests_with_their_exception(network):
+    results = network.execute(
+        [
+            Request(PARK, "stadium", VehicleType.BUS_TRUCK),
+            Request(PARK, "stadium", "CAR_SUV"),
+            Request("tow", "stadium", 1),
+            Request(PARK, "stadium", VehicleType.CAR_SUV),
+        ]
+    )
+
+    # the lot is part of the network, it has no spots for the vehicle type
+    assert isinstance(results[0], KeyError)
+    assert isinstance(results[1], ValueError)
+    assert str(results[2]) == "Unknown operation tow"
+    # the worker kept serving its lots
+    assert isinstance(results[3], Ticket)
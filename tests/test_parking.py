@@ -1,11 +1,31 @@
-from datetime import datetime
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
 import pytest
 
 from parking.examples import run_example_one, run_example_two, run_example_three, run_example_four
-from parking.models.fees import MallFeeModel, StadiumFeeModel, AirportFeeModel
+from parking.models.analytics import LotAnalytics
+from parking.models.archive import ClosedSession, SessionArchive, discard_spilled
+from parking.models.clock import SimulatedClock, SystemClock
+from parking.models.entry_index import EntryTimeIndex
+from parking.models.fees import (
+    MallFeeModel,
+    StadiumFeeModel,
+    AirportFeeModel,
+    Rate,
+    TariffFeeModel,
+)
 from parking.models.parking_lot import ParkingLot
-from parking.models.slips import Ticket, Receipt
+from parking.models.quotes import QuoteCache
+from parking.models.sweeper import SessionSweeper, TimingWheel
+from parking.models.slips import (
+    CompactReceipt,
+    CompactTicket,
+    Ticket,
+    Receipt,
+    to_epoch_seconds,
+)
 from parking.models.vehicle import VehicleType
 
 
@@ -268,6 +288,21 @@ def test_parking_lot_unpark_a_car_from_mall_returns_a_valid_receipt():
     )
 
 
+def test_parking_lot_parks_with_a_time_zone_aware_entry_time():
+    parking_lot = ParkingLot(
+        name="Mall Parking Lot",
+        spots={VehicleType.CAR_SUV: 1},
+        fee_models={VehicleType.CAR_SUV: MallFeeModel()},
+    )
+    entry_time = datetime(2022, 5, 29, 14, 4, 7, tzinfo=timezone(timedelta(hours=2)))
+
+    ticket = parking_lot.park_vehicle(VehicleType.CAR_SUV, fake_entry_time=entry_time)
+
+    # entry times are kept in naive local time
+    assert ticket.entry_datetime == entry_time.astimezone().replace(tzinfo=None)
+    assert parking_lot.unpark_vehicle(ticket.ticket_number, fake_duration=3600).fees_paid == 20
+
+
 def test_parking_lot_parking_with_invalid_vehicle_type_fails():
     parking_lot = ParkingLot(
         name="Sample Parking Lot",
@@ -288,3 +323,449 @@ def test_parking_lot_unparking_with_invalid_ticket_number_fails():
         ValueError, match="Ticket 15 has not been commissioned by this parking lot"
     ):
         parking_lot.unpark_vehicle(ticket_number=15)
+
+
+def test_parking_lot_reuses_lowest_spot_after_out_of_order_unpark():
+    parking_lot = ParkingLot(
+        name="Stadium Parking Lot",
+        spots={VehicleType.CAR_SUV: 3},
+        fee_models={VehicleType.CAR_SUV: StadiumFeeModel()},
+    )
+    tickets = [parking_lot.park_vehicle(vehicle_type=VehicleType.CAR_SUV) for _ in range(3)]
+    parking_lot.unpark_vehicle(tickets[0].ticket_number, fake_duration=3600)
+
+    ticket = parking_lot.park_vehicle(vehicle_type=VehicleType.CAR_SUV)
+
+    assert ticket.spot_number == 1
+    assert parking_lot.park_vehicle(vehicle_type=VehicleType.CAR_SUV) == "No space available"
+
+
+def test_parking_lot_unparking_the_same_ticket_twice_fails():
+    parking_lot = ParkingLot(
+        name="Mall Parking Lot",
+        spots={VehicleType.CAR_SUV: 1},
+        fee_models={VehicleType.CAR_SUV: MallFeeModel()},
+    )
+    ticket = parking_lot.park_vehicle(vehicle_type=VehicleType.CAR_SUV)
+    parking_lot.unpark_vehicle(ticket.ticket_number, fake_duration=3600)
+
+    with pytest.raises(ValueError, match="has not been commissioned"):
+        parking_lot.unpark_vehicle(ticket.ticket_number, fake_duration=3600)
+    assert parking_lot.occupied_spots[VehicleType.CAR_SUV] == 0
+
+
+def test_parking_lot_moves_closed_sessions_to_the_archive():
+    parking_lot = ParkingLot(
+        name="Mall Parking Lot",
+        spots={VehicleType.CAR_SUV: 2},
+        fee_models={VehicleType.CAR_SUV: MallFeeModel()},
+    )
+    ticket = parking_lot.park_vehicle(
+        vehicle_type=VehicleType.CAR_SUV, fake_entry_time=datetime(2022, 5, 29, 14, 4, 7)
+    )
+    parking_lot.unpark_vehicle(ticket.ticket_number, fake_duration=5400)
+
+    assert parking_lot.vehicle_records == {}
+    assert list(parking_lot.archive) == [
+        ClosedSession(
+            ticket_number=1,
+            vehicle_type=VehicleType.CAR_SUV,
+            entry_datetime=datetime(2022, 5, 29, 14, 4, 7),
+            exit_datetime=datetime(2022, 5, 29, 15, 34, 7),
+            fees_paid=40,
+        )
+    ]
+
+
+def test_session_archive_spills_once_full():
+    spilled = []
+    archive = SessionArchive(
+        max_sessions=2, on_spill=lambda full: spilled.append(list(full.ticket_numbers))
+    )
+    parking_lot = ParkingLot(
+        name="Mall Parking Lot",
+        spots={VehicleType.CAR_SUV: 1},
+        fee_models={VehicleType.CAR_SUV: MallFeeModel()},
+        archive=archive,
+    )
+    for _ in range(3):
+        ticket = parking_lot.park_vehicle(vehicle_type=VehicleType.CAR_SUV)
+        parking_lot.unpark_vehicle(ticket.ticket_number, fake_duration=60)
+
+    assert spilled == [[1, 2]]
+    assert list(archive.ticket_numbers) == [3]
+    assert archive.spilled_sessions == 2
+
+
+def test_session_archive_warns_once_when_it_drops_spilled_sessions():
+    archive = SessionArchive(max_sessions=1)
+
+    with pytest.warns(RuntimeWarning, match="dropped") as warned:
+        for ticket_number in range(1, 4):
+            archive.append(ticket_number, VehicleType.CAR_SUV, 0, 60, 0)
+
+    assert len(warned) == 1
+    assert len(archive) == 0
+    assert archive.spilled_sessions == 3
+
+    archive = SessionArchive(max_sessions=1, on_spill=discard_spilled)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        archive.append(1, VehicleType.CAR_SUV, 0, 60, 0)
+    assert archive.spilled_sessions == 1
+
+
+@pytest.mark.parametrize(
+    "fee_model, vehicle_types",
+    [
+        (MallFeeModel(), list(VehicleType)),
+        (StadiumFeeModel(), [VehicleType.MOTORCYCLE_SCOOTER, VehicleType.CAR_SUV]),
+        (AirportFeeModel(), [VehicleType.MOTORCYCLE_SCOOTER, VehicleType.CAR_SUV]),
+    ],
+)
+def test_batch_fees_match_scalar_fees(fee_model, vehicle_types):
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(7)
+    durations = np.concatenate(
+        [np.arange(0, 100, 0.25), rng.uniform(0, 24 * 7, 1000), [1, 4, 8, 12, 24, 48]]
+    )
+    types = rng.choice(np.array(vehicle_types, dtype=object), durations.size)
+
+    fees = fee_model.calculate_fees_batch(types, durations)
+
+    assert fees.tolist() == [
+        fee_model.calculate_fees(vehicle_type, duration)
+        for vehicle_type, duration in zip(types, durations.tolist())
+    ]
+
+
+def test_batch_fees_rejects_unsupported_vehicle_types():
+    np = pytest.importorskip("numpy")
+    with pytest.raises(ValueError, match="Unsupported vehicle type for StadiumFeeModel"):
+        StadiumFeeModel().calculate_fees_batch(
+            np.array([VehicleType.BUS_TRUCK], dtype=object), np.array([1.0])
+        )
+
+
+def test_tariff_fee_model_prices_a_new_tariff_without_a_subclass():
+    hospital_fee_model = TariffFeeModel(
+        "Hospital",
+        {VehicleType.CAR_SUV: Rate(bands=((0, 2, 0), (2, 6, 30)), overflow_fee=15)},
+    )
+    assert hospital_fee_model.calculate_fees(VehicleType.CAR_SUV, 1.5) == 0
+    assert hospital_fee_model.calculate_fees(VehicleType.CAR_SUV, 5) == 30
+    # last band fee, then 15 per started hour past the sixth
+    assert hospital_fee_model.calculate_fees(VehicleType.CAR_SUV, 7.5) == 60
+    with pytest.raises(ValueError, match="Unsupported vehicle type for Hospital"):
+        hospital_fee_model.calculate_fees(VehicleType.BUS_TRUCK, 1)
+
+
+def test_tariff_fee_model_rejects_gaps_between_bands():
+    with pytest.raises(ValueError, match="Fee bands should be contiguous"):
+        TariffFeeModel("Broken", {VehicleType.CAR_SUV: Rate(bands=((0, 2, 0), (3, 6, 30)))})
+
+
+def test_concurrent_parking_lot_keeps_its_invariants_under_many_gate_threads():
+    spots = {VehicleType.MOTORCYCLE_SCOOTER: 20, VehicleType.CAR_SUV: 30}
+    mall = MallFeeModel()
+    parking_lot = ParkingLot(
+        name="Mall parking lot",
+        spots=spots,
+        fee_models={vehicle_type: mall for vehicle_type in spots},
+        archive=SessionArchive(max_sessions=None),
+        concurrent=True,
+    )
+
+    def gate(vehicle_type):
+        tickets, receipts = [], []
+        for _ in range(500):
+            ticket = parking_lot.park_vehicle(vehicle_type=vehicle_type)
+            if isinstance(ticket, Ticket):
+                tickets.append(ticket)
+                receipts.append(parking_lot.unpark_vehicle(ticket.ticket_number, 60))
+        return tickets, receipts
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(gate, list(spots) * 8))
+
+    tickets = [ticket for gate_tickets, _ in results for ticket in gate_tickets]
+    receipts = [receipt for _, gate_receipts in results for receipt in gate_receipts]
+    ticket_numbers = [ticket.ticket_number for ticket in tickets]
+    assert len(set(ticket_numbers)) == len(ticket_numbers)
+    assert sorted(ticket_numbers) == list(range(1, len(tickets) + 1))
+    assert len({receipt.receipt_number for receipt in receipts}) == len(receipts)
+    assert parking_lot.ticket_counter == len(tickets) + 1
+    assert parking_lot.receipt_counter == len(receipts) + 1
+    assert parking_lot.vehicle_records == {}
+    assert parking_lot.occupied_spots == {vehicle_type: 0 for vehicle_type in spots}
+    assert all(len(parking_lot.free_spots[t]) == capacity for t, capacity in spots.items())
+    assert len(parking_lot.archive) == len(receipts)
+    assert sorted(parking_lot.archive.ticket_numbers) == sorted(ticket_numbers)
+
+
+def test_concurrent_parking_lot_never_hands_out_an_occupied_spot():
+    parking_lot = ParkingLot(
+        name="Stadium Parking Lot",
+        spots={VehicleType.CAR_SUV: 50},
+        fee_models={VehicleType.CAR_SUV: StadiumFeeModel()},
+        concurrent=True,
+    )
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        tickets = list(
+            pool.map(lambda _: parking_lot.park_vehicle(VehicleType.CAR_SUV), range(80))
+        )
+
+    parked = [ticket for ticket in tickets if isinstance(ticket, Ticket)]
+    assert sorted(ticket.spot_number for ticket in parked) == list(range(1, 51))
+    assert tickets.count("No space available") == 30
+
+
+def test_compact_slips_render_exactly_as_slips():
+    ticket = Ticket(ticket_number=7, spot_number=3, entry_datetime=datetime(2022, 5, 29, 14, 4, 7))
+    receipt = Receipt(
+        receipt_number=2,
+        entry_datetime=datetime(2022, 5, 29, 14, 4, 7),
+        exit_datetime=datetime(2022, 6, 1, 16, 4, 7),
+        fees_paid=400,
+    )
+
+    compact_ticket = CompactTicket.from_ticket(ticket)
+    compact_receipt = CompactReceipt.from_receipt(receipt)
+
+    assert str(compact_ticket) == str(ticket)
+    assert str(compact_receipt) == str(receipt)
+    assert compact_ticket.to_ticket() == ticket
+    assert compact_receipt.to_receipt() == receipt
+    assert not hasattr(compact_ticket, "__dict__")
+    assert not hasattr(ticket, "__dict__")
+
+
+def test_parking_lot_keeps_running_occupancy_and_revenue():
+    mall = MallFeeModel()
+    parking_lot = ParkingLot(
+        name="Mall parking lot",
+        spots={VehicleType.MOTORCYCLE_SCOOTER: 5, VehicleType.CAR_SUV: 5},
+        fee_models={VehicleType.MOTORCYCLE_SCOOTER: mall, VehicleType.CAR_SUV: mall},
+        analytics=LotAnalytics(),
+    )
+    entry = datetime(2022, 5, 29, 14, 4, 7)
+    cars = [parking_lot.park_vehicle(VehicleType.CAR_SUV, entry) for _ in range(3)]
+    parking_lot.park_vehicle(VehicleType.MOTORCYCLE_SCOOTER, entry)
+    parking_lot.unpark_vehicle(cars[0].ticket_number, fake_duration=1800)  # 14:34:07, 20
+    parking_lot.unpark_vehicle(cars[1].ticket_number, fake_duration=5400)  # 15:34:07, 40
+
+    analytics = parking_lot.analytics
+    assert analytics.occupancy() == 2
+    assert analytics.occupancy(VehicleType.CAR_SUV) == 1
+    assert analytics.revenue() == 60
+    assert analytics.revenue(VehicleType.CAR_SUV) == 60
+    assert analytics.revenue(VehicleType.MOTORCYCLE_SCOOTER) == 0
+    assert analytics.revenue_in_bucket(datetime(2022, 5, 29, 14, 59)) == 20
+    assert analytics.peak_occupancy_in_bucket(datetime(2022, 5, 29, 14, 59)) == 4
+    assert analytics.series() == [
+        (datetime(2022, 5, 29, 14), 20, 4),
+        (datetime(2022, 5, 29, 15), 40, 2),
+    ]
+
+
+def test_lot_analytics_only_keeps_the_latest_buckets():
+    analytics = LotAnalytics(bucket_seconds=3600, buckets=2)
+    for hour in (10, 11, 12):
+        analytics.record_park(VehicleType.CAR_SUV, to_epoch_seconds(datetime(2022, 5, 29, hour)))
+        analytics.record_unpark(
+            VehicleType.CAR_SUV, to_epoch_seconds(datetime(2022, 5, 29, hour, 30)), 10
+        )
+    # too old for the kept buckets, only counts towards the totals
+    analytics.record_park(VehicleType.CAR_SUV, to_epoch_seconds(datetime(2022, 5, 29, 9)))
+
+    assert [bucket for bucket, _, _ in analytics.series()] == [
+        datetime(2022, 5, 29, 11),
+        datetime(2022, 5, 29, 12),
+    ]
+    assert analytics.revenue_in_bucket(datetime(2022, 5, 29, 10)) == 0
+    assert analytics.revenue() == 30
+    assert analytics.occupancy() == 1
+
+
+@pytest.mark.parametrize("fee_model", [MallFeeModel(), StadiumFeeModel(), AirportFeeModel()])
+def test_quote_cache_quotes_the_same_fees_as_the_fee_model(fee_model):
+    quotes = QuoteCache(max_quotes=16)
+    durations = [step / 8 for step in range(24 * 8 * 3)] + [1, 4, 8, 12, 24, 48]
+    for duration in durations:
+        assert quotes.quote(fee_model, VehicleType.CAR_SUV, duration) == (
+            fee_model.calculate_fees(VehicleType.CAR_SUV, duration)
+        )
+    assert quotes.hits > quotes.misses
+    assert len(quotes) == 16
+
+
+def test_parking_lot_quotes_fees_without_unparking():
+    mall = MallFeeModel()
+    parking_lot = ParkingLot(
+        name="Mall parking lot",
+        spots={VehicleType.CAR_SUV: 5},
+        fee_models={VehicleType.CAR_SUV: mall},
+        quotes=QuoteCache(),
+    )
+    ticket = parking_lot.park_vehicle(VehicleType.CAR_SUV, datetime(2022, 5, 29, 14, 4, 7))
+
+    assert parking_lot.quote_fees(ticket.ticket_number, fake_duration=5400) == 40
+    assert parking_lot.quote_fees(ticket.ticket_number, fake_duration=5000) == 40
+    assert (parking_lot.quotes.hits, parking_lot.quotes.misses) == (1, 1)
+    assert parking_lot.occupied_spots[VehicleType.CAR_SUV] == 1
+
+    # a tariff change drops the quotes of the replaced tariff
+    parking_lot.set_fee_model(VehicleType.CAR_SUV, StadiumFeeModel())
+    assert len(parking_lot.quotes) == 0
+    assert parking_lot.quote_fees(ticket.ticket_number, fake_duration=5400) == 60
+    assert parking_lot.unpark_vehicle(ticket.ticket_number, fake_duration=5400).fees_paid == 60
+
+
+@pytest.mark.parametrize("entry_index", [None, EntryTimeIndex()])
+def test_parking_lot_lists_vehicles_parked_longer_than_a_duration(entry_index):
+    parking_lot = ParkingLot(
+        name="Airport parking lot",
+        spots={VehicleType.CAR_SUV: 10},
+        fee_models={VehicleType.CAR_SUV: AirportFeeModel()},
+        entry_index=entry_index,
+    )
+    tickets = [
+        parking_lot.park_vehicle(VehicleType.CAR_SUV, datetime(2022, 5, day, 9))
+        for day in (29, 27, 28, 25)
+    ]
+    parking_lot.unpark_vehicle(tickets[2].ticket_number, fake_duration=3600)
+
+    now = datetime(2022, 5, 29, 10)
+    assert [t.ticket_number for t in parking_lot.parked_longer_than(24, now)] == [4, 2]
+    assert [t.ticket_number for t in parking_lot.parked_longer_than(0.5, now)] == [4, 2, 1]
+    assert parking_lot.parked_longer_than(24 * 5, now) == []
+
+
+def test_timing_wheel_fires_timers_once_due():
+    fired = []
+    wheel = TimingWheel(now=0, tick_seconds=60, slots=8)
+    for key, deadline in (("a", 90), ("b", 60 * 20), ("c", 60 * 9), ("d", 30)):
+        wheel.schedule(key, deadline, lambda key=key: fired.append(key))
+    wheel.cancel("c")
+
+    def advance(now):
+        for callback in wheel.advance(now):
+            callback()
+
+    advance(119)
+    assert fired == ["d"]
+    advance(120)
+    assert fired == ["d", "a"]
+    # more than a revolution later, only timers due by then fire
+    advance(60 * 19)
+    assert fired == ["d", "a"] and len(wheel) == 1
+    advance(60 * 25)
+    assert fired == ["d", "a", "b"] and len(wheel) == 0
+
+
+def test_sweeper_flags_overstays_and_day_boundaries():
+    overstays, fee_changes = [], []
+    parking_lot = ParkingLot(
+        name="Airport parking lot",
+        spots={VehicleType.CAR_SUV: 10},
+        fee_models={VehicleType.CAR_SUV: AirportFeeModel()},
+        sweeper=SessionSweeper(
+            overstay_hours=36,
+            on_overstay=lambda *args: overstays.append(args),
+            on_fee_change=lambda *args: fee_changes.append(args),
+        ),
+    )
+    entry = datetime(2022, 5, 29, 9)
+    kept = parking_lot.park_vehicle(VehicleType.CAR_SUV, entry)
+    left = parking_lot.park_vehicle(VehicleType.CAR_SUV, entry)
+    parking_lot.unpark_vehicle(left.ticket_number, fake_duration=3600)
+
+    assert parking_lot.sweep(datetime(2022, 5, 29, 20)) == 0
+    assert parking_lot.sweep(datetime(2022, 5, 31, 10)) == 4
+    assert overstays == [(kept.ticket_number, VehicleType.CAR_SUV)]
+    assert [hours for _, _, hours in fee_changes] == [12, 24, 48]
+
+
+def test_parking_lot_parks_and_unparks_in_bulk_like_one_by_one():
+    def make_parking_lot():
+        mall = MallFeeModel()
+        return ParkingLot(
+            name="Mall parking lot",
+            spots={VehicleType.MOTORCYCLE_SCOOTER: 2, VehicleType.CAR_SUV: 3},
+            fee_models={VehicleType.MOTORCYCLE_SCOOTER: mall, VehicleType.CAR_SUV: mall},
+            analytics=LotAnalytics(),
+        )
+
+    entry = datetime(2022, 5, 29, 14, 4, 7)
+    vehicle_types = [VehicleType.CAR_SUV, VehicleType.MOTORCYCLE_SCOOTER] * 3
+    one_by_one, bulk = make_parking_lot(), make_parking_lot()
+    expected = [one_by_one.park_vehicle(vehicle_type, entry) for vehicle_type in vehicle_types]
+
+    tickets = bulk.park_many(vehicle_types + ["CAR_SUV", VehicleType.BUS_TRUCK], [entry] * 8)
+    assert tickets[:6] == expected
+    assert tickets[5] == "No space available"
+    assert [str(error) for error in tickets[6:]] == [
+        "Vehicle type passed is not recognised: <class 'str'>",
+        "No spots are assigned to BUS_TRUCK",
+    ]
+    assert bulk.occupied_spots == one_by_one.occupied_spots
+
+    receipts = bulk.unpark_many([3, 1, 42, 3], [5400, 3600, 60, 60])
+    assert [receipt.receipt_number for receipt in receipts[:2]] == [1, 2]
+    assert [receipt.fees_paid for receipt in receipts[:2]] == [40, 20]
+    assert receipts[1].exit_datetime == datetime(2022, 5, 29, 15, 4, 7)
+    assert [str(error) for error in receipts[2:]] == [
+        "Ticket 42 has not been commissioned by this parking lot",
+        "Ticket 3 has not been commissioned by this parking lot",
+    ]
+    assert bulk.occupied_spots == {VehicleType.MOTORCYCLE_SCOOTER: 2, VehicleType.CAR_SUV: 1}
+    assert bulk.park_many([VehicleType.CAR_SUV])[0].spot_number == 1
+    assert len(bulk.archive) == 2 and bulk.analytics.occupancy() == 4
+
+
+def test_system_clock_reads_local_wall_clock_seconds():
+    clock = SystemClock()
+    before = to_epoch_seconds(datetime.now())
+    now = clock.now()
+    assert before <= now <= to_epoch_seconds(datetime.now())
+    # the cached offset is reused within the minute
+    assert clock.now() - now <= 1
+
+
+def test_issued_slips_build_date_times_when_read():
+    parking_lot = ParkingLot(
+        name="Mall parking lot",
+        spots={VehicleType.CAR_SUV: 2},
+        fee_models={VehicleType.CAR_SUV: MallFeeModel()},
+    )
+    entry_time = datetime(2022, 5, 29, 14, 4, 7)
+    ticket = parking_lot.park_vehicle(VehicleType.CAR_SUV, entry_time)
+    assert ticket == Ticket(1, 1, entry_time) and ticket.entry_datetime == entry_time
+    receipt = parking_lot.unpark_vehicle(ticket.ticket_number, fake_duration=5400)
+    assert receipt == Receipt(1, entry_time, datetime(2022, 5, 29, 15, 34, 7), 40)
+    assert repr(receipt) == repr(Receipt(1, entry_time, receipt.exit_datetime, 40))
+    assert not hasattr(ticket, "__dict__") and not hasattr(receipt, "__dict__")
+
+
+def test_parking_lot_reads_time_off_its_clock():
+    clock = SimulatedClock(datetime(2022, 5, 29, 14, 4, 7))
+    parking_lot = ParkingLot(
+        name="Mall parking lot",
+        spots={VehicleType.CAR_SUV: 2},
+        fee_models={VehicleType.CAR_SUV: MallFeeModel()},
+        clock=clock,
+    )
+    ticket = parking_lot.park_vehicle(VehicleType.CAR_SUV)
+    assert ticket.entry_datetime == datetime(2022, 5, 29, 14, 4, 7)
+
+    clock.advance(5400)
+    assert parking_lot.quote_fees(ticket.ticket_number) == 40
+    assert parking_lot.parked_longer_than(1.4) == [ticket]
+    assert parking_lot.parked_longer_than(1.5) == []
+
+    # fake durations still win over the clock
+    assert parking_lot.quote_fees(ticket.ticket_number, fake_duration=60) == 20
+    receipt = parking_lot.unpark_vehicle(ticket.ticket_number)
+    assert receipt.exit_datetime == datetime(2022, 5, 29, 15, 34, 7)
+    assert receipt.fees_paid == 40
@@ -0,0 +1,68 @@
+from datetime import datetime
+
+import pytest
+
+from parking.models.archive import SessionArchive
+from parking.models.fees import AirportFeeModel, MallFeeModel, StadiumFeeModel
+from parking.models.parking_lot import ParkingLot
+from parking.models.storage import SqliteSessionStore
+from parking.models.vehicle import VehicleType
+from parking.repricing import ACTUAL, SessionChunk, reprice, store_chunks
+
+CAR, MOTORCYCLE = VehicleType.CAR_SUV, VehicleType.MOTORCYCLE_SCOOTER
+FEE_MODELS = {"stadium": StadiumFeeModel(), "airport": AirportFeeModel()}
+
+
+def test_repricing_reports_revenue_by_vehicle_type_and_duration_band(tmp_path):
+    store = SqliteSessionStore(tmp_path / "sessions.db")
+    parking_lot = ParkingLot(
+        name="Mall Parking Lot",
+        spots={CAR: 10, MOTORCYCLE: 10},
+        fee_models={CAR: MallFeeModel(), MOTORCYCLE: MallFeeModel()},
+        storage=store,
+    )
+    entry_time = datetime(2022, 5, 29, 8)
+    # (vehicle type, stay in seconds)
+    stays = [(CAR, 1800), (CAR, 5 * 3600), (CAR, 30 * 3600), (MOTORCYCLE, 3 * 3600)]
+    for vehicle_type, stay in stays:
+        ticket = parking_lot.park_vehicle(vehicle_type, entry_time)
+        parking_lot.unpark_vehicle(ticket.ticket_number, stay)
+    # still parked, not repriced
+    parking_lot.park_vehicle(CAR, entry_time)
+    store.commit()
+
+    chunks = store_chunks(store, entry_time, datetime(2022, 5, 30), chunk_size=3)
+    reports = reprice(chunks, FEE_MODELS, bands=(1, 4, 24), workers=1)
+    store.close()
+
+    assert set(reports) == {ACTUAL, "stadium", "airport"}
+    assert reports[ACTUAL].total() == 20 + 5 * 20 + 30 * 20 + 3 * 10
+    assert reports[ACTUAL].sessions[CAR, (24, float("inf"))] == 1
+    assert reports["stadium"].by_vehicle_type() == {CAR: 60 + 180 + 180 + 18 * 200, MOTORCYCLE: 30}
+    assert reports["airport"].by_duration_band() == {
+        (0, 1): 60,
+        (1, 4): 40,
+        (4, 24): 60,
+        (24, float("inf")): 200,
+    }
+
+
+def test_repricing_gives_the_same_reports_whatever_the_workers():
+    archive = SessionArchive(max_sessions=None)
+    for i in range(1, 2001):
+        vehicle_type = CAR if i % 3 else MOTORCYCLE
+        archive.append(i, vehicle_type, 0, 97 * i, MallFeeModel().calculate_fees(vehicle_type, 1))
+
+    def chunks():
+        whole = SessionChunk.from_archive(archive)
+        for start in range(0, len(archive), 300):
+            yield SessionChunk(*(column[start : start + 300] for column in whole))
+
+    in_process = reprice(chunks(), FEE_MODELS, workers=1)
+    assert reprice(chunks(), FEE_MODELS, workers=2) == in_process
+    assert sum(in_process["airport"].sessions.values()) == 2000
+
+    with pytest.raises(ValueError, match="names the fees actually paid"):
+        reprice(chunks(), {ACTUAL: MallFeeModel()})
+    with pytest.raises(ValueError, match="Duration bands should start past 0 and increase"):
+        reprice(chunks(), FEE_MODELS, bands=(4, 1))
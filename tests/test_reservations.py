@@ -0,0 +1,119 @@
+from datetime import datetime
+
+import pytest
+
+from parking.models.clock import SimulatedClock
+from parking.models.fees import AirportFeeModel
+from parking.models.parking_lot import ParkingLot
+from parking.models.reservations import Reservation, Reservations
+from parking.models.vehicle import VehicleType
+
+
+def make_parking_lot(spots, reservable, now=datetime(2022, 5, 29, 8)):
+    clock = SimulatedClock(now)
+    parking_lot = ParkingLot(
+        name="Airport Parking Lot",
+        spots={VehicleType.CAR_SUV: spots},
+        fee_models={VehicleType.CAR_SUV: AirportFeeModel()},
+        clock=clock,
+        reservations=Reservations({VehicleType.CAR_SUV: reservable}),
+    )
+    return parking_lot, clock
+
+
+def test_reservations_track_capacity_over_time():
+    parking_lot, _ = make_parking_lot(spots=5, reservable=2)
+    car = VehicleType.CAR_SUV
+
+    assert parking_lot.reserve(car, datetime(2022, 5, 30, 10), datetime(2022, 5, 30, 14)) == (
+        Reservation(1, car, datetime(2022, 5, 30, 10), datetime(2022, 5, 30, 14))
+    )
+    parking_lot.reserve(car, datetime(2022, 5, 30, 12), datetime(2022, 5, 30, 18))
+    assert not parking_lot.is_available(car, datetime(2022, 5, 30, 13), datetime(2022, 5, 30, 15))
+    assert parking_lot.is_available(car, datetime(2022, 5, 30, 14), datetime(2022, 5, 30, 15))
+    assert (
+        parking_lot.reserve(car, datetime(2022, 5, 30, 13, 50), datetime(2022, 5, 30, 15))
+        == "No space available"
+    )
+    # windows are rounded out to 15 minutes slots
+    assert parking_lot.next_free_window(car, 4, datetime(2022, 5, 30, 9, 1)) == datetime(
+        2022, 5, 30, 14
+    )
+    assert parking_lot.next_free_window(car, 2, datetime(2022, 5, 30, 8)) == datetime(
+        2022, 5, 30, 8
+    )
+
+    parking_lot.cancel_reservation(2)
+    assert parking_lot.is_available(car, datetime(2022, 5, 30, 13), datetime(2022, 5, 30, 15))
+    with pytest.raises(ValueError, match="Reservation 2 is not held"):
+        parking_lot.cancel_reservation(2)
+    with pytest.raises(ValueError, match="should start from now on and end within 90 days"):
+        parking_lot.reserve(car, datetime(2022, 5, 29, 7), datetime(2022, 5, 29, 9))
+
+
+def test_parking_lot_holds_reserved_spots_from_walk_ins():
+    parking_lot, clock = make_parking_lot(spots=2, reservable=1)
+    car = VehicleType.CAR_SUV
+    reservation = parking_lot.reserve(car, datetime(2022, 5, 29, 10), datetime(2022, 5, 29, 12))
+
+    # the window has not started, walk-ins may take every spot until then
+    walk_in = parking_lot.park_vehicle(car)
+    with pytest.raises(ValueError, match="is for 2022-05-29 10:00:00 to 2022-05-29 12:00:00"):
+        parking_lot.park_vehicle(car, reservation_number=reservation.reservation_number)
+
+    clock.set(datetime(2022, 5, 29, 10, 30))
+    assert parking_lot.park_vehicle(car) == "No space available"
+    ticket = parking_lot.park_vehicle(car, reservation_number=reservation.reservation_number)
+    assert ticket.spot_number == 2
+    with pytest.raises(ValueError, match="Reservation 1 is not held"):
+        parking_lot.park_vehicle(car, reservation_number=reservation.reservation_number)
+
+    # a no show only holds its spot until its window ends
+    parking_lot.unpark_vehicle(walk_in.ticket_number)
+    parking_lot.reserve(car, datetime(2022, 5, 29, 13), datetime(2022, 5, 29, 14))
+    clock.set(datetime(2022, 5, 29, 13))
+    assert parking_lot.park_many([car]) == ["No space available"]
+    clock.set(datetime(2022, 5, 29, 14))
+    assert parking_lot.park_many([car])[0].spot_number == 1
+
+
+def test_walk_ins_may_fill_the_lot_before_a_reservation_window_starts():
+    parking_lot, clock = make_parking_lot(spots=2, reservable=1)
+    car = VehicleType.CAR_SUV
+    reservation = parking_lot.reserve(car, datetime(2022, 5, 29, 10), datetime(2022, 5, 29, 12))
+    walk_ins = [parking_lot.park_vehicle(car), parking_lot.park_vehicle(car)]
+
+    # reservations are best effort, nothing was held before the window
+    clock.set(datetime(2022, 5, 29, 10, 30))
+    assert (
+        parking_lot.park_vehicle(car, reservation_number=reservation.reservation_number)
+        == "No space available"
+    )
+
+    # the first spot freed within the window is held for the reservation, not for walk-ins
+    parking_lot.unpark_vehicle(walk_ins[0].ticket_number)
+    assert parking_lot.park_vehicle(car) == "No space available"
+    ticket = parking_lot.park_vehicle(car, reservation_number=reservation.reservation_number)
+    assert ticket.spot_number == 1
+
+
+def test_reserved_spots_are_held_and_claimed_by_the_clock():
+    parking_lot, clock = make_parking_lot(spots=1, reservable=1)
+    car = VehicleType.CAR_SUV
+    reservation = parking_lot.reserve(car, datetime(2022, 5, 29, 10), datetime(2022, 5, 29, 12))
+    clock.set(datetime(2022, 5, 29, 10, 30))
+
+    # a walk-in replayed with an entry time before the window still finds the spot held
+    assert parking_lot.park_vehicle(car, datetime(2022, 5, 29, 9)) == "No space available"
+    # the reservation is claimed within its window, a gate's late entry time notwithstanding
+    ticket = parking_lot.park_vehicle(
+        car, datetime(2022, 5, 29, 9, 55), reservation_number=reservation.reservation_number
+    )
+    assert ticket.entry_datetime == datetime(2022, 5, 29, 9, 55)
+
+    index = parking_lot.reservations.indexes[car]
+    # unclaiming a reservation whose window is over does not hold a spot again
+    clock.set(datetime(2022, 5, 29, 12))
+    assert index.held(parking_lot.clock.now()) == 0
+    index.unclaim(reservation.reservation_number)
+    assert index.held(parking_lot.clock.now()) == 0
@@ -0,0 +1,138 @@
+import asyncio
+import json
+
+from parking.models.fees import MallFeeModel
+from parking.models.parking_lot import ParkingLot
+from parking.models.vehicle import VehicleType
+from parking.server import ParkingServer
+
+
+def make_server(spots=1):
+    parking_lot = ParkingLot(
+        name="Mall Parking Lot",
+        spots={VehicleType.CAR_SUV: spots},
+        fee_models={VehicleType.CAR_SUV: MallFeeModel()},
+    )
+    return ParkingServer(parking_lot)
+
+
+async def send(port, payload, expected_lines):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(payload)
+    await writer.drain()
+    responses = [json.loads(await reader.readline()) for _ in range(expected_lines)]
+    writer.close()
+    await writer.wait_closed()
+    return responses
+
+
+def test_server_answers_pipelined_requests_in_order():
+    async def scenario():
+        server = await make_server().start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await send(
+                port,
+                b"PARK CAR_SUV 2022-05-29T14:04:07\n"
+                b"PARK CAR_SUV\n"
+                b"UNPARK 1 3600\n"
+                b"UNPARK 1\n"
+                b"FLY CAR_SUV\n",
+                5,
+            )
+
+    assert asyncio.run(scenario()) == [
+        {"ticket_number": 1, "spot_number": 1, "entry_datetime": "2022-05-29T14:04:07"},
+        {"error": "No space available"},
+        {
+            "receipt_number": 1,
+            "entry_datetime": "2022-05-29T14:04:07",
+            "exit_datetime": "2022-05-29T15:04:07",
+            "fees_paid": 20,
+        },
+        {"error": "Ticket 1 has not been commissioned by this parking lot"},
+        {"error": "Malformed request: FLY CAR_SUV"},
+    ]
+
+
+def test_server_shares_one_lot_between_many_connections():
+    async def scenario():
+        server = await make_server(spots=100).start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await asyncio.gather(*(send(port, b"PARK CAR_SUV\n" * 5, 5) for _ in range(20)))
+
+    responses = [response for gate in asyncio.run(scenario()) for response in gate]
+    assert sorted(response["spot_number"] for response in responses) == list(range(1, 101))
+
+
+def test_server_answers_failing_requests_and_keeps_the_connection():
+    server = make_server()
+
+    def broken_quote(ticket_number, fake_duration=None):
+        raise RuntimeError("fee service unreachable")
+
+    server.parking_lot.quote_fees = broken_quote
+
+    async def scenario():
+        started = await server.start(port=0)
+        port = started.sockets[0].getsockname()[1]
+        async with started:
+            return await send(
+                port, b"PARK \xff\xfe\nQUOTE 1\nPARK CAR_SUV 2022-05-29T14:04:07\n", 3
+            )
+
+    assert asyncio.run(scenario()) == [
+        {"error": "Request line is not valid UTF-8"},
+        {"error": "Request failed: RuntimeError: fee service unreachable"},
+        {"ticket_number": 1, "spot_number": 1, "entry_datetime": "2022-05-29T14:04:07"},
+    ]
+
+
+def test_server_tells_unknown_vehicle_types_from_lot_errors():
+    server = make_server()
+
+    def broken_unpark(ticket_number, fake_duration=None):
+        raise KeyError(ticket_number)
+
+    async def scenario():
+        started = await server.start(port=0)
+        port = started.sockets[0].getsockname()[1]
+        async with started:
+            responses = await send(port, b"PARK BOAT\nPARK BUS_TRUCK\nUNPARK 9\n", 3)
+            server.parking_lot.unpark_vehicle = broken_unpark
+            return responses + await send(port, b"UNPARK 9\n", 1)
+
+    assert asyncio.run(scenario()) == [
+        {"error": "Vehicle type passed is not recognised: 'BOAT'"},
+        {"error": "No spots are assigned to BUS_TRUCK"},
+        {"error": "Ticket 9 has not been commissioned by this parking lot"},
+        {"error": "Request failed: KeyError: 9"},
+    ]
+
+
+def test_server_quotes_fees_of_parked_vehicles():
+    async def scenario():
+        server = await make_server().start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await send(
+                port,
+                b"PARK CAR_SUV 2022-05-29T14:04:07\n"
+                b"QUOTE 1 3600\n"
+                b"QUOTE 1 5400\n"
+                b"QUOTE 9\n"
+                b"QUOTE\n"
+                b"UNPARK 1 5400\n",
+                6,
+            )
+
+    responses = asyncio.run(scenario())
+    assert responses[1:5] == [
+        {"fees": 20},
+        {"fees": 40},
+        {"error": "Ticket 9 has not been commissioned by this parking lot"},
+        {"error": "Malformed request: QUOTE"},
+    ]
+    # quoting does not unpark, the vehicle pays the quoted fees on exit
+    assert responses[5]["fees_paid"] == 40
@@ -0,0 +1,51 @@
+import pytest
+
+from parking.models.fees import MallFeeModel
+from parking.models.vehicle import VehicleType
+from parking.simulation import ArrivalProfile, SimulationConfig, run_replication, simulate
+
+CONFIG = SimulationConfig(
+    spots={VehicleType.CAR_SUV: 20, VehicleType.MOTORCYCLE_SCOOTER: 5},
+    fee_models={
+        VehicleType.CAR_SUV: MallFeeModel(),
+        VehicleType.MOTORCYCLE_SCOOTER: MallFeeModel(),
+    },
+    profiles={
+        VehicleType.CAR_SUV: ArrivalProfile(arrivals_per_hour=10, mean_dwell_hours=2),
+        VehicleType.MOTORCYCLE_SCOOTER: ArrivalProfile(arrivals_per_hour=5, mean_dwell_hours=3),
+    },
+    hours=12,
+)
+
+
+def test_simulation_is_reproducible_whatever_the_workers():
+    in_process = simulate(CONFIG, replications=6, seed=42, workers=1)
+    pooled = simulate(CONFIG, replications=6, seed=42, workers=2)
+
+    assert in_process == pooled
+    assert [replication.seed for replication in pooled.replications] == list(range(42, 48))
+    assert simulate(CONFIG, replications=1, seed=43, workers=1).replications[0] == (
+        in_process.replications[1]
+    )
+
+
+def test_replication_stays_within_the_lot_capacity():
+    replication = run_replication(CONFIG, seed=7)
+
+    # 5 motorcycle spots for ~15 motorcycles parked at once on average, most get turned away
+    assert replication.rejections[VehicleType.MOTORCYCLE_SCOOTER] > 0
+    assert replication.peak_occupancy[VehicleType.MOTORCYCLE_SCOOTER] == 5
+    assert replication.peak_occupancy[VehicleType.CAR_SUV] <= 20
+    assert 0 < replication.mean_occupancy[VehicleType.CAR_SUV] <= 20
+    assert replication.revenue >= 10 * sum(replication.parked.values())
+
+    summary = simulate(CONFIG, replications=4, workers=1).summary()
+    assert summary["peak_occupancy[MOTORCYCLE_SCOOTER]"].p50 == 5
+
+
+def test_simulation_rejects_vehicle_types_without_spots():
+    config = CONFIG._replace(
+        profiles={VehicleType.BUS_TRUCK: ArrivalProfile(arrivals_per_hour=1, mean_dwell_hours=1)}
+    )
+    with pytest.raises(ValueError, match="needs spots assigned"):
+        run_replication(config, seed=0)
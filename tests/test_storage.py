@@ -0,0 +1,100 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from parking.models.fees import MallFeeModel
+from parking.models.parking_lot import ParkingLot
+from parking.models.storage import SqliteSessionStore, StoredSession
+from parking.models.vehicle import VehicleType
+
+
+def make_parking_lot(storage):
+    return ParkingLot(
+        name="Mall Parking Lot",
+        spots={VehicleType.CAR_SUV: 5},
+        fee_models={VehicleType.CAR_SUV: MallFeeModel()},
+        storage=storage,
+    )
+
+
+def test_sqlite_store_keeps_sessions_and_receipts(tmp_path):
+    storage = SqliteSessionStore(tmp_path / "sessions.db", batch_size=3, max_delay=60)
+    parking_lot = make_parking_lot(storage)
+    tickets = [
+        parking_lot.park_vehicle(VehicleType.CAR_SUV, datetime(2022, 5, 29, 14 + hour))
+        for hour in range(3)
+    ]
+    parking_lot.unpark_vehicle(tickets[0].ticket_number, fake_duration=5400)
+
+    # the unpark is still pending, readers only see committed batches
+    assert storage.find_session(tickets[0].ticket_number).exit_datetime is None
+    storage.commit()
+    assert storage.find_session(tickets[0].ticket_number) == StoredSession(
+        1, VehicleType.CAR_SUV, 1, datetime(2022, 5, 29, 14), datetime(2022, 5, 29, 15, 30), 1, 40
+    )
+    assert storage.find_session(42) is None
+    assert [
+        session.ticket_number
+        for session in storage.sessions_between(datetime(2022, 5, 29, 15), datetime(2022, 5, 30))
+    ] == [2, 3]
+    storage.close()
+
+    reopened = SqliteSessionStore(tmp_path / "sessions.db")
+    assert reopened.find_session(3).entry_datetime == datetime(2022, 5, 29, 16)
+    reopened.close()
+    with sqlite3.connect(tmp_path / "sessions.db") as connection:
+        assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+
+
+def test_sqlite_store_serves_readers_while_gates_write(tmp_path):
+    storage = SqliteSessionStore(tmp_path / "sessions.db", batch_size=8, readers=2)
+    parking_lot = make_parking_lot(storage)
+
+    def gate():
+        for _ in range(50):
+            ticket = parking_lot.park_vehicle(VehicleType.CAR_SUV, datetime(2022, 5, 29, 14))
+            parking_lot.unpark_vehicle(ticket.ticket_number, fake_duration=600)
+
+    def report():
+        return len(storage.sessions_between(datetime(2022, 5, 29), datetime(2022, 5, 30)))
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        writer = executor.submit(gate)
+        reports = [executor.submit(report) for _ in range(20)]
+        writer.result()
+        assert all(0 <= r.result() <= 50 for r in reports)
+    storage.commit()
+    assert report() == 50
+    storage.close()
+
+
+class LockCheckingStore(SqliteSessionStore):
+    """
+    Tells whether the lot held its spot lock while each park was recorded
+    """
+
+    parking_lot = None
+
+    def record_park(self, vehicle_type, ticket):
+        self.parks_under_lock.append(self.parking_lot._spot_locks[vehicle_type].locked())
+        super().record_park(vehicle_type, ticket)
+
+
+def test_parks_are_stored_before_any_gate_can_unpark_them(tmp_path):
+    storage = LockCheckingStore(tmp_path / "sessions.db", batch_size=1)
+    storage.parks_under_lock = []
+    parking_lot = ParkingLot(
+        name="Mall Parking Lot",
+        spots={VehicleType.CAR_SUV: 5},
+        fee_models={VehicleType.CAR_SUV: MallFeeModel()},
+        concurrent=True,
+        storage=storage,
+    )
+    storage.parking_lot = parking_lot
+    ticket = parking_lot.park_vehicle(VehicleType.CAR_SUV, datetime(2022, 5, 29, 14))
+    parking_lot.park_many([VehicleType.CAR_SUV] * 2)
+    parking_lot.unpark_vehicle(ticket.ticket_number, fake_duration=3600)
+
+    assert storage.parks_under_lock == [True] * 3
+    assert storage.find_session(ticket.ticket_number).fees_paid == 20
+    storage.close()